@@ -1,8 +1,26 @@
+from services import services  # First import: its clock measures startup
+from config import SERVER_MODE
+from serving import patch_for_gevent, run_server
+
+if SERVER_MODE == "gevent":
+    # Before anything else imports socket/ssl
+    patch_for_gevent()
+
 from app_factory import create_app
 from logs.sensor_logger import start_sensor_logger
+from database.retention import start_retention_job
+from live.sampler import start_live_sampler
+from logs.db_logger import start_error_log_writer
+from camera.storage import start_capture_storage
 
 app = create_app()
+start_error_log_writer(app)
+start_capture_storage(app)
+# Camera, bus, plug, rollup backfill and timelapse resume start in the background
+services.start_all()
 start_sensor_logger(app)
+start_retention_job(app)
+start_live_sampler()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+    run_server(app, '0.0.0.0', 5000, SERVER_MODE)
@@ -1,17 +1,47 @@
 # app_factory.py
 from flask import Flask
 from camera.timelapse import load_saved_config
+from camera.motion import start_motion_monitor
 from database.models import db
 from routes.home import home_bp
 from routes.camera_routes import camera_bp
 from routes.i2c_routes import i2c_bp
 from routes.smartplug_routes import smartplug_bp
 from routes.auth_routes import auth_bp
+from routes.gallery_routes import gallery_bp
+from routes.events_routes import events_bp
+from routes.control_routes import control_bp
+from routes.health_routes import health_bp
+from routes.metrics_routes import metrics_bp
 from database.models import db
+from database.sqlite import configure_sqlite, ensure_columns, ensure_indexes
+from database.rollups import backfill_rollups
+from control.engine import reload_rules
+from camera.picam import camera
+from i2c.bus import i2c_bus
+from services import services
+from metrics import instrument_app
+import smart
 from auth.oauth2_server import config_oauth
 
 import os
 
+def _start_camera():
+    if not camera.start():
+        raise RuntimeError("Camera not available")
+
+
+def register_services(app):
+    """Slow and hardware subsystems, started in parallel by services.start_all() (see app.py)."""
+    services.init_app(app)
+    services.register("camera", _start_camera)
+    services.register("i2c", i2c_bus.open)
+    services.register("smartplug", smart.connect)
+    services.register("rollups", backfill_rollups, needs_app=True)
+    services.register("timelapse", load_saved_config, depends_on=("camera",), needs_app=True)
+    services.register("motion", start_motion_monitor, depends_on=("camera",), needs_app=True)
+
+
 def create_app():
     app = Flask(__name__)
 
@@ -27,6 +57,12 @@ def create_app():
     app.register_blueprint(i2c_bp)
     app.register_blueprint(smartplug_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(gallery_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(control_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(metrics_bp)
+    instrument_app(app)
 
     # Secret key for session management
     app.secret_key = 'REPLACE_WITH_RANDOM_SECRET_KEY'  # use os.urandom(24) in production
@@ -34,8 +70,13 @@ def create_app():
 
     # Initialize database
     with app.app_context():
+        configure_sqlite(db.engine)
         db.create_all()
-        load_saved_config()
+        ensure_columns(db.metadata, db.engine)
+        ensure_indexes(db.metadata, db.engine)
+        reload_rules()
         config_oauth(app)
 
+    register_services(app)
+
     return app
@@ -1,3 +1,4 @@
+import time
 from database.models import db
 from authlib.oauth2.rfc6749 import TokenMixin
 from authlib.integrations.sqla_oauth2 import OAuth2ClientMixin
@@ -16,3 +17,18 @@ class OAuth2Token(db.Model, TokenMixin):
     expires_in = db.Column(db.Integer, nullable=False)
     scope = db.Column(db.String(128))
     revoked = db.Column(db.Boolean, default=False)
+
+    def check_client(self, client):
+        return self.client_id == client.get_client_id()
+
+    def get_scope(self):
+        return self.scope
+
+    def get_expires_in(self):
+        return self.expires_in
+
+    def is_expired(self):
+        return self.issued_at + self.expires_in < time.time()
+
+    def is_revoked(self):
+        return bool(self.revoked)
@@ -1,32 +1,87 @@
-from authlib.integrations.flask_oauth2 import AuthorizationServer
-from authlib.oauth2.rfc6749 import grants
-from werkzeug.security import gen_salt
-from datetime import datetime, timedelta
+import time
+from authlib.integrations.flask_oauth2 import AuthorizationServer, ResourceProtector
+from authlib.oauth2 import OAuth2Error
+from authlib.oauth2.rfc6750 import BearerTokenValidator
+from authlib.oauth2.rfc7009 import RevocationEndpoint
+from flask import current_app, session
+from config import API_AUTH_REQUIRED, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
 from database.models import db, User
 from auth.models import OAuth2Client, OAuth2Token
+from auth.token_cache import TokenCache
 
 authorization = AuthorizationServer()
+require_oauth = ResourceProtector()
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
 
 def query_client(client_id):
     return OAuth2Client.query.filter_by(client_id=client_id).first()
 
 def save_token(token, request):
-    toks = OAuth2Token.query.filter_by(
+    previous = OAuth2Token.query.filter_by(
         client_id=request.client.client_id,
         user_id=request.user.id
     )
-    # Revoke existing tokens
-    for t in toks:
-        db.session.delete(t)
+    # Revoke existing tokens in one statement
+    revoked = [row.access_token for row in previous.with_entities(OAuth2Token.access_token)]
+    previous.delete(synchronize_session=False)
+
+    token = {key: value for key, value in token.items() if key != 'token_type'}
     new_token = OAuth2Token(
         client_id=request.client.client_id,
         user_id=request.user.id,
+        issued_at=int(time.time()),
         **token
     )
     db.session.add(new_token)
     db.session.commit()
+    token_cache.invalidate(*revoked)
+
+
+class CachedBearerTokenValidator(BearerTokenValidator):
+    """Bearer tokens are looked up in the token cache first, then in the database."""
+
+    def authenticate_token(self, token_string):
+        cached = token_cache.get(token_string)
+        if cached is not None:
+            return cached
+        generation = token_cache.generation
+        token = OAuth2Token.query.filter_by(access_token=token_string).first()
+        return token_cache.put(token, generation) if token else None
+
+
+class TokenRevocationEndpoint(RevocationEndpoint):
+    """RFC 7009 revocation (/oauth/revoke); the revoked token leaves the cache at once."""
+
+    def query_token(self, token_string, token_type_hint):
+        if token_type_hint == 'refresh_token':
+            return OAuth2Token.query.filter_by(refresh_token=token_string).first()
+        token = OAuth2Token.query.filter_by(access_token=token_string).first()
+        if token is None and token_type_hint != 'access_token':
+            token = OAuth2Token.query.filter_by(refresh_token=token_string).first()
+        return token
+
+    def revoke_token(self, token, request):
+        token.revoked = True
+        db.session.commit()
+        token_cache.invalidate(token.access_token)
+
+
+def require_api_auth():
+    """
+    before_request hook of the API blueprints: lets through logged-in
+    browser sessions and requests with a valid bearer token. Apps can turn
+    it off with app.config["API_AUTH_REQUIRED"] (benchmarks do).
+    """
+    if not current_app.config.get("API_AUTH_REQUIRED", API_AUTH_REQUIRED) or 'user_id' in session:
+        return None
+    try:
+        require_oauth.acquire_token()
+    except OAuth2Error as error:
+        require_oauth.raise_error_response(error)
 
 def config_oauth(app):
     from auth.grants import PasswordGrant  # see below
     authorization.init_app(app, query_client=query_client, save_token=save_token)
     authorization.register_grant(PasswordGrant)
+    authorization.register_endpoint(TokenRevocationEndpoint)
+    require_oauth.register_token_validator(CachedBearerTokenValidator())
@@ -0,0 +1,100 @@
+# auth/token_cache.py
+"""
+Validated bearer tokens kept in memory, so protected API requests don't
+query OAuth2Token every time (the dashboard polls every 200 ms).
+
+Entries are plain snapshots of the token row, evicted least recently used
+beyond max_size and dropped after ttl seconds or when the token expires,
+whichever comes first. Revoking or reissuing a token invalidates its entry;
+a lookup that started before an invalidation never caches its (possibly
+stale) result.
+"""
+import threading
+import time
+from collections import OrderedDict
+from authlib.oauth2.rfc6749 import TokenMixin
+from metrics import registry
+
+LOOKUPS = registry.counter("token_cache_lookups", "Bearer token cache lookups by outcome", ["result"])
+
+
+class CachedToken(TokenMixin):
+    """The fields token validation and route handlers need, detached from the DB session."""
+
+    def __init__(self, token):
+        self.id = token.id
+        self.client_id = token.client_id
+        self.user_id = token.user_id
+        self.access_token = token.access_token
+        self.scope = token.scope
+        self.issued_at = token.issued_at
+        self.expires_in = token.expires_in
+        self.revoked = bool(token.revoked)
+
+    def check_client(self, client):
+        return self.client_id == client.get_client_id()
+
+    def get_scope(self):
+        return self.scope
+
+    def get_expires_in(self):
+        return self.expires_in
+
+    def expires_at(self):
+        return self.issued_at + self.expires_in
+
+    def is_expired(self):
+        return self.expires_at() < time.time()
+
+    def is_revoked(self):
+        return self.revoked
+
+
+class TokenCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.generation = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # access_token -> (CachedToken, cached until, wall clock)
+
+    def get(self, access_token):
+        with self._lock:
+            entry = self._entries.get(access_token)
+            if entry is not None:
+                if time.time() < entry[1]:
+                    self._entries.move_to_end(access_token)
+                    LOOKUPS.labels("hit").inc()
+                    return entry[0]
+                del self._entries[access_token]
+        LOOKUPS.labels("miss").inc()
+        return None
+
+    def put(self, token, generation):
+        """Cache a token row looked up at `generation`. Returns the cached snapshot."""
+        cached = CachedToken(token)
+        if self.max_size <= 0:
+            return cached
+        with self._lock:
+            if generation != self.generation:
+                return cached  # Invalidated while it was being looked up
+            self._entries[cached.access_token] = (cached, min(time.time() + self.ttl, cached.expires_at()))
+            self._entries.move_to_end(cached.access_token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return cached
+
+    def invalidate(self, *access_tokens):
+        with self._lock:
+            self.generation += 1
+            for access_token in access_tokens:
+                self._entries.pop(access_token, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
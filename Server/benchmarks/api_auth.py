@@ -0,0 +1,80 @@
+# benchmarks/api_auth.py
+"""
+Latency of a cheap protected API route (/i2c/stats, no bus access) per
+way of authenticating: no check, logged-in session, bearer token through
+the token cache, and bearer token looked up in the database on every
+request (cache disabled), like the dashboard's 200 ms polling would hit it.
+
+Run from the Server folder:
+    python -m benchmarks.api_auth --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.sensor_ingest import make_app
+from auth.models import OAuth2Client, OAuth2Token
+from auth.oauth2_server import config_oauth, token_cache
+from database.models import User, db
+from routes.i2c_routes import i2c_bp
+
+
+def per_request(client, requests, headers=None):
+    client.get('/i2c/stats', headers=headers)  # warm up
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get('/i2c/stats', headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)}")
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, "auth.db"), wal=True)
+        app.secret_key = 'benchmark'
+        app.register_blueprint(i2c_bp)
+        with app.app_context():
+            config_oauth(app)
+            user = User(username='bench')
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.commit()
+            db.session.add(OAuth2Client(client_id='bench', user_id=user.id))
+            db.session.add(OAuth2Token(client_id='bench', user_id=user.id, access_token='bench-token',
+                                       issued_at=int(time.time()), expires_in=3600, scope=''))
+            db.session.commit()
+            user_id = user.id
+
+        client = app.test_client()
+        bearer = {"Authorization": "Bearer bench-token"}
+        results = {}
+
+        app.config['API_AUTH_REQUIRED'] = False
+        results["no auth"] = per_request(client, args.requests)
+        app.config['API_AUTH_REQUIRED'] = True
+
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        results["session"] = per_request(client, args.requests)
+        with client.session_transaction() as session:
+            session.clear()
+
+        results["bearer, cached"] = per_request(client, args.requests, bearer)
+        max_size, token_cache.max_size = token_cache.max_size, 0
+        token_cache.clear()
+        results["bearer, DB lookup"] = per_request(client, args.requests, bearer)
+        token_cache.max_size = max_size
+
+    print(f"{'auth':<20} {'us/request':>11}")
+    for name, seconds in results.items():
+        print(f"{name:<20} {1e6 * seconds:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/capture_latency.py
+"""
+/capture_image latency without the file write: a still from the main stream
+cropped/scaled to each resolution, then JPEG-encoded the way the route does
+it. Runs on the simulated camera (sim.camera.FakePicamera2) paced at
+FRAME_RATE, so the numbers include waiting for the next frame like on the
+Pi; pass --picamera2 on the Pi to measure the real sensor.
+
+Run from the Server folder:
+    python -m benchmarks.capture_latency --repeat 10
+"""
+import argparse
+import time
+
+from camera.encoder import encode_jpeg
+from camera.picam import Camera, STILL_PIXEL_FORMAT
+from config import AVAILABLE_RESOLUTIONS, CAMERA_WIDTH, CAMERA_HEIGHT, STILL_WIDTH, STILL_HEIGHT, STILL_JPEG_QUALITY
+
+
+def run(resolutions, repeat, factory=None):
+    """Median (capture seconds, encode seconds, JPEG bytes) per resolution."""
+    camera = Camera((STILL_WIDTH, STILL_HEIGHT), (CAMERA_WIDTH, CAMERA_HEIGHT))
+    if factory is None:
+        from sim.camera import FakePicamera2 as factory
+    if not camera.start(factory):
+        raise RuntimeError("Camera did not start")
+
+    results = {}
+    try:
+        for size in resolutions:
+            captures, encodes = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                image = camera.capture_still(size)
+                captured = time.perf_counter()
+                jpeg = encode_jpeg(image, STILL_PIXEL_FORMAT, quality=STILL_JPEG_QUALITY)
+                captures.append(captured - start)
+                encodes.append(time.perf_counter() - captured)
+            captures.sort()
+            encodes.sort()
+            results[size] = (captures[len(captures) // 2], encodes[len(encodes) // 2], len(jpeg))
+    finally:
+        camera.picam2.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--picamera2", action="store_true", help="use the real camera")
+    args = parser.parse_args()
+
+    factory = None
+    if args.picamera2:
+        from picamera2 import Picamera2 as factory
+
+    print(f"{'resolution':>12} {'capture ms':>11} {'encode ms':>10} {'total ms':>9} {'KB':>7}")
+    for size, (capture, encode, length) in run(AVAILABLE_RESOLUTIONS, args.repeat, factory).items():
+        print(f"{f'{size[0]}x{size[1]}':>12} {1000 * capture:>11.1f} {1000 * encode:>10.1f} "
+              f"{1000 * (capture + encode):>9.1f} {length / 1024:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/capture_storage.py
+"""
+Cost of saving a captured JPEG on the capturing thread: "inline" is the old
+path (open/write on the caller, then the catalog row), "queued" hands the
+image to the storage writer. Also reports the writer's throughput (write,
+fsync, rename, catalog) and what quota enforcement leaves behind for an
+oldest-first area and for a thinned timelapse spanning several days.
+
+Point --dir at the SD card to see its real write latency (the default is a
+temporary directory).
+
+Run from the Server folder:
+    python -m benchmarks.capture_storage --images 200
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.sensor_ingest import make_app
+from camera.catalog import record_capture
+from camera.storage import CaptureStorage, StorageArea
+from database.models import CapturedImage
+
+
+def inline(app, root, data, images, start):
+    latencies = []
+    with app.app_context():
+        for i in range(images):
+            started = time.perf_counter()
+            timestamp = start + timedelta(seconds=i)
+            folder = os.path.join(root, timestamp.strftime("%Y-%m-%d"))
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, timestamp.strftime("%H-%M-%S") + ".jpg")
+            with open(path, 'wb') as f:
+                f.write(data)
+            record_capture(path, (1920, 1080), len(data), "timelapse")
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def queued(app, area, data, images, start, step=timedelta(seconds=1), thin_after_days=7, keep_every=4):
+    storage = CaptureStorage([area], images, 0, thin_after_days, keep_every)
+    storage.start(app)
+    latencies = []
+    dropped = 0
+    write_started = time.perf_counter()
+    for i in range(images):
+        started = time.perf_counter()
+        if storage.save(area.name, data, (1920, 1080), "timelapse", timestamp=start + i * step) is None:
+            dropped += 1
+        latencies.append(time.perf_counter() - started)
+    storage.flush()
+    return latencies, time.perf_counter() - write_started, dropped
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return 1e6 * sum(latencies) / len(latencies), 1e6 * latencies[int(0.99 * (len(latencies) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--kb", type=int, default=500, help="JPEG size")
+    parser.add_argument("--dir", default=None, help="where to write (default: a temporary directory)")
+    args = parser.parse_args()
+
+    data = os.urandom(args.kb * 1024)
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        inline_app = make_app(os.path.join(tmp, "inline.db"), wal=True)
+        inline_latencies = inline(inline_app, os.path.join(tmp, "inline"), data, args.images, start)
+
+        app = make_app(os.path.join(tmp, "queued.db"), wal=True)
+        area = StorageArea("bench", os.path.join(tmp, "queued"), 10 ** 12)
+        queued_latencies, seconds, dropped = queued(app, area, data, args.images, start)
+
+        print(f"{'path':<8} {'mean us':>9} {'p99 us':>9}")
+        print(f"{'inline':<8} {'%9.0f %9.0f' % summary(inline_latencies)}")
+        print(f"{'queued':<8} {'%9.0f %9.0f' % summary(queued_latencies)}   ({dropped} dropped)")
+        print(f"writer: {args.images / seconds:.0f} images/s, {args.images * len(data) / seconds / 1024 / 1024:.1f} MB/s")
+        print()
+
+        quota = args.images // 2 * len(data)
+        oldest = StorageArea("oldest", os.path.join(tmp, "oldest"), quota)
+        queued(make_app(os.path.join(tmp, "oldest.db"), wal=True), oldest, data, args.images, start)
+
+        # One frame per hour over ~images/24 days; days older than 2 days may be thinned
+        thin_app = make_app(os.path.join(tmp, "thin.db"), wal=True)
+        thin = StorageArea("thin", os.path.join(tmp, "thin"), quota, policy="thin")
+        days = args.images / 24
+        queued(thin_app, thin, data, args.images, start - timedelta(days=days), step=timedelta(hours=1),
+               thin_after_days=2)
+        with thin_app.app_context():
+            catalogued = CapturedImage.query.count()
+
+        print(f"{'policy':<8} {'written':>8} {'kept':>6} {'MB':>7} {'quota MB':>9} {'days kept':>10}")
+        for area in (oldest, thin):
+            print(f"{area.policy:<8} {args.images:>8} {len(area.files):>6} {area.bytes / 1024 / 1024:>7.1f} "
+                  f"{area.quota_bytes / 1024 / 1024:>9.1f} {len({day for day, _ in area.files}):>10}")
+        print(f"catalog rows left for the thinned area: {catalogued}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/error_logging.py
+"""
+Cost of reporting one failed sample on the calling thread, as a flaky bus
+would: logger.exception() plus an ErrorLog row. "inline" is the old path
+(file handler on the caller, traceback formatted and committed per error);
+"queued" is the queue-based logger plus the deduplicating background
+ErrorLog writer.
+
+Run from the Server folder:
+    python -m benchmarks.error_logging --errors 2000
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import traceback
+
+from benchmarks.sensor_ingest import make_app
+from database.models import ErrorLog, db
+from logs.db_logger import ErrorLogWriter
+from logs.logging_config import logger, log_listener
+
+
+def inline(app, log_path, errors):
+    inline_logger = logging.getLogger("FungiForgeInline")
+    inline_logger.propagate = False
+    inline_logger.addHandler(logging.FileHandler(log_path))
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(errors):
+            try:
+                raise OSError(121, "Remote I/O error")
+            except OSError as e:
+                inline_logger.exception("[I2C] Failed to read sensor data")
+                db.session.add(ErrorLog(module="i2c/sensors.py", message=str(e), traceback=traceback.format_exc()))
+                db.session.commit()
+        return time.perf_counter() - start
+
+
+def queued(app, errors):
+    writer = ErrorLogWriter(flush_interval=1.0, dedup_seconds=3600, max_pending=1000)
+    writer.start(app)
+    start = time.perf_counter()
+    for i in range(errors):
+        try:
+            raise OSError(121, "Remote I/O error")
+        except OSError as e:
+            logger.exception("[I2C] Failed to read sensor data")
+            writer.add("i2c/sensors.py", e)
+    elapsed = time.perf_counter() - start
+    writer.flush()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--errors", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Only measure the caller's side; keep the console quiet
+    log_listener.handlers = tuple(h for h in log_listener.handlers if type(h) is not logging.StreamHandler)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inline_app = make_app(os.path.join(tmp, "inline.db"), wal=True)
+        inline_seconds = inline(inline_app, os.path.join(tmp, "inline.log"), args.errors)
+        queued_app = make_app(os.path.join(tmp, "queued.db"), wal=True)
+        queued_seconds = queued(queued_app, args.errors)
+        with inline_app.app_context():
+            inline_rows = ErrorLog.query.count()
+        with queued_app.app_context():
+            queued_rows = ErrorLog.query.count()
+
+    print(f"{'path':<10} {'us/error':>10} {'ErrorLog rows':>14}")
+    print(f"{'inline':<10} {1e6 * inline_seconds / args.errors:>10.1f} {inline_rows:>14}")
+    print(f"{'queued':<10} {1e6 * queued_seconds / args.errors:>10.1f} {queued_rows:>14}")
+
+
+if __name__ == '__main__':
+    main()
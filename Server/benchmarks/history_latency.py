@@ -0,0 +1,115 @@
+# benchmarks/history_latency.py
+"""
+/readings_history latency on a large table: cursor mode (first page and a
+page from the middle of the table), cursor mode with include_total, and the
+legacy page mode (COUNT(*) plus an OFFSET scan) at the same depths.
+
+The scratch database is bulk-built once with --rows readings at one per
+second; pass --db to keep it and reuse it on the next run (building 10M
+rows takes a few minutes).
+
+Run from the Server folder:
+    python -m benchmarks.history_latency --rows 1000000
+    python -m benchmarks.history_latency --rows 10000000 --db /tmp/history-10m.db
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.sensor_ingest import make_app
+from database.models import SensorReading
+
+START = datetime(2024, 1, 1)
+BATCH = 50000
+
+
+def build_db(db_path, rows):
+    """Create the schema through the app, then bulk-insert rows with plain sqlite3."""
+    make_app(db_path, wal=True)
+    connection = sqlite3.connect(db_path)
+    existing = connection.execute("SELECT COUNT(*) FROM sensor_reading").fetchone()[0]
+    if existing >= rows:
+        connection.close()
+        return existing
+
+    def batch(first, last):
+        for i in range(first, last):
+            timestamp = START + timedelta(seconds=i)
+            yield (timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"), 20.0 + i % 10, 85.0 + i % 7, 21.5, 500.0 + i % 50)
+
+    for first in range(existing, rows, BATCH):
+        connection.executemany(
+            "INSERT INTO sensor_reading (timestamp, temperature_air, humidity_air, temperature_substrate, "
+            "moisture_substrate) VALUES (?, ?, ?, ?, ?)",
+            batch(first, min(first + BATCH, rows))
+        )
+        connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+    return rows
+
+
+def history_app(db_path):
+    from routes.i2c_routes import i2c_bp
+    app = make_app(db_path, wal=True)
+    app.config['API_AUTH_REQUIRED'] = False
+    app.register_blueprint(i2c_bp)
+    return app
+
+
+def time_request(client, url, repeat):
+    """Median latency in seconds of repeat GETs of url."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url}: HTTP {response.status_code} {response.get_data(as_text=True)}")
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(db_path, rows, per_page=20, repeat=5):
+    """Median latency (seconds) per query shape against a table of rows readings."""
+    rows = build_db(db_path, rows)
+    app = history_app(db_path)
+    with app.app_context():
+        middle = SensorReading.query.order_by(SensorReading.id).offset(rows // 2).first()
+    cursor = f"{middle.timestamp.isoformat()},{middle.id}"
+    deep_page = max(1, rows // per_page // 2)
+
+    client = app.test_client()
+    base = f"/readings_history?per_page={per_page}"
+    return {
+        "rows": rows,
+        "cursor_first": time_request(client, f"{base}&after=", repeat),
+        "cursor_deep": time_request(client, f"{base}&after={cursor}", repeat),
+        "cursor_total": time_request(client, f"{base}&after=&include_total=true", repeat),
+        "page_first": time_request(client, f"{base}&page=1", repeat),
+        "page_deep": time_request(client, f"{base}&page={deep_page}", repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000])
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", help="database file to build once and reuse (one size only)")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'cursor first':>13} {'cursor deep':>12} {'cursor+total':>13} {'page first':>11} {'page deep':>10}  (ms)")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            db_path = args.db or os.path.join(tmp, f"history-{rows}.db")
+            r = run(db_path, rows, args.per_page, args.repeat)
+            print(f"{r['rows']:>10} {1000 * r['cursor_first']:>13.2f} {1000 * r['cursor_deep']:>12.2f} "
+                  f"{1000 * r['cursor_total']:>13.2f} {1000 * r['page_first']:>11.2f} {1000 * r['page_deep']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
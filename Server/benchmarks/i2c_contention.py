@@ -0,0 +1,118 @@
+# benchmarks/i2c_contention.py
+"""
+Servo command latency while many threads poll the sensors, on a fake SMBus
+with a fixed per-transaction latency:
+
+- legacy: one lock per module, as before (sensor reads and servo writes can overlap on the bus)
+- shared lock: one lock for everything, first come first served
+- arbiter: the I2CBus priority queue with merged duplicate reads
+
+Run from the Server folder:
+    python -m benchmarks.i2c_contention --readers 8 --seconds 3
+"""
+import argparse
+import threading
+import time
+
+from smbus2 import i2c_msg
+
+from config import ARDUINO_SENSORS, ARDUINO_PAN_TILT
+from i2c.bus import I2CBus, PRIORITY_SENSOR, PRIORITY_SERVO
+from sim.smbus import FakeSMBus
+
+
+class LockedAccess:
+    """Old access pattern: a lock around each direct bus call."""
+
+    def __init__(self, bus, sensor_lock, servo_lock):
+        self.bus = bus
+        self.sensor_lock = sensor_lock
+        self.servo_lock = servo_lock
+
+    def read_sensors(self):
+        with self.sensor_lock:
+            msg = i2c_msg.read(ARDUINO_SENSORS, 14)
+            self.bus.i2c_rdwr(msg)
+
+    def move_servo(self):
+        with self.servo_lock:
+            self.bus.write_i2c_block_data(ARDUINO_PAN_TILT, 0x00, [90, 120])
+
+
+class ArbiterAccess:
+    def __init__(self, bus):
+        self.arbiter = I2CBus(bus_factory=lambda: bus, timeout=5.0)
+
+    def read_sensors(self):
+        self.arbiter.read(ARDUINO_SENSORS, 14, priority=PRIORITY_SENSOR)
+
+    def move_servo(self):
+        self.arbiter.write_block(ARDUINO_PAN_TILT, 0x00, [90, 120], priority=PRIORITY_SERVO)
+
+
+def run(access, bus, readers, seconds, servo_interval):
+    stop = threading.Event()
+    reads = [0] * readers
+    servo_latencies = []
+
+    def reader(i):
+        while not stop.is_set():
+            access.read_sensors()
+            reads[i] += 1
+
+    def servo():
+        while not stop.is_set():
+            start = time.perf_counter()
+            access.move_servo()
+            servo_latencies.append(time.perf_counter() - start)
+            time.sleep(servo_interval)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=servo))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    servo_latencies.sort()
+    return {
+        "reads/s": sum(reads) / seconds,
+        "bus tx/s": bus.transactions / seconds,
+        "servo p50 ms": 1000 * servo_latencies[len(servo_latencies) // 2],
+        "servo p95 ms": 1000 * servo_latencies[int(0.95 * (len(servo_latencies) - 1))],
+        "servo max ms": 1000 * servo_latencies[-1],
+        "overlap": bus.max_concurrent,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8, help="threads polling the sensors")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="fake bus time per transaction")
+    parser.add_argument("--servo-interval-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    results = {}
+    for name in ("legacy", "shared lock", "arbiter"):
+        bus = FakeSMBus(latency=args.latency_ms / 1000)
+        if name == "legacy":
+            access = LockedAccess(bus, threading.Lock(), threading.Lock())
+        elif name == "shared lock":
+            lock = threading.Lock()
+            access = LockedAccess(bus, lock, lock)
+        else:
+            access = ArbiterAccess(bus)
+        results[name] = run(access, bus, args.readers, args.seconds, args.servo_interval_ms / 1000)
+
+    columns = list(results["arbiter"])
+    print(f"{'access':<12}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<12}" + "".join(f"{row[c]:>14.1f}" if isinstance(row[c], float) else f"{row[c]:>14}" for c in columns))
+    print("overlap = most transactions seen on the bus at the same time (should be 1)")
+
+
+if __name__ == '__main__':
+    main()
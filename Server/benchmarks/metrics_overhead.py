@@ -0,0 +1,58 @@
+# benchmarks/metrics_overhead.py
+"""
+Cost of the metrics instrumentation on the stream path: the time of one
+counter increment and one histogram observation, and what the per-frame
+recording (one capture observation, one encode observation per rendition,
+one counter increment per viewer) adds relative to the capture + encode
+work of the same frame.
+
+Run from the Server folder:
+    python -m benchmarks.metrics_overhead --viewers 10
+"""
+import argparse
+import time
+
+import numpy as np
+
+from camera.encoder import encode_jpeg
+from metrics import MetricsRegistry
+
+
+def per_call(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--viewers", type=int, default=10)
+    parser.add_argument("--renditions", type=int, default=3)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_frames", "benchmark", ["rendition"]).labels("low")
+    histogram = registry.histogram("bench_seconds", "benchmark", ["rendition"]).labels("low")
+
+    inc = per_call(counter.inc, args.calls)
+    observe = per_call(lambda: histogram.observe(0.004), args.calls)
+    timed = per_call(lambda: histogram.observe(time.perf_counter() - time.perf_counter()), args.calls)
+
+    frame = np.random.default_rng(0).integers(0, 255, (args.height * 3 // 2, args.width), dtype=np.uint8)
+    encode = per_call(lambda: encode_jpeg(frame, "YUV420"), 200)
+
+    per_frame = timed * (1 + args.renditions) + inc * args.viewers
+    print(f"counter inc              {1e9 * inc:>10.0f} ns")
+    print(f"histogram observe        {1e9 * observe:>10.0f} ns")
+    print(f"timed observe            {1e9 * timed:>10.0f} ns  (two perf_counter calls + observe)")
+    print(f"encode {args.width}x{args.height}          {1e6 * encode:>10.0f} us")
+    print(f"metrics per frame        {1e6 * per_frame:>10.2f} us  ({args.renditions} renditions, {args.viewers} viewers)")
+    print(f"overhead                 {100 * per_frame / (encode * args.renditions):>10.3f} % of the frame's encode time")
+
+
+if __name__ == '__main__':
+    main()
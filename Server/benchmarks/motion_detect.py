@@ -0,0 +1,153 @@
+# benchmarks/motion_detect.py
+"""
+Change detection on synthetic lores sequences (YUV420, sensor noise added to
+every frame): the detector's cost per frame and how often it fires per
+downscale factor, then the stream itself with and without detection for a
+static chamber, a chamber with occasional activity and a busy one: frames
+and bytes sent to one viewer and CPU time of the whole process.
+
+Run from the Server folder:
+    python -m benchmarks.motion_detect --seconds 10
+"""
+import argparse
+import logging
+import threading
+import time
+
+import numpy as np
+
+from camera.encoder import encode_jpeg
+from camera.motion import ChangeDetector, stream_luma
+from camera.streamer import FrameBroadcaster
+from logs.logging_config import log_listener
+from config import (MOTION_PIXEL_THRESHOLD, MOTION_AREA_THRESHOLD, MOTION_BACKGROUND_ALPHA, MOTION_HOLD_SECONDS,
+                    MOTION_SAMPLE_INTERVAL, STREAM_KEEPALIVE_SECONDS)
+
+SCENES = {
+    # scene -> fraction of the time something moves
+    "static": 0.0,
+    "occasional": 0.1,
+    "busy": 1.0,
+}
+
+
+def make_frames(width, height, count, moving, seed=0):
+    """count noisy YUV420 frames of the same chamber; with moving, a bright blob crosses it."""
+    rng = np.random.default_rng(seed)
+    base = np.full((height * 3 // 2, width), 128, dtype=np.uint8)
+    base[:height] = rng.integers(40, 200, (height, width), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        noise = rng.normal(0, 2, (height, width))
+        frame = base.copy()
+        frame[:height] = np.clip(base[:height] + noise, 0, 255).astype(np.uint8)
+        if moving:
+            size = height // 5
+            x = (i * width // count) % (width - size)
+            y = height // 2 - size // 2
+            frame[y:y + size, x:x + size] = 250
+        frames.append(frame)
+    return frames
+
+
+def new_detector():
+    return ChangeDetector(MOTION_PIXEL_THRESHOLD, MOTION_AREA_THRESHOLD, MOTION_BACKGROUND_ALPHA, MOTION_HOLD_SECONDS)
+
+
+def detector_cost(static, moving, size, step):
+    detector = new_detector()
+    detector.hold_seconds = 0  # Report the frames that changed, not the hold period
+    for frame in static[:5]:
+        detector.update(stream_luma(frame, size, step))
+
+    start = time.perf_counter()
+    static_hits = sum(detector.update(stream_luma(frame, size, step)) for frame in static)
+    moving_hits = sum(detector.update(stream_luma(frame, size, step)) for frame in moving)
+    seconds = (time.perf_counter() - start) / (len(static) + len(moving))
+    return seconds, static_hits / len(static), moving_hits / len(moving)
+
+
+def stream(static, moving, size, fps, seconds, activity, detect):
+    """One viewer on the "high" rendition; frames are produced like the camera would at fps."""
+    started = time.monotonic()
+    next_frame_at = [started]
+    period = 10.0  # Activity happens in the first `activity` fraction of every period
+
+    def producer():
+        delay = next_frame_at[0] - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        now = time.monotonic()
+        next_frame_at[0] = max(now, next_frame_at[0]) + 1.0 / fps
+        index = int((now - started) * fps)
+        frames = moving if (now - started) % period < activity * period else static
+        return frames[index % len(frames)], size
+
+    def encode(captured, scale):
+        frame, (width, height) = captured
+        return encode_jpeg(frame, "YUV420", width=width)
+
+    detector = new_detector()
+    broadcaster = FrameBroadcaster(
+        producer, encode, {"high": 1.0}, idle_timeout=0.2,
+        detect=(lambda captured: detector.observe(*captured)) if detect else None,
+        keepalive_interval=STREAM_KEEPALIVE_SECONDS, static_interval=MOTION_SAMPLE_INTERVAL
+    )
+
+    sent = {"frames": 0, "bytes": 0}
+    stop = threading.Event()
+
+    def viewer():
+        frames = broadcaster.frames("high")
+        for jpeg in frames:
+            if stop.is_set():
+                break
+            sent["frames"] += 1
+            sent["bytes"] += len(jpeg)
+        frames.close()
+
+    cpu = time.process_time()
+    thread = threading.Thread(target=viewer, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu
+    result = dict(sent)
+    stop.set()
+    thread.join()
+    while broadcaster._thread is not None:  # Let the capture loop wind down before the next run
+        time.sleep(0.05)
+    return result["frames"], result["bytes"], cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--frames", type=int, default=60, help="distinct frames per synthetic sequence")
+    args = parser.parse_args()
+
+    # Keep the broadcaster's start/stop messages off the table
+    log_listener.handlers = tuple(h for h in log_listener.handlers if type(h) is not logging.StreamHandler)
+
+    size = (args.width, args.height)
+    static = make_frames(args.width, args.height, args.frames, moving=False)
+    moving = make_frames(args.width, args.height, args.frames, moving=True, seed=1)
+
+    print(f"{'downscale':>9} {'us/frame':>9} {'static flagged':>15} {'moving flagged':>15}")
+    for step in (1, 2, 4, 8):
+        seconds, static_rate, moving_rate = detector_cost(static, moving, size, step)
+        print(f"{step:>9} {1e6 * seconds:>9.0f} {100 * static_rate:>14.0f}% {100 * moving_rate:>14.0f}%")
+
+    print()
+    print(f"{'scene':<11} {'detection':<10} {'frames/s':>9} {'KB/s':>8} {'CPU %':>6}")
+    for scene, activity in SCENES.items():
+        for detect in (False, True):
+            frames, sent, cpu = stream(static, moving, size, args.fps, args.seconds, activity, detect)
+            print(f"{scene:<11} {'on' if detect else 'off':<10} {frames / args.seconds:>9.1f} "
+                  f"{sent / 1024 / args.seconds:>8.0f} {100 * cpu / args.seconds:>6.0f}")
+
+
+if __name__ == '__main__':
+    main()
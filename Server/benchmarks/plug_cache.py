@@ -0,0 +1,69 @@
+# benchmarks/plug_cache.py
+"""
+Upstream smart plug calls and status latency with N concurrent pollers, with
+and without the CachedPlug layer, against a fake plug with cloud-like
+latency.
+
+Run from the Server folder:
+    python -m benchmarks.plug_cache --pollers 10 --seconds 5 --latency-ms 300
+"""
+import argparse
+import threading
+import time
+
+from sim.plug import FakePlug
+from smart import CachedPlug
+
+
+def run(plug, fake, pollers, seconds, poll_interval):
+    stop = threading.Event()
+    latencies = []
+
+    def poller():
+        while not stop.is_set():
+            start = time.perf_counter()
+            plug.status()
+            latencies.append(time.perf_counter() - start)
+            time.sleep(poll_interval)
+
+    threads = [threading.Thread(target=poller) for _ in range(pollers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "upstream/min": fake.calls * 60 / seconds,
+        "p50 ms": 1000 * latencies[len(latencies) // 2],
+        "p99 ms": 1000 * latencies[int(0.99 * (len(latencies) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pollers", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake upstream round trip")
+    parser.add_argument("--poll-interval-ms", type=float, default=500.0)
+    parser.add_argument("--status-ttl", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rows = {}
+    fake = FakePlug(latency=args.latency_ms / 1000)
+    rows["direct"] = run(fake, fake, args.pollers, args.seconds, args.poll_interval_ms / 1000)
+    fake = FakePlug(latency=args.latency_ms / 1000)
+    rows["cached"] = run(CachedPlug(fake, status_ttl=args.status_ttl), fake, args.pollers, args.seconds,
+                         args.poll_interval_ms / 1000)
+
+    columns = list(rows["direct"])
+    print(f"{'path':<8}" + "".join(f"{c:>14}" for c in columns))
+    for name, row in rows.items():
+        print(f"{name:<8}" + "".join(f"{row[c]:>14.1f}" if isinstance(row[c], float) else f"{row[c]:>14}" for c in columns))
+
+
+if __name__ == '__main__':
+    main()
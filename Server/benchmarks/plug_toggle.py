@@ -0,0 +1,54 @@
+# benchmarks/plug_toggle.py
+"""
+Smart plug round-trip latency (status read and toggle) for each backend.
+Backends that are not configured in config.py are skipped.
+
+Run from the Server folder:
+    python -m benchmarks.plug_toggle --backends sim local cloud --repeat 10
+"""
+import argparse
+import time
+
+from smart import create_backend
+
+
+def measure(backend, repeat):
+    status, toggle = [], []
+    state = backend.status()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        state = backend.status()
+        status.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        backend.set(not state)
+        toggle.append(time.perf_counter() - start)
+        state = not state
+    return status, toggle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["sim", "local", "cloud"])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10} {'connect ms':>12} {'status p50':>12} {'toggle p50':>12} {'toggle max':>12}")
+    for name in args.backends:
+        try:
+            backend = create_backend(name)
+            start = time.perf_counter()
+            backend.status()  # first call includes the connection
+            connect = time.perf_counter() - start
+            status, toggle = measure(backend, args.repeat)
+        except Exception as e:
+            print(f"{name:<10} skipped: {e}")
+            continue
+        status.sort()
+        toggle.sort()
+        print(f"{name:<10} {1000 * connect:>12.1f} {1000 * status[len(status) // 2]:>12.1f} "
+              f"{1000 * toggle[len(toggle) // 2]:>12.1f} {1000 * toggle[-1]:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
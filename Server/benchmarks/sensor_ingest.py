@@ -0,0 +1,81 @@
+# benchmarks/sensor_ingest.py
+"""
+Sensor ingest throughput (rows/s) into a scratch SQLite database:
+one add+commit per reading (the old save_sensor_data path, default rollback
+journal) versus the batched write-behind writer on a WAL database.
+
+Run from the Server folder:
+    python -m benchmarks.sensor_ingest --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from database.models import SensorReading, db
+from database.sqlite import configure_sqlite
+from database.writer import BufferedWriter
+
+
+def make_app(db_path, wal):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        if wal:
+            configure_sqlite(db.engine)
+        db.create_all()
+    return app
+
+
+def reading(i):
+    return {
+        "timestamp": datetime.utcnow(),
+        "temperature_air": 20.0 + i % 10,
+        "humidity_air": 85.0,
+        "temperature_substrate": 21.5,
+        "moisture_substrate": 512
+    }
+
+
+def per_row_commit(app, rows):
+    with app.app_context():
+        start = time.perf_counter()
+        for i in range(rows):
+            db.session.add(SensorReading(**reading(i)))
+            db.session.commit()
+        return time.perf_counter() - start
+
+
+def buffered(app, rows, batch_size):
+    writer = BufferedWriter(SensorReading, batch_size, max_delay=1.0)
+    start = time.perf_counter()
+    for i in range(rows):
+        writer.add(reading(i), app=app)
+    writer.flush()
+    while writer.rows_written < rows:
+        time.sleep(0.001)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_seconds = per_row_commit(make_app(os.path.join(tmp, "legacy.db"), wal=False), args.rows)
+        buffered_seconds = buffered(make_app(os.path.join(tmp, "buffered.db"), wal=True), args.rows, args.batch_size)
+
+    print(f"{'path':<32} {'rows/s':>10}")
+    print(f"{'per-row commit':<32} {args.rows / legacy_seconds:>10.0f}")
+    print(f"{f'buffered (batch {args.batch_size}, WAL)':<32} {args.rows / buffered_seconds:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
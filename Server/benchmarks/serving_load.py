@@ -0,0 +1,295 @@
+# benchmarks/serving_load.py
+"""
+Load test of the serving modes: opens N long-lived MJPEG stream clients and,
+while they are connected, measures per-viewer fps, the latency of a JSON API
+route and, in parallel, of a still capture (a full-resolution encode, like
+/capture_image). It also POSTs JSON and form bodies to a blocking view (the
+body arrives after the headers, as from a slow client) and counts the
+requests that fail. By default it starts a small synthetic server (shared
+frame broadcaster over generated frames, plus those routes) once per serving
+mode; --url points it at a running FungiForge instead.
+
+Run from the Server folder:
+    python -m benchmarks.serving_load --viewers 0 10 25 50 --seconds 5
+    python -m benchmarks.serving_load --url http://raspberrypi.local:5000 --viewers 5 10 \
+        --capture-path "/capture_image?width=1920&height=1080"
+"""
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def serve(mode, port, width, height, camera_fps, still_width, still_height):
+    # Patch first: the synthetic server runs exactly like app.py would
+    from serving import blocking_route, patch_for_gevent, run_server
+    if mode == "gevent":
+        patch_for_gevent()
+
+    import numpy as np
+    from flask import Flask, Response, jsonify, request
+    from camera.encoder import encode_jpeg
+    from camera.streamer import FrameBroadcaster
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height * 3 // 2, width), dtype=np.uint8)
+    still = rng.integers(0, 255, (still_height * 3 // 2, still_width), dtype=np.uint8)
+    state = {"captures": 0}
+
+    def produce():
+        time.sleep(1.0 / camera_fps)
+        state["captures"] += 1
+        return np.roll(base, state["captures"] % width, axis=1)
+
+    def encode(frame, scale):
+        return encode_jpeg(frame, "YUV420")
+
+    broadcaster = FrameBroadcaster(produce, encode, {"high": 1.0})
+    app = Flask(__name__)
+
+    @app.route('/video_feed')
+    def video_feed():
+        def generate():
+            for frame in broadcaster.frames("high"):
+                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n'
+        return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+    @app.route('/capture_image')
+    @blocking_route
+    def capture_image():
+        time.sleep(0.02)  # Waiting for the sensor to deliver the still
+        return Response(encode_jpeg(still, "YUV420"), mimetype='image/jpeg')
+
+    @app.route('/echo', methods=['POST'])
+    @blocking_route
+    def echo():
+        # Like /control/rules (JSON) and /login (form)
+        return jsonify(request.get_json(silent=True) or request.form.to_dict())
+
+    @app.route('/get_sensors')
+    def get_sensors():
+        return jsonify({"threads": threading.active_count(), "captures": state["captures"]})
+
+    run_server(app, '127.0.0.1', port, mode)
+
+
+def _connect(host, port, path):
+    sock = socket.create_connection((host, port), timeout=10)
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    return sock
+
+
+def stream_client(host, port, path, stop, counts, index):
+    try:
+        sock = _connect(host, port, path)
+    except OSError:
+        return
+    tail = b''
+    with sock:
+        while not stop.is_set():
+            try:
+                chunk = sock.recv(65536)
+            except OSError:
+                break
+            if not chunk:
+                break
+            data = tail + chunk
+            counts[index] += data.count(b'--frame')
+            tail = data[-7:]  # a boundary split across two reads is counted once
+
+
+def api_request(host, port, path):
+    """(latency in seconds, response body)"""
+    start = time.perf_counter()
+    response = b''
+    with _connect(host, port, path) as sock:
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    return time.perf_counter() - start, response.partition(b'\r\n\r\n')[2]
+
+
+def post_request(host, port, path, body, content_type):
+    """(latency in seconds, HTTP status). The body is sent separately, after the headers."""
+    start = time.perf_counter()
+    response = b''
+    with socket.create_connection((host, port), timeout=10) as sock:
+        sock.sendall(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode())
+        time.sleep(0.02)
+        sock.sendall(body)
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    return time.perf_counter() - start, int(response.split(b' ', 2)[1])
+
+
+def post_client(host, port, path, stop, results):
+    bodies = [(b'{"name": "bench", "low": 80}', "application/json"),
+              (b'username=bench&password=bench', "application/x-www-form-urlencoded")]
+    while not stop.is_set():
+        body, content_type = bodies[len(results) % len(bodies)]
+        try:
+            results.append(post_request(host, port, path, body, content_type)[1])
+        except (OSError, IndexError, ValueError):
+            results.append(None)
+        time.sleep(0.1)
+
+
+def capture_client(host, port, path, stop, latencies):
+    while not stop.is_set():
+        try:
+            latencies.append(api_request(host, port, path)[0])
+        except OSError:
+            latencies.append(float("inf"))
+        time.sleep(0.2)
+
+
+def percentile(latencies, fraction):
+    return 1000 * latencies[int(fraction * (len(latencies) - 1))] if latencies else float("nan")
+
+
+def run(host, port, stream_path, api_path, capture_path, post_path, viewers, seconds):
+    stop = threading.Event()
+    counts = [0] * viewers
+    clients = [threading.Thread(target=stream_client, args=(host, port, stream_path, stop, counts, i), daemon=True)
+               for i in range(viewers)]
+    for t in clients:
+        t.start()
+    side_stop = threading.Event()
+    capture_latencies = []
+    post_statuses = []
+    side_clients = []
+    if capture_path:
+        side_clients.append(threading.Thread(target=capture_client, args=(host, port, capture_path, side_stop,
+                                                                          capture_latencies), daemon=True))
+    if post_path:
+        side_clients.append(threading.Thread(target=post_client, args=(host, port, post_path, side_stop,
+                                                                       post_statuses), daemon=True))
+    time.sleep(1.0)  # let every stream connect and warm up
+
+    for t in side_clients:
+        t.start()
+    start_counts = list(counts)
+    latencies = []
+    body = b''
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        try:
+            latency, body = api_request(host, port, api_path)
+            latencies.append(latency)
+        except OSError:
+            latencies.append(float("inf"))
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    fps = [(c - s) / elapsed for c, s in zip(counts, start_counts)]
+
+    side_stop.set()
+    for t in side_clients:
+        t.join(timeout=10)
+    stop.set()
+    for t in clients:
+        t.join(timeout=2)
+
+    latencies.sort()
+    capture_latencies.sort()
+    row = {
+        "viewers": viewers,
+        "avg fps": sum(fps) / len(fps) if fps else 0.0,
+        "min fps": min(fps) if fps else 0.0,
+        "api p50 ms": percentile(latencies, 0.5),
+        "api p99 ms": percentile(latencies, 0.99),
+    }
+    if capture_path:
+        row["capture p50"] = percentile(capture_latencies, 0.5)
+        row["capture max"] = percentile(capture_latencies, 1.0)
+    if post_path:
+        row["posts"] = len(post_statuses)
+        row["post errors"] = sum(status != 200 for status in post_statuses)
+    try:
+        # The synthetic server reports its OS thread count
+        row["threads"] = json.loads(body)["threads"]
+    except (ValueError, KeyError, TypeError):
+        pass
+    return row
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on {host}:{port} did not start")
+
+
+def print_table(title, rows):
+    print(title)
+    columns = list(rows[0])
+    print("".join(f"{c:>12}" for c in columns))
+    for row in rows:
+        print("".join(f"{row[c]:>12.1f}" if isinstance(row[c], float) else f"{row[c]:>12}" for c in columns))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[0, 10, 25, 50])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", default=["gevent", "threaded"], help="serving modes to compare")
+    parser.add_argument("--url", help="load test a running server instead of the synthetic one")
+    parser.add_argument("--stream-path", default="/video_feed?quality=low")
+    parser.add_argument("--api-path", default="/get_sensors")
+    parser.add_argument("--capture-path", help="still capture route hit alongside the API (--url only; "
+                                               "the synthetic server always has one)")
+    parser.add_argument("--post-path", help="route POSTed JSON and form bodies alongside the API (--url only; "
+                                            "the synthetic server always has one)")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    parser.add_argument("--still-width", type=int, default=1920)
+    parser.add_argument("--still-height", type=int, default=1080)
+    parser.add_argument("--serve", help=argparse.SUPPRESS)  # internal: run the synthetic server
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.width, args.height, args.camera_fps, args.still_width, args.still_height)
+        return
+
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+        rows = [run(host, port, args.stream_path, args.api_path, args.capture_path, args.post_path, n, args.seconds)
+                for n in args.viewers]
+        print_table(args.url, rows)
+        return
+
+    for mode in args.modes:
+        server = subprocess.Popen([
+            sys.executable, "-m", "benchmarks.serving_load", "--serve", mode, "--port", str(args.port),
+            "--width", str(args.width), "--height", str(args.height), "--camera-fps", str(args.camera_fps),
+            "--still-width", str(args.still_width), "--still-height", str(args.still_height)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_port('127.0.0.1', args.port)
+            rows = [run('127.0.0.1', args.port, "/video_feed", "/get_sensors", "/capture_image", "/echo", n,
+                        args.seconds) for n in args.viewers]
+        finally:
+            server.terminate()
+            server.wait()
+        print_table(f"mode: {mode}", rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/stream_viewers.py
+"""
+Measures per-viewer fps of the shared frame broadcaster as the number of
+simulated /video_feed clients grows. Viewers are spread round-robin over the
+configured renditions; encode work stays constant because each rendition is
+encoded at most once per frame regardless of its subscriber count.
+
+Run from the Server folder:
+    python -m benchmarks.stream_viewers --viewers 1 5 10 20 --seconds 5
+"""
+import argparse
+import time
+from threading import Event, Thread
+
+import numpy as np
+
+from camera.encoder import encode_jpeg
+from camera.streamer import FrameBroadcaster
+from config import STREAM_RENDITIONS
+
+
+def make_producer(width, height, fps):
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height * 3 // 2, width), dtype=np.uint8)
+    state = {"captures": 0}
+
+    def produce():
+        # Pace like a camera and shift the frame so every encode does real work
+        time.sleep(1.0 / fps)
+        state["captures"] += 1
+        return np.roll(base, state["captures"] % width, axis=1)
+
+    def encode(frame, scale):
+        size = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2)
+        return encode_jpeg(frame, "YUV420", size=size)
+
+    return produce, encode, state
+
+
+def run(viewers, seconds, width, height, camera_fps):
+    produce, encode, state = make_producer(width, height, camera_fps)
+    broadcaster = FrameBroadcaster(produce, encode, STREAM_RENDITIONS, idle_timeout=0.5)
+    names = list(STREAM_RENDITIONS)
+    stop = Event()
+    counts = [0] * viewers
+
+    def viewer(index):
+        frames = broadcaster.frames(names[index % len(names)])
+        for _ in frames:
+            counts[index] += 1
+            if stop.is_set():
+                break
+        frames.close()
+
+    threads = [Thread(target=viewer, args=(i,), daemon=True) for i in range(viewers)]
+    for t in threads:
+        t.start()
+
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    encodes = sum(r.encodes for r in broadcaster.renditions.values())
+    return {
+        "viewers": viewers,
+        "capture_fps": state["captures"] / seconds,
+        "encode_fps": encodes / seconds,
+        "min_viewer_fps": min(counts) / seconds,
+        "avg_viewer_fps": sum(counts) / viewers / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 2, 5, 10, 20])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{'viewers':>8} {'capture fps':>12} {'encode fps':>11} {'avg fps':>8} {'min fps':>8}")
+    for n in args.viewers:
+        r = run(n, args.seconds, args.width, args.height, args.camera_fps)
+        print(f"{r['viewers']:>8} {r['capture_fps']:>12.1f} {r['encode_fps']:>11.1f} "
+              f"{r['avg_viewer_fps']:>8.1f} {r['min_viewer_fps']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
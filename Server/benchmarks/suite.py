@@ -0,0 +1,169 @@
+# benchmarks/suite.py
+"""
+Runs the core benchmarks with fixed, laptop-sized parameters and compares
+the results with a stored baseline (benchmarks/baseline.json):
+
+- stream: per-viewer fps of the frame broadcaster at 1 and 10 viewers
+- history: /readings_history latency on a 1M-row table (cursor and page mode)
+- ingest: sensor rows/s through the buffered writer
+- capture: still capture + JPEG encode latency on the simulated camera
+- i2c: servo latency under sensor polling through the bus arbiter (with --i2c)
+
+Every metric is stored as {"value", "unit", "better"}; a metric that is worse
+than its baseline by more than --tolerance is reported as a regression and
+the exit status is 1. Baselines are only comparable on the machine that
+recorded them, so record one per machine with --update-baseline.
+
+Run from the Server folder:
+    python -m benchmarks.suite --update-baseline
+    python -m benchmarks.suite
+    python -m benchmarks.suite --only history ingest --tolerance 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def metric(value, unit, better):
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def bench_stream():
+    from benchmarks import stream_viewers
+    results = {}
+    for viewers in (1, 10):
+        r = stream_viewers.run(viewers, seconds=3.0, width=640, height=480, camera_fps=30.0)
+        results[f"stream.{viewers}_viewers.min_fps"] = metric(r["min_viewer_fps"], "fps", "higher")
+        results[f"stream.{viewers}_viewers.encode_fps"] = metric(r["encode_fps"], "fps", "higher")
+    return results
+
+
+def bench_history(tmp):
+    from benchmarks import history_latency
+    r = history_latency.run(os.path.join(tmp, "history.db"), 1000000, repeat=21)
+    return {
+        f"history.1m.{name}": metric(1000 * r[name], "ms", "lower")
+        for name in ("cursor_first", "cursor_deep", "cursor_total", "page_first", "page_deep")
+    }
+
+
+def bench_ingest(tmp):
+    from benchmarks import sensor_ingest
+    rows = 5000
+    seconds = sensor_ingest.buffered(sensor_ingest.make_app(os.path.join(tmp, "ingest.db"), wal=True), rows, 100)
+    return {"ingest.buffered.rows_per_s": metric(rows / seconds, "rows/s", "higher")}
+
+
+def bench_capture():
+    from benchmarks import capture_latency
+    results = {}
+    for (width, height), (capture, encode, _) in capture_latency.run([(640, 480), (1920, 1080)], repeat=10).items():
+        results[f"capture.{width}x{height}.total_ms"] = metric(1000 * (capture + encode), "ms", "lower")
+    return results
+
+
+def bench_i2c():
+    from benchmarks import i2c_contention
+    from sim.smbus import FakeSMBus
+    bus = FakeSMBus(latency=0.002)
+    r = i2c_contention.run(i2c_contention.ArbiterAccess(bus), bus, readers=8, seconds=3.0, servo_interval=0.05)
+    return {
+        "i2c.arbiter.servo_p95_ms": metric(r["servo p95 ms"], "ms", "lower"),
+        "i2c.arbiter.reads_per_s": metric(r["reads/s"], "reads/s", "higher"),
+    }
+
+
+BENCHMARKS = {
+    "stream": lambda tmp: bench_stream(),
+    "history": bench_history,
+    "ingest": bench_ingest,
+    "capture": lambda tmp: bench_capture(),
+    "i2c": lambda tmp: bench_i2c(),
+}
+
+
+def machine():
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Rows of (name, baseline value, current value, change, status)."""
+    rows = []
+    for name, result in current.items():
+        reference = baseline.get(name)
+        if reference is None:
+            rows.append((name, None, result["value"], None, "new"))
+            continue
+        base = reference["value"]
+        change = (result["value"] - base) / base if base else 0.0
+        worse = change < -tolerance if result["better"] == "higher" else change > tolerance
+        rows.append((name, base, result["value"], change, "REGRESSION" if worse else "ok"))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--i2c", action="store_true", help="also run the I2C arbiter benchmark")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.35, help="allowed relative change before flagging")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    names = args.only or [name for name in BENCHMARKS if name != "i2c" or args.i2c]
+    current = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            print(f"running {name}...", file=sys.stderr)
+            current.update(BENCHMARKS[name](tmp))
+
+    report = {"recorded_at": datetime.now().isoformat(timespec="seconds"), "machine": machine(), "metrics": current}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        for name, result in current.items():
+            print(f"{name:<40} {result['value']:>12.3f} {result['unit']}")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline at {args.baseline}; record one with --update-baseline")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["machine"] != report["machine"]:
+        print(f"warning: baseline was recorded on {baseline['machine']['platform']} "
+              f"({baseline['machine']['cpus']} cpus, Python {baseline['machine']['python']})", file=sys.stderr)
+
+    rows = compare(current, baseline["metrics"], args.tolerance)
+    print(f"{'metric':<40} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for name, base, value, change, status in rows:
+        base_text = f"{base:>10.2f}" if base is not None else f"{'-':>10}"
+        change_text = f"{100 * change:>+7.0f}%" if change is not None else f"{'-':>8}"
+        print(f"{name:<40} {base_text} {value:>10.2f} {change_text}  {status}")
+
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {100 * args.tolerance:.0f}%")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
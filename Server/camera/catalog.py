@@ -0,0 +1,45 @@
+# camera/catalog.py
+from datetime import datetime
+from camera.thumbnails import thumbnail_cache
+from database.models import CapturedImage, db
+from logs.logging_config import logger
+
+
+def record_capture(path, resolution, size_bytes, source, timestamp=None):
+    """Add a saved image to the catalog (or refresh it if the file was overwritten). Needs an app context."""
+    try:
+        image = CapturedImage.query.filter_by(path=path).first()
+        if image:
+            thumbnail_cache.invalidate(image.id)
+        else:
+            image = CapturedImage(path=path)
+            db.session.add(image)
+
+        image.timestamp = timestamp or datetime.utcnow()
+        image.width = resolution[0]
+        image.height = resolution[1]
+        image.size_bytes = size_bytes
+        image.source = source
+        db.session.commit()
+        return image
+    except Exception:
+        db.session.rollback()
+        logger.exception(f"[Catalog] Failed to record {path}")
+        return None
+
+
+def forget_captures(paths):
+    """Remove deleted files from the catalog and the thumbnail cache. Needs an app context."""
+    try:
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            ids = [row.id for row in CapturedImage.query.with_entities(CapturedImage.id)
+                   .filter(CapturedImage.path.in_(chunk))]
+            if ids:
+                CapturedImage.query.filter(CapturedImage.id.in_(ids)).delete(synchronize_session=False)
+            for image_id in ids:
+                thumbnail_cache.invalidate(image_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception(f"[Catalog] Failed to forget {len(paths)} deleted image(s)")
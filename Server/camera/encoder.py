@@ -0,0 +1,120 @@
+# camera/encoder.py
+import struct
+import cv2
+from config import STREAM_JPEG_QUALITY
+
+try:
+    import simplejpeg
+except ImportError:  # Fall back to the OpenCV path below
+    simplejpeg = None
+
+# Picamera2 pixel format -> byte order of each pixel in the captured array
+SIMPLEJPEG_COLORSPACES = {
+    "XBGR8888": "RGBX",
+    "XRGB8888": "BGRX",
+    "BGR888": "RGB",
+    "RGB888": "BGR",
+}
+
+# Clockwise rotation -> EXIF orientation tag value
+EXIF_ORIENTATIONS = {0: 1, 90: 6, 180: 3, 270: 8}
+
+_exif_segments = {}
+
+
+def exif_orientation_segment(rotation):
+    """Minimal APP1/Exif segment carrying only the orientation tag (cached per angle)."""
+    segment = _exif_segments.get(rotation)
+    if segment is None:
+        # Big-endian TIFF header, one IFD entry: 0x0112 Orientation, SHORT, count 1
+        tiff = b'MM\x00\x2a' + struct.pack('>I', 8)
+        tiff += struct.pack('>H', 1)
+        tiff += struct.pack('>HHIHH', 0x0112, 3, 1, EXIF_ORIENTATIONS[rotation], 0)
+        tiff += struct.pack('>I', 0)
+        payload = b'Exif\x00\x00' + tiff
+        segment = b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+        _exif_segments[rotation] = segment
+    return segment
+
+
+def _yuv420_planes(frame, width):
+    # YUV420 arrays are (height * 3/2, stride): full Y plane followed by quarter-size U and V.
+    # The stride may be padded past the visible width, so every plane is cropped (as a view).
+    height = frame.shape[0] * 2 // 3
+    stride = frame.shape[1]
+    quarter = height // 4
+    y = frame[:height, :width]
+    u = frame[height:height + quarter].reshape(height // 2, stride // 2)[:, :width // 2]
+    v = frame[height + quarter:height + 2 * quarter].reshape(height // 2, stride // 2)[:, :width // 2]
+    return y, u, v
+
+
+def _scale_planes(planes, size):
+    # Only the (smaller) output planes are allocated; INTER_AREA averages the source pixels
+    width, height = size
+    y, u, v = planes
+    if (y.shape[1], y.shape[0]) == (width, height):
+        return planes
+    return (
+        cv2.resize(y, (width, height), interpolation=cv2.INTER_AREA),
+        cv2.resize(u, (width // 2, height // 2), interpolation=cv2.INTER_AREA),
+        cv2.resize(v, (width // 2, height // 2), interpolation=cv2.INTER_AREA),
+    )
+
+
+def _encode_opencv(frame, pixel_format, rotation, quality, width, size):
+    # Legacy path: colour conversion, rotation and encode each allocate a full frame
+    if pixel_format == "YUV420":
+        frame_bgr = cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)[:, :width]
+    else:
+        frame_bgr = cv2.cvtColor(frame[:, :width], cv2.COLOR_BGR2RGB)
+
+    if size and (frame_bgr.shape[1], frame_bgr.shape[0]) != tuple(size):
+        frame_bgr = cv2.resize(frame_bgr, tuple(size), interpolation=cv2.INTER_AREA)
+
+    if rotation == 90:
+        frame_bgr = cv2.rotate(frame_bgr, cv2.ROTATE_90_CLOCKWISE)
+    elif rotation == 180:
+        frame_bgr = cv2.rotate(frame_bgr, cv2.ROTATE_180)
+    elif rotation == 270:
+        frame_bgr = cv2.rotate(frame_bgr, cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+    _, buffer = cv2.imencode('.jpg', frame_bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes()
+
+
+def encode_jpeg(frame, pixel_format="XBGR8888", rotation=0, quality=STREAM_JPEG_QUALITY, width=None, size=None):
+    """
+    Encode a camera array straight from its native pixel format.
+
+    With simplejpeg the array is read in place (no RGB copy, no rotated copy)
+    and rotation is expressed as an EXIF orientation tag that browsers apply
+    when displaying the frame. width crops row padding off the buffer and
+    size (width, height) optionally scales the output down.
+    """
+    if width is None:
+        width = frame.shape[1]
+
+    if simplejpeg is None:
+        return _encode_opencv(frame, pixel_format, rotation, quality, width, size)
+
+    if pixel_format == "YUV420":
+        planes = _yuv420_planes(frame, width)
+        if size:
+            planes = _scale_planes(planes, size)
+        jpeg = simplejpeg.encode_jpeg_yuv_planes(*planes, quality=quality)
+    else:
+        image = frame[:, :width]
+        if size and (image.shape[1], image.shape[0]) != tuple(size):
+            image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+        jpeg = simplejpeg.encode_jpeg(
+            image,
+            quality=quality,
+            colorspace=SIMPLEJPEG_COLORSPACES[pixel_format],
+            colorsubsampling='420'
+        )
+
+    if rotation:
+        # Splice the orientation segment right after the SOI marker
+        jpeg = jpeg[:2] + exif_orientation_segment(rotation) + jpeg[2:]
+    return jpeg
@@ -0,0 +1,212 @@
+# camera/motion.py
+"""
+Change detection on the lores stream, so a static chamber costs next to nothing.
+
+Frames are reduced to a small luma image (the Y plane of the YUV420 lores
+buffer, subsampled by MOTION_DOWNSCALE, without copying) and compared with a
+running background: a pixel changed when it is more than
+MOTION_PIXEL_THRESHOLD grey levels away from the background, and the scene
+changed when more than MOTION_AREA_THRESHOLD of the pixels did. The
+background follows slow drifts (light, growth) at MOTION_BACKGROUND_ALPHA per
+frame, and a change keeps the scene "active" for MOTION_HOLD_SECONDS.
+
+The detector is fed by the stream broadcaster while someone watches and by a
+low-rate monitor thread otherwise. Each change event (quiet -> active) is
+published to live_state as the "motion" topic, counted in /metrics and, with
+MOTION_CAPTURE_ENABLED, saves a still.
+"""
+import time
+from datetime import datetime
+from threading import Event, Lock, Thread
+import numpy as np
+from flask import current_app
+from config import (MOTION_DETECTION_ENABLED, MOTION_DOWNSCALE, MOTION_PIXEL_THRESHOLD, MOTION_AREA_THRESHOLD,
+                    MOTION_BACKGROUND_ALPHA, MOTION_HOLD_SECONDS, MOTION_SAMPLE_INTERVAL, MOTION_CAPTURE_ENABLED,
+                    MOTION_CAPTURE_COOLDOWN, MOTION_CAPTURE_RESOLUTION, STILL_JPEG_QUALITY)
+from camera.picam import camera, STILL_PIXEL_FORMAT
+from camera.encoder import encode_jpeg
+from camera.storage import capture_storage
+from live.state import live_state
+from logs.logging_config import logger
+from metrics import registry
+
+FRAMES_ANALYZED = registry.counter("motion_frames_analyzed", "Frames run through the change detector")
+DETECT_SECONDS = registry.histogram("motion_detect_seconds", "Time to run the change detector on one frame",
+                                    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025))
+EVENTS = registry.counter("motion_events", "Change events (scene went from quiet to changing)")
+EVENT_CAPTURES = registry.counter("motion_event_captures", "Stills saved because of a change event")
+
+
+def stream_luma(frame, size, step=MOTION_DOWNSCALE):
+    """Subsampled Y plane of a YUV420 lores frame (a view: no copy)."""
+    width, height = size
+    return frame[:height:step, :width:step]
+
+
+def capture_luma():
+    """Subsampled luma of the current lores frame, copied so it can be kept around."""
+    return stream_luma(camera.capture_stream_frame(), camera.stream_size).copy()
+
+
+class ChangeDetector:
+    def __init__(self, pixel_threshold, area_threshold, alpha, hold_seconds):
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.alpha = alpha
+        self.hold_seconds = hold_seconds
+
+        self.score = 0.0          # Fraction of changed pixels in the last frame
+        self.events = 0
+        self.last_change_at = float("-inf")  # time.monotonic() of the last changed frame
+        self.last_update_at = 0.0
+        self.last_event_time = None  # Wall clock of the last event, for the API
+
+        self._lock = Lock()
+        self._background = None   # float32 running average of the luma
+        self._diff = None         # Scratch buffer, same shape
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """callback(detector) is called (outside the lock) at the start of every change event."""
+        self._listeners.append(callback)
+
+    @property
+    def active(self):
+        return time.monotonic() - self.last_change_at < self.hold_seconds
+
+    def difference(self, a, b):
+        """Fraction of pixels differing by more than pixel_threshold between two luma images."""
+        if a.shape != b.shape:
+            return 1.0
+        diff = np.abs(a.astype(np.int16) - b)
+        return np.count_nonzero(diff > self.pixel_threshold) / diff.size
+
+    def update(self, luma):
+        """Feed one luma frame. Returns True while the scene is active (changed within hold_seconds)."""
+        started = time.perf_counter()
+        event = False
+        with self._lock:
+            now = time.monotonic()
+            was_active = now - self.last_change_at < self.hold_seconds
+            if self._background is None or self._background.shape != luma.shape:
+                # First frame (or the stream size changed): nothing to compare with yet
+                self._background = luma.astype(np.float32)
+                self._diff = np.empty_like(self._background)
+                changed = False
+            else:
+                np.subtract(luma, self._background, out=self._diff)
+                self.score = np.count_nonzero(np.abs(self._diff) > self.pixel_threshold) / self._diff.size
+                changed = self.score > self.area_threshold
+                # background += alpha * (luma - background)
+                self._diff *= self.alpha
+                self._background += self._diff
+            self.last_update_at = now
+            if changed:
+                self.last_change_at = now
+                if not was_active:
+                    event = True
+                    self.events += 1
+                    self.last_event_time = datetime.now()
+            active = changed or was_active
+        FRAMES_ANALYZED.inc()
+        DETECT_SECONDS.observe(time.perf_counter() - started)
+
+        if event:
+            EVENTS.inc()
+            for callback in self._listeners:
+                try:
+                    callback(self)
+                except Exception:
+                    logger.exception("[Motion] Event listener failed")
+        return active
+
+    def observe(self, frame, size):
+        """update() with a raw YUV420 lores frame."""
+        return self.update(stream_luma(frame, size))
+
+    def reset(self):
+        with self._lock:
+            self._background = None
+            self.last_change_at = float("-inf")
+
+    def status(self):
+        return {
+            "enabled": MOTION_DETECTION_ENABLED,
+            "active": self.active,
+            "score": round(float(self.score), 4),
+            "events": self.events,
+            "last_event": self.last_event_time.isoformat() if self.last_event_time else None,
+        }
+
+
+class MotionMonitor:
+    """
+    Keeps the detector fed at MOTION_SAMPLE_INTERVAL when the stream
+    broadcaster is not doing it already, and saves the event captures.
+    """
+
+    def __init__(self, detector, sample_interval, capture_cooldown):
+        self.detector = detector
+        self.sample_interval = sample_interval
+        self.capture_cooldown = capture_cooldown
+
+        self._app = None
+        self._thread = None
+        self._capture_requested = Event()
+        self._last_capture_at = float("-inf")
+
+    def start(self, app):
+        if self._thread is not None:
+            return
+        self._app = app
+        self.detector.subscribe(self._on_event)
+        self._thread = Thread(target=self._run, name="MotionMonitor", daemon=True)
+        self._thread.start()
+        logger.info("[Motion] Change detection started")
+
+    def _on_event(self, detector):
+        live_state.update("motion", detector.status())
+        if MOTION_CAPTURE_ENABLED and time.monotonic() - self._last_capture_at >= self.capture_cooldown:
+            self._last_capture_at = time.monotonic()
+            self._capture_requested.set()
+
+    def _run(self):
+        was_active = False
+        while True:
+            if self._capture_requested.wait(self.sample_interval):
+                self._capture_requested.clear()
+                self._save_capture()
+
+            try:
+                if camera.available and time.monotonic() - self.detector.last_update_at >= self.sample_interval:
+                    self.detector.observe(camera.capture_stream_frame(), camera.stream_size)
+            except Exception:
+                logger.exception("[Motion] Error sampling the stream")
+                time.sleep(1.0)
+
+            active = self.detector.active
+            if was_active and not active:
+                live_state.update("motion", self.detector.status())
+            was_active = active
+
+    def _save_capture(self):
+        try:
+            jpeg = encode_jpeg(camera.capture_still(MOTION_CAPTURE_RESOLUTION), STILL_PIXEL_FORMAT,
+                               quality=STILL_JPEG_QUALITY)
+            filepath = capture_storage.save("motion", jpeg, MOTION_CAPTURE_RESOLUTION, "motion", app=self._app)
+            if filepath:
+                EVENT_CAPTURES.inc()
+                logger.info(f"[Motion] Change detected, saved {filepath}")
+        except Exception:
+            logger.exception("[Motion] Error saving the event capture")
+
+
+motion_detector = ChangeDetector(MOTION_PIXEL_THRESHOLD, MOTION_AREA_THRESHOLD, MOTION_BACKGROUND_ALPHA,
+                                 MOTION_HOLD_SECONDS)
+motion_monitor = MotionMonitor(motion_detector, MOTION_SAMPLE_INTERVAL, MOTION_CAPTURE_COOLDOWN)
+
+
+def start_motion_monitor():
+    """Start function of the "motion" service (runs inside an app context)."""
+    if MOTION_DETECTION_ENABLED:
+        motion_monitor.start(current_app._get_current_object())
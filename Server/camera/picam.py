@@ -1,31 +1,124 @@
-from picamera2 import Picamera2, Preview
-from config import FRAME_RATE, NOISE_REDUCTION_MODE, CAMERA_WIDTH, CAMERA_HEIGHT
+import cv2
+from threading import Lock
+from config import FRAME_RATE, NOISE_REDUCTION_MODE, CAMERA_WIDTH, CAMERA_HEIGHT, STILL_WIDTH, STILL_HEIGHT, CAMERA_BACKEND
 from logs.logging_config import logger
 
-picam2 = None
-video_config = None
-
-try:
-    picam2 = Picamera2()
-    
-    controls = {
-        "FrameRate": FRAME_RATE,
-        "NoiseReductionMode": NOISE_REDUCTION_MODE
-    }
-
-    # Check if autofocus is supported
-    available_controls = picam2.camera_controls
-    if "AfMode" in available_controls:
-        controls["AfMode"] = 2  # Continuous autofocus
-
-    video_config = picam2.create_video_configuration(
-        main={"size": (CAMERA_WIDTH, CAMERA_HEIGHT)},  # <-- here's the size
-        controls=controls
-    )
-
-    picam2.configure(video_config)
-    picam2.start()
-    logger.info("[Camera] Cámara iniciada correctamente.")
-
-except Exception as e:
-    logger.exception("[Camera] No se pudo iniciar la cámara")
\ No newline at end of file
+# Native formats of the two streams, encoded as-is by camera.encoder
+STILL_PIXEL_FORMAT = "XBGR8888"
+STREAM_PIXEL_FORMAT = "YUV420"
+
+
+def _fit_to_size(image, size):
+    """Center-crop to the target aspect ratio, then scale down to size."""
+    width, height = size
+    src_height, src_width = image.shape[:2]
+    if (src_width, src_height) == (width, height):
+        return image
+
+    target_aspect = width / height
+    if src_width / src_height > target_aspect:
+        crop_width = int(round(src_height * target_aspect))
+        x = (src_width - crop_width) // 2
+        image = image[:, x:x + crop_width]
+    else:
+        crop_height = int(round(src_width / target_aspect))
+        y = (src_height - crop_height) // 2
+        image = image[y:y + crop_height]
+
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class Camera:
+    """
+    Single owner of the Picamera2 instance.
+
+    The camera runs one persistent configuration: a high-resolution "main"
+    stream used for stills and timelapse frames, and a low-resolution "lores"
+    stream used for /video_feed. Captures never restart the camera, and all
+    of them are serialized through the same lock.
+    """
+
+    def __init__(self, still_size, stream_size):
+        self.picam2 = None
+        self.still_size = still_size
+        self.stream_size = stream_size
+        self._lock = Lock()
+
+    @property
+    def available(self):
+        return self.picam2 is not None
+
+    def _create_config(self):
+        controls = {
+            "FrameRate": FRAME_RATE,
+            "NoiseReductionMode": NOISE_REDUCTION_MODE
+        }
+
+        # Check if autofocus is supported
+        if "AfMode" in self.picam2.camera_controls:
+            controls["AfMode"] = 2  # Continuous autofocus
+
+        return self.picam2.create_video_configuration(
+            main={"size": self.still_size, "format": STILL_PIXEL_FORMAT},
+            lores={"size": self.stream_size, "format": STREAM_PIXEL_FORMAT},
+            controls=controls
+        )
+
+    def start(self, factory=None):
+        """
+        Open and start the camera. Slow (libcamera), so it runs as a background
+        service. factory overrides the Picamera2 class (benchmarks pass the fake).
+        """
+        try:
+            if factory is None and CAMERA_BACKEND == "sim":
+                from sim.camera import FakePicamera2 as factory
+            elif factory is None:
+                from picamera2 import Picamera2 as factory  # Importing it already probes libcamera
+            self.picam2 = factory()
+            self.picam2.configure(self._create_config())
+            self.picam2.start()
+            logger.info(f"[Camera] Cámara iniciada correctamente (main {self.still_size}, lores {self.stream_size}).")
+        except Exception:
+            self.picam2 = None
+            logger.exception("[Camera] No se pudo iniciar la cámara")
+        return self.available
+
+    def capture_stream_frame(self):
+        """Latest lores frame as a YUV420 array."""
+        with self._lock:
+            return self.picam2.capture_array("lores")
+
+    def capture_still(self, size):
+        """Still from the main stream, cropped/scaled to size. Does not interrupt the live stream."""
+        with self._lock:
+            request = self.picam2.capture_request()
+            try:
+                image = request.make_array("main")
+            finally:
+                request.release()
+
+        if size[0] > self.still_size[0] or size[1] > self.still_size[1]:
+            logger.warning(f"[Camera] Still {size} is larger than the main stream {self.still_size}, upscaling")
+        return _fit_to_size(image, size)
+
+    def set_stream_size(self, size):
+        """Change the lores (stream) size. This is the only operation that restarts the camera."""
+        if size[0] > self.still_size[0] or size[1] > self.still_size[1]:
+            raise ValueError(f"Stream size {size} cannot exceed the still size {self.still_size}")
+
+        with self._lock:
+            previous = self.stream_size
+            self.stream_size = size
+            try:
+                self.picam2.stop()
+                self.picam2.configure(self._create_config())
+            except Exception:
+                self.stream_size = previous
+                self.picam2.configure(self._create_config())
+                raise
+            finally:
+                self.picam2.start()
+
+
+# Started by the "camera" service (see app_factory), not at import
+camera = Camera((STILL_WIDTH, STILL_HEIGHT), (CAMERA_WIDTH, CAMERA_HEIGHT))
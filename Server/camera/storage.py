@@ -0,0 +1,296 @@
+# camera/storage.py
+"""
+Captured images on disk: asynchronous atomic writes and per-area quotas.
+
+Captures hand their encoded JPEG to save() and return right away. A bounded
+queue feeds a single writer thread that writes each file atomically
+(temporary file, fsync, rename), so a slow SD card never holds up the camera
+and a power cut never leaves a half-written JPEG behind. When the queue is
+full the image is dropped and counted instead of blocking the capture.
+
+Each storage area (timelapse frames, manual captures, motion captures) lives
+in <root>/<YYYY-MM-DD>/<HH-MM-SS>.jpg, tracks its own usage and enforces its
+quota after every write:
+- "oldest": delete the oldest images until the area is under its quota
+- "thin": first thin out days older than STORAGE_THIN_AFTER_DAYS down to
+  every STORAGE_THIN_KEEP_EVERY-th frame (once per day), then oldest-first
+Whatever the quotas, an area being written to also evicts oldest-first while
+the filesystem has less than STORAGE_MIN_FREE_MB free, so the database and
+logs never run out of space. Evicted images leave the catalog and the
+thumbnail cache with them.
+"""
+import atexit
+import os
+import queue
+import re
+import shutil
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock, Thread
+from flask import current_app, has_app_context
+from config import (TIMELAPSE_DIR, PICTURES_DIR, MOTION_CAPTURE_DIR, TIMELAPSE_QUOTA_MB, PICTURES_QUOTA_MB,
+                    MOTION_QUOTA_MB, STORAGE_QUEUE_SIZE, STORAGE_MIN_FREE_MB, STORAGE_THIN_AFTER_DAYS,
+                    STORAGE_THIN_KEEP_EVERY)
+from camera.catalog import forget_captures, record_capture
+from logs.logging_config import logger
+from metrics import registry
+
+QUEUE_DEPTH = registry.gauge("storage_queue_depth", "Images waiting to be written")
+WRITE_SECONDS = registry.histogram("storage_write_seconds", "Time to write, fsync and rename one image", ["area"])
+BYTES_WRITTEN = registry.counter("storage_bytes_written", "Image bytes written", ["area"])
+DROPPED = registry.counter("storage_dropped", "Images not saved because the write queue was full", ["area"])
+WRITE_ERRORS = registry.counter("storage_write_errors", "Images that failed to be written", ["area"])
+EVICTED = registry.counter("storage_evicted", "Images deleted to stay under the quota or keep disk space free", ["area", "reason"])
+USAGE = registry.gauge("storage_usage_bytes", "Bytes used by the images of a storage area", ["area"])
+
+DAY_FOLDER = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+THINNED_MARKER = '.thinned'
+
+
+def _existing_parent(path):
+    while not os.path.exists(path):
+        path = os.path.dirname(path)
+    return path
+
+
+class StorageArea:
+    def __init__(self, name, root, quota_bytes, policy="oldest"):
+        self.name = name
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.policy = policy
+
+        self.files = None  # OrderedDict (day, filename) -> size, oldest first; scanned on first use
+        self.bytes = 0
+        self.thinned = set()  # Days already thinned
+        USAGE.labels(name).set_function(lambda: self.bytes)
+
+    def scan(self, remove_partial=False):
+        entries = []
+        self.thinned = set()
+        if os.path.isdir(self.root):
+            for day in os.scandir(self.root):
+                if not (day.is_dir() and DAY_FOLDER.match(day.name)):
+                    continue
+                for entry in os.scandir(day.path):
+                    if entry.name.endswith('.tmp'):
+                        if remove_partial:
+                            os.remove(entry.path)  # Left over by an interrupted write
+                    elif entry.name == THINNED_MARKER:
+                        self.thinned.add(day.name)
+                    elif entry.name.endswith('.jpg') and entry.is_file():
+                        entries.append(((day.name, entry.name), entry.stat().st_size))
+        entries.sort()
+        self.files = OrderedDict(entries)
+        self.bytes = sum(size for _, size in entries)
+
+    def path(self, key):
+        return os.path.join(self.root, *key)
+
+    def add(self, key, size):
+        self.bytes += size - self.files.pop(key, 0)
+        self.files[key] = size
+
+    def remove(self, key):
+        self.bytes -= self.files.pop(key)
+
+
+class CaptureStorage:
+    def __init__(self, areas, queue_size, min_free_bytes, thin_after_days, thin_keep_every):
+        self.areas = {area.name: area for area in areas}
+        self.min_free_bytes = min_free_bytes
+        self.thin_after_days = thin_after_days
+        self.thin_keep_every = thin_keep_every
+
+        self._queue = queue.Queue(queue_size)
+        self._lock = Lock()  # Guards the area indexes (writer thread vs. status())
+        self._app = None
+        self._thread = None
+        QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    def start(self, app):
+        """Start the writer thread; after this, images can be saved from threads without an app context."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._thread = Thread(target=self._run, name="CaptureStorage", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def save(self, area_name, data, resolution, source, timestamp=None, app=None):
+        """
+        Queue an encoded image for <area root>/<date>/<time>.jpg, named after
+        timestamp (local time, now by default). Returns the path it will be
+        written to, or None if the queue is full. The image is added to the
+        catalog (as source, at timestamp) once the file is in place.
+        """
+        if self._thread is None:
+            if app is None and not has_app_context():
+                raise RuntimeError("Capture storage is not started")
+            self.start(app or current_app._get_current_object())
+
+        area = self.areas[area_name]
+        timestamp = timestamp or datetime.now()
+        key = (timestamp.strftime("%Y-%m-%d"), timestamp.strftime("%H-%M-%S") + ".jpg")
+        try:
+            self._queue.put_nowait((area, key, data, resolution, source, timestamp))
+        except queue.Full:
+            DROPPED.labels(area_name).inc()
+            logger.warning(f"[Storage] Write queue full, dropped {area.path(key)}")
+            return None
+        return area.path(key)
+
+    def flush(self):
+        """Block until every queued image is written."""
+        self._queue.join()
+
+    def _run(self):
+        with self._lock:
+            for area in self.areas.values():
+                try:
+                    area.scan(remove_partial=True)
+                except OSError:
+                    logger.exception(f"[Storage] Could not scan {area.root}")
+        logger.info("[Storage] " + ", ".join(
+            f"{area.name} {area.bytes / 1024 / 1024:.0f}/{area.quota_bytes / 1024 / 1024:.0f} MB"
+            for area in self.areas.values() if area.files is not None))
+
+        while True:
+            item = self._queue.get()
+            try:
+                self._write(*item)
+            except Exception:
+                WRITE_ERRORS.labels(item[0].name).inc()
+                logger.exception(f"[Storage] Failed to write {item[0].path(item[1])}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, area, key, data, resolution, source, timestamp):
+        started = time.perf_counter()
+        path = area.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        WRITE_SECONDS.labels(area.name).observe(time.perf_counter() - started)
+        BYTES_WRITTEN.labels(area.name).inc(len(data))
+
+        with self._lock:
+            if area.files is None:
+                area.scan()
+            area.add(key, len(data))
+            evicted = self._enforce(area)
+
+        with self._app.app_context():
+            # The catalog is in UTC; the capture time, not the (possibly much later) write time
+            record_capture(path, resolution, len(data), source,
+                           timestamp=timestamp.astimezone(timezone.utc).replace(tzinfo=None))
+            if evicted:
+                self._delete(area, evicted)
+
+    def _enforce(self, area):
+        """Pick what to evict from area. Returns [(key, reason)]; the files are deleted by the caller."""
+        evicted = []
+        reclaimed = 0
+
+        def evict(key, reason):
+            nonlocal reclaimed
+            reclaimed += area.files[key]
+            area.remove(key)
+            evicted.append((key, reason))
+
+        if area.bytes > area.quota_bytes and area.policy == "thin":
+            for key in self._thin(area):
+                evict(key, "thinned")
+
+        while area.bytes > area.quota_bytes and len(area.files) > 1:
+            evict(next(iter(area.files)), "quota")
+
+        # The files picked so far are still on disk: count them as free already
+        free_bytes = shutil.disk_usage(area.root).free
+        while free_bytes + reclaimed < self.min_free_bytes and len(area.files) > 1:
+            evict(next(iter(area.files)), "disk_full")
+        return evicted
+
+    def _thin(self, area):
+        """
+        Frames to drop so that old days keep every thin_keep_every-th frame,
+        oldest day first, until the thinned days would bring the area under quota.
+        """
+        cutoff = (date.today() - timedelta(days=self.thin_after_days)).isoformat()
+        days = OrderedDict()
+        for key in area.files:
+            if key[0] < cutoff and key[0] not in area.thinned:
+                days.setdefault(key[0], []).append(key)
+
+        evicted = []
+        remaining = area.bytes
+        for day, keys in days.items():
+            if remaining <= area.quota_bytes:
+                break
+            for index, key in enumerate(keys):
+                if index % self.thin_keep_every:
+                    remaining -= area.files[key]
+                    evicted.append(key)
+            area.thinned.add(day)
+            try:
+                open(os.path.join(area.root, day, THINNED_MARKER), 'w').close()
+            except OSError:
+                logger.exception(f"[Storage] Could not mark {day} as thinned")
+        return evicted
+
+    def _delete(self, area, evicted):
+        paths = []
+        for key, reason in evicted:
+            path = area.path(key)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            paths.append(path)
+            EVICTED.labels(area.name, reason).inc()
+        forget_captures(paths)
+        logger.info(f"[Storage] Evicted {len(paths)} image(s) from {area.name} "
+                    f"({area.bytes / 1024 / 1024:.1f} of {area.quota_bytes / 1024 / 1024:.0f} MB used)")
+
+    def status(self):
+        areas = {}
+        with self._lock:
+            for area in self.areas.values():
+                if area.files is None:
+                    area.scan()
+                areas[area.name] = {
+                    "path": area.root,
+                    "policy": area.policy,
+                    "files": len(area.files),
+                    "bytes": area.bytes,
+                    "quota_bytes": area.quota_bytes,
+                    "disk_free_bytes": shutil.disk_usage(_existing_parent(area.root)).free,
+                }
+        return {
+            "queued": self._queue.qsize(),
+            "min_free_bytes": self.min_free_bytes,
+            "areas": areas,
+        }
+
+
+capture_storage = CaptureStorage(
+    [
+        StorageArea("timelapse", TIMELAPSE_DIR, TIMELAPSE_QUOTA_MB * 1024 * 1024, policy="thin"),
+        StorageArea("pictures", PICTURES_DIR, PICTURES_QUOTA_MB * 1024 * 1024),
+        StorageArea("motion", MOTION_CAPTURE_DIR, MOTION_QUOTA_MB * 1024 * 1024),
+    ],
+    STORAGE_QUEUE_SIZE,
+    STORAGE_MIN_FREE_MB * 1024 * 1024,
+    STORAGE_THIN_AFTER_DAYS,
+    STORAGE_THIN_KEEP_EVERY
+)
+
+
+def start_capture_storage(app):
+    capture_storage.start(app)
@@ -0,0 +1,209 @@
+# camera/streamer.py
+import time
+from threading import Lock, Thread
+from logs.logging_config import logger
+from metrics import registry
+from serving import Notifier, run_blocking
+
+CAPTURE_SECONDS = registry.histogram("stream_capture_seconds", "Time to capture one stream frame, including the wait for the sensor")
+ENCODE_SECONDS = registry.histogram("stream_encode_seconds", "Time to encode one frame for a rendition", ["rendition"])
+CAPTURE_ERRORS = registry.counter("stream_capture_errors", "Stream frame captures that raised")
+FRAMES_SKIPPED = registry.counter("stream_frames_skipped", "Captured frames not published because the scene did not change")
+FRAMES_SENT = registry.counter("stream_frames_sent", "Frames delivered to viewers", ["rendition"])
+VIEWERS = registry.gauge("stream_viewers", "Open stream connections", ["rendition"])
+
+
+class Rendition:
+    """
+    One quality level of the stream. The JPEG for a given frame is encoded
+    once (normally by the broadcaster before publishing it) and reused by
+    every subscriber. A viewer asking for an older frame than the cached one
+    gets the newer JPEG.
+    """
+
+    def __init__(self, name, scale):
+        self.name = name
+        self.scale = scale
+        self.subscribers = 0
+        self.encodes = 0
+
+        self._lock = Lock()
+        self._seq = 0
+        self._jpeg = None
+        self._encode_seconds = ENCODE_SECONDS.labels(name)
+        VIEWERS.labels(name).set_function(lambda: self.subscribers)
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def jpeg_for(self, seq, frame, encode):
+        """(seq, JPEG) of the newest encoded frame, encoding frame first if it is newer."""
+        with self._lock:
+            if seq > self._seq:
+                started = time.perf_counter()
+                self._jpeg = encode(frame, self.scale)
+                self._encode_seconds.observe(time.perf_counter() - started)
+                self._seq = seq
+                self.encodes += 1
+            return self._seq, self._jpeg
+
+
+class FrameBroadcaster:
+    """
+    Runs a single capture loop and shares the latest frame with every viewer.
+    Each published frame gets a sequence number so viewers can wait for the
+    next one instead of capturing on their own. Encoding happens at most once
+    per frame and rendition, and only for renditions somebody is watching, on
+    the capture thread before the frame is published: viewers (gevent
+    greenlets included) only wait for it and send the cached JPEG.
+
+    With a detect callable, frames of a static scene are only published every
+    keepalive_interval seconds (and captured every static_interval), so an
+    idle chamber is neither encoded nor sent at the full frame rate.
+    """
+
+    def __init__(self, producer, encode, renditions, idle_timeout=5.0, error_backoff=1.0,
+                 detect=None, keepalive_interval=2.0, static_interval=0.2):
+        # producer() returns a raw frame, or None when nothing should be streamed
+        # encode(frame, scale) returns JPEG bytes for one rendition
+        # detect(frame) returns True when the scene changed
+        self.producer = producer
+        self.encode = encode
+        self.renditions = {name: Rendition(name, scale) for name, scale in renditions.items()}
+        self.idle_timeout = idle_timeout
+        self.error_backoff = error_backoff
+        self.detect = detect
+        self.keepalive_interval = keepalive_interval
+        self.static_interval = static_interval
+        self.skipped = 0
+
+        # Viewers may be OS threads or gevent greenlets
+        self._condition = Notifier()
+        self._frame = None
+        self._seq = 0
+        self._published_at = 0.0
+        self._viewers = 0
+        self._last_viewer_at = 0.0
+        self._thread = None
+        self._thread_lock = Lock()
+
+    @property
+    def viewers(self):
+        return self._viewers
+
+    @property
+    def seq(self):
+        return self._seq
+
+    def _ensure_running(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="FrameBroadcaster", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        logger.info("[Camera Stream] Broadcaster started")
+        while True:
+            with self._thread_lock:
+                with self._condition:
+                    idle = self._viewers == 0 and time.monotonic() - self._last_viewer_at > self.idle_timeout
+                if idle:
+                    # Nobody is watching: stop capturing until the next viewer shows up
+                    self._thread = None
+                    break
+
+            try:
+                started = time.perf_counter()
+                frame = self.producer()
+                if frame is not None:
+                    CAPTURE_SECONDS.observe(time.perf_counter() - started)
+            except Exception:
+                CAPTURE_ERRORS.inc()
+                logger.exception("[Camera Stream] Error capturing frame")
+                time.sleep(self.error_backoff)
+                continue
+
+            if frame is None:
+                time.sleep(0.1)
+                continue
+
+            if self.detect is not None and not self.detect(frame) \
+                    and time.monotonic() - self._published_at < self.keepalive_interval:
+                # Static scene: viewers already have this picture
+                self.skipped += 1
+                FRAMES_SKIPPED.inc()
+                time.sleep(self.static_interval)
+                continue
+
+            self.publish(frame)
+
+        logger.info("[Camera Stream] Broadcaster stopped (no viewers)")
+
+    def publish(self, frame):
+        seq = self._seq + 1  # Only the capture thread publishes
+        for rendition in self.renditions.values():
+            if rendition.subscribers:
+                try:
+                    rendition.jpeg_for(seq, frame, self.encode)
+                except Exception:
+                    # Its viewers retry (and report) the encode themselves
+                    logger.exception(f"[Camera Stream] Error encoding the {rendition.name} rendition")
+        with self._condition:
+            self._frame = frame
+            self._seq = seq
+            self._published_at = time.monotonic()
+            self._condition.notify_all()
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq is available. Returns (seq, frame) or (last_seq, None)."""
+        self._condition.wait_for(lambda: self._seq > last_seq, timeout)
+        with self._condition:
+            if self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._frame
+
+    def frames(self, rendition_name, fps=None):
+        """
+        Generator yielding JPEGs of one rendition for one viewer.
+
+        Delivery is latest-frame-wins: a viewer that is slow (or capped by fps)
+        always gets the newest frame and simply skips the ones in between.
+        """
+        rendition = self.renditions[rendition_name]
+        frames_sent = FRAMES_SENT.labels(rendition_name)
+        min_interval = 1.0 / fps if fps else 0.0
+
+        with self._condition:
+            self._viewers += 1
+            rendition.subscribers += 1
+        self._ensure_running()
+
+        last_seq = self._seq
+        next_due = 0.0
+        try:
+            while True:
+                if min_interval:
+                    delay = next_due - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                last_seq, frame = self.wait_for_frame(last_seq)
+                if frame is None:
+                    # Producer may have stopped while we were waiting on an idle camera
+                    self._ensure_running()
+                    continue
+
+                if rendition.seq >= last_seq:
+                    last_seq, jpeg = rendition.jpeg_for(last_seq, frame, self.encode)  # Cached by publish()
+                else:
+                    # Nobody watched this rendition when the frame was published: encode off the hub
+                    last_seq, jpeg = run_blocking(rendition.jpeg_for, last_seq, frame, self.encode)
+                next_due = time.monotonic() + min_interval
+                frames_sent.inc()
+                yield jpeg
+        finally:
+            with self._condition:
+                self._viewers -= 1
+                rendition.subscribers -= 1
+                self._last_viewer_at = time.monotonic()
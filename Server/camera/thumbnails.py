@@ -0,0 +1,143 @@
+# camera/thumbnails.py
+import io
+import os
+import threading
+from collections import OrderedDict
+from PIL import Image
+from config import THUMBNAIL_CACHE_DIR, THUMBNAIL_CACHE_MAX_MB, THUMBNAIL_MEMORY_CACHE_MB
+from logs.logging_config import logger
+
+
+def make_thumbnail(path, size):
+    """
+    Thumbnail bytes for a JPEG without decoding it at full size: draft() lets
+    libjpeg decode directly at 1/2, 1/4 or 1/8 scale.
+    """
+    with Image.open(path) as image:
+        image.draft('RGB', (size, size))
+        image = image.convert('RGB')
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        image.save(out, format='JPEG', quality=80)
+        return out.getvalue()
+
+
+class ThumbnailCache:
+    """
+    Two-level LRU cache of thumbnails: a small in-memory layer in front of a
+    size-bounded directory on disk. Thumbnails are generated on first request.
+    """
+
+    def __init__(self, cache_dir, max_disk_bytes, max_memory_bytes):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = None  # OrderedDict name -> size, oldest first; loaded lazily
+        self._disk_bytes = 0
+
+    def _load_disk_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.jpg'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        self._disk = OrderedDict((name, size) for _, name, size in entries)
+        self._disk_bytes = sum(size for _, _, size in entries)
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _store_on_disk(self, name, data):
+        path = os.path.join(self.cache_dir, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._disk.pop(name, 0)
+            self._disk[name] = len(data)
+            self._disk_bytes += len(data) - previous
+            evicted = []
+            while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+                old_name, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_name)
+
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.cache_dir, old_name))
+            except FileNotFoundError:
+                pass
+
+    def get(self, image_id, path, size):
+        key = (image_id, size)
+        name = f"{image_id}_{size}.jpg"
+
+        with self._lock:
+            if self._disk is None:
+                self._load_disk_index()
+
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+
+            on_disk = name in self._disk
+            if on_disk:
+                self._disk.move_to_end(name)
+
+        if on_disk:
+            try:
+                disk_path = os.path.join(self.cache_dir, name)
+                with open(disk_path, 'rb') as f:
+                    data = f.read()
+                os.utime(disk_path)  # Keeps LRU order across restarts
+            except FileNotFoundError:
+                data = None
+
+        if data is None:
+            data = make_thumbnail(path, size)
+            try:
+                self._store_on_disk(name, data)
+            except OSError:
+                logger.exception("[Thumbnails] Could not write thumbnail to disk cache")
+
+        with self._lock:
+            if key not in self._memory:
+                self._remember(key, data)
+        return data
+
+    def invalidate(self, image_id):
+        """Forget every cached thumbnail of an image (e.g. after it is deleted)."""
+        prefix = f"{image_id}_"
+        with self._lock:
+            for key in [k for k in self._memory if k[0] == image_id]:
+                self._memory_bytes -= len(self._memory.pop(key))
+            names = [n for n in (self._disk or {}) if n.startswith(prefix)]
+            for name in names:
+                self._disk_bytes -= self._disk.pop(name)
+
+        for name in names:
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+thumbnail_cache = ThumbnailCache(
+    THUMBNAIL_CACHE_DIR,
+    THUMBNAIL_CACHE_MAX_MB * 1024 * 1024,
+    THUMBNAIL_MEMORY_CACHE_MB * 1024 * 1024
+)
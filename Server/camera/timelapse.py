@@ -1,12 +1,20 @@
 # camera/timelapse.py
-import os
-import cv2
 from datetime import datetime
 from threading import Event, Thread
-from config import AVAILABLE_RESOLUTIONS, FRAME_RATE, NOISE_REDUCTION_MODE, TIMELAPSE_DIR
-from camera.picam import picam2, video_config
+from flask import current_app
+from config import (AVAILABLE_RESOLUTIONS, STILL_JPEG_QUALITY, TIMELAPSE_SKIP_UNCHANGED, TIMELAPSE_MAX_SKIPPED,
+                    MOTION_AREA_THRESHOLD)
+from camera.picam import camera, STILL_PIXEL_FORMAT
+from camera.encoder import encode_jpeg
+from camera.timelapse_video import timelapse_video
+from camera.storage import capture_storage
+from camera.motion import capture_luma, motion_detector
 from database.models import TimelapseConfig, db
 from logs.logging_config import logger
+from metrics import registry
+from services import services
+
+FRAMES_SKIPPED = registry.counter("timelapse_frames_skipped", "Timelapse ticks skipped because the scene had not changed")
 
 
 timelapse_thread = None
@@ -58,7 +66,7 @@ def start_timelapse(interval_minutes, width, height):
     timelapse_stop_event.clear()
     timelapse_thread = Thread(
         target=_timelapse_worker,
-        args=(interval_minutes, width, height),
+        args=(current_app._get_current_object(), interval_minutes, width, height),
         daemon=True
     )
     timelapse_thread.start()
@@ -115,7 +123,12 @@ def stop_timelapse():
         return True
     return False
 
-def _timelapse_worker(interval_minutes, width, height):
+def _timelapse_worker(app, interval_minutes, width, height):
+    if not services.wait("camera", timeout=60):
+        logger.warning("[Timelapse] Camera not available yet, frames will fail until it is")
+
+    reference = None  # Lores luma of the last saved frame
+    skipped = 0
     while not timelapse_stop_event.is_set():
         try:
             resolution = (width, height)
@@ -124,47 +137,34 @@ def _timelapse_worker(interval_minutes, width, height):
                 print(f"[Timelapse] Unsupported resolution: {resolution}")
                 break
 
-            # Reconfigure for still capture
-            picam2.stop()
-            controls = {
-                "FrameRate": FRAME_RATE,
-                "NoiseReductionMode": NOISE_REDUCTION_MODE
-            }
-
-            if "AfMode" in picam2.camera_controls:
-                controls["AfMode"] = 2
-
-            still_config = picam2.create_video_configuration(
-                main={"size": resolution},
-                controls=controls
-            )
-            picam2.configure(still_config)
-            picam2.start()
-
-            image = picam2.capture_array()
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-            date_folder = datetime.now().strftime("%Y-%m-%d")
-            save_folder = os.path.join(TIMELAPSE_DIR, date_folder)
-            os.makedirs(save_folder, exist_ok=True)
-
-            timestamp = datetime.now().strftime("%H-%M-%S")
-            filepath = os.path.join(save_folder, f"{timestamp}.jpg")
-
-            cv2.imwrite(filepath, image)
-            print(f"[Timelapse] Saved: {filepath}")
+            if TIMELAPSE_SKIP_UNCHANGED:
+                # Compare with the last saved frame (not the running background), so slow growth still counts
+                luma = capture_luma()
+                if (reference is not None and skipped < TIMELAPSE_MAX_SKIPPED
+                        and motion_detector.difference(reference, luma) <= MOTION_AREA_THRESHOLD):
+                    skipped += 1
+                    FRAMES_SKIPPED.inc()
+                    logger.info(f"[Timelapse] Scene unchanged, frame skipped ({skipped}/{TIMELAPSE_MAX_SKIPPED})")
+                    if timelapse_stop_event.wait(interval_minutes * 60):
+                        break
+                    continue
+                reference, skipped = luma, 0
+
+            # Grab the frame from the main stream; the live stream keeps running
+            jpeg = encode_jpeg(camera.capture_still(resolution), STILL_PIXEL_FORMAT, quality=STILL_JPEG_QUALITY)
+
+            # Written (and catalogued) by the storage writer; the next tick doesn't wait for the SD card
+            now = datetime.now()
+            filepath = capture_storage.save("timelapse", jpeg, resolution, "timelapse", timestamp=now, app=app)
+            if filepath:
+                print(f"[Timelapse] Saved: {filepath}")
+
+            # Extend today's video segment in the background
+            timelapse_video.append(now.strftime("%Y-%m-%d"), resolution, jpeg)
 
         except Exception as e:
             logger.exception("[Timelapse] Error capturing image")
 
-        finally:
-            try:
-                picam2.stop()
-                picam2.configure(video_config)
-                picam2.start()
-            except Exception as e:
-                logger.exception("[Timelapse] Error restoring camera configuration")
-
         if timelapse_stop_event.wait(interval_minutes * 60):
             break
 
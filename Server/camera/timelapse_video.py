@@ -0,0 +1,214 @@
+# camera/timelapse_video.py
+import os
+import queue
+import re
+import struct
+import threading
+from config import TIMELAPSE_DIR, TIMELAPSE_VIDEO_FPS
+from logs.logging_config import logger
+
+VIDEO_DIR = os.path.join(TIMELAPSE_DIR, "video")
+
+# Each index entry is (offset, length) of one JPEG inside the segment's .mjpeg file
+INDEX_ENTRY = struct.Struct('<QI')
+SEGMENT_NAME = re.compile(r'^(\d{4}-\d{2}-\d{2})_(\d+)x(\d+)\.idx$')
+
+# RIFF sizes are 32-bit; keep some headroom below 4 GiB
+MAX_AVI_BYTES = 0xFFFFFFFF - (1 << 20)
+
+
+def _segment_base(date, resolution):
+    return os.path.join(VIDEO_DIR, f"{date}_{resolution[0]}x{resolution[1]}")
+
+
+def read_index(date, resolution):
+    """List of (offset, length) for every frame appended to a daily segment."""
+    path = _segment_base(date, resolution) + ".idx"
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        data = f.read()
+    usable = len(data) - len(data) % INDEX_ENTRY.size
+    return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+
+def _index_end(path):
+    """Byte offset right after the last indexed frame, reading only the last entry."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        usable = f.tell() - f.tell() % INDEX_ENTRY.size
+        if usable == 0:
+            return 0
+        f.seek(usable - INDEX_ENTRY.size)
+        offset, length = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))
+    return offset + length
+
+
+def list_segments():
+    """Sorted (date, (width, height), frame_count) of every daily segment on disk."""
+    if not os.path.isdir(VIDEO_DIR):
+        return []
+
+    segments = []
+    for name in sorted(os.listdir(VIDEO_DIR)):
+        match = SEGMENT_NAME.match(name)
+        if match:
+            date, width, height = match.group(1), int(match.group(2)), int(match.group(3))
+            count = os.path.getsize(os.path.join(VIDEO_DIR, name)) // INDEX_ENTRY.size
+            segments.append((date, (width, height), count))
+    return segments
+
+
+class TimelapseVideoAssembler:
+    """
+    Appends every timelapse frame to a per-day MJPEG segment as soon as it is
+    captured, on a low-priority background thread.
+
+    A segment is an append-only .mjpeg file plus an .idx file of frame
+    offsets. Videos are produced by wrapping segments in an AVI container at
+    request time, which only reads the frames it sends: nothing is re-encoded
+    and no capture folder is ever re-scanned. The whole-run video is built from
+    the daily indexes, so no frame is stored twice.
+    """
+
+    def __init__(self, max_pending=100, niceness=10):
+        self.niceness = niceness
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def append(self, date, resolution, jpeg):
+        """Queue a frame for its daily segment. Never blocks the capture thread."""
+        self._ensure_running()
+        try:
+            self._queue.put_nowait((date, tuple(resolution), jpeg))
+        except queue.Full:
+            logger.warning(f"[Timelapse Video] Queue full, frame for {date} not added to the video")
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="TimelapseVideo", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            # Linux applies the nice value per thread (native id), leaving the stream untouched
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.niceness)
+        except (AttributeError, OSError):
+            pass
+
+        while True:
+            date, resolution, jpeg = self._queue.get()
+            try:
+                self._append_frame(date, resolution, jpeg)
+            except Exception:
+                logger.exception("[Timelapse Video] Error appending frame")
+
+    def _append_frame(self, date, resolution, jpeg):
+        os.makedirs(VIDEO_DIR, exist_ok=True)
+        base = _segment_base(date, resolution)
+
+        end = _index_end(base + ".idx")
+
+        with open(base + ".mjpeg", 'ab') as f:
+            # Drop any tail left by a crash between the frame and index writes
+            if f.tell() != end:
+                f.truncate(end)
+                f.seek(end)
+            f.write(jpeg)
+
+        with open(base + ".idx", 'ab') as f:
+            f.write(INDEX_ENTRY.pack(end, len(jpeg)))
+
+
+def _avi_header(frame_count, movi_size, resolution, fps, max_frame):
+    width, height = resolution
+    micro_sec_per_frame = int(1000000 / fps)
+
+    avih = struct.pack(
+        '<IIIIIIIIII16x',
+        micro_sec_per_frame, min(max_frame * fps, 0xFFFFFFFF), 0, 0x10,  # AVIF_HASINDEX
+        frame_count, 0, 1, max_frame, width, height
+    )
+    strh = struct.pack(
+        '<4s4sIHHIIIIIIIIhhhh',
+        b'vids', b'MJPG', 0, 0, 0, 0, 1, fps, 0, frame_count,
+        max_frame, 0xFFFFFFFF, 0, 0, 0, width, height
+    )
+    strf = struct.pack(
+        '<IiiHH4sIiiII',
+        40, width, height, 1, 24, b'MJPG', width * height * 3, 0, 0, 0, 0
+    )
+
+    strl = b'strl' + b'strh' + struct.pack('<I', len(strh)) + strh + b'strf' + struct.pack('<I', len(strf)) + strf
+    hdrl = b'hdrl' + b'avih' + struct.pack('<I', len(avih)) + avih + b'LIST' + struct.pack('<I', len(strl)) + strl
+
+    idx1_size = 16 * frame_count
+    riff_size = 4 + (8 + len(hdrl)) + (8 + movi_size) + (8 + idx1_size)
+
+    return (
+        b'RIFF' + struct.pack('<I', riff_size) + b'AVI '
+        + b'LIST' + struct.pack('<I', len(hdrl)) + hdrl
+        + b'LIST' + struct.pack('<I', movi_size) + b'movi'
+    ), riff_size + 8
+
+
+def build_avi(segments, resolution, fps=TIMELAPSE_VIDEO_FPS, step=1):
+    """
+    Plan an MJPEG AVI made of the given daily segments (list of dates).
+
+    Returns (total_size, chunks) where chunks is a generator streaming the
+    file. Only the index files are read up front; frames are read one at a
+    time while streaming. The step is raised automatically if the result
+    would not fit the 32-bit RIFF limit.
+    """
+    frames = []
+    for date in segments:
+        path = _segment_base(date, resolution) + ".mjpeg"
+        frames.extend((path, offset, length) for offset, length in read_index(date, resolution))
+
+    while True:
+        selected = frames[::step]
+        movi_size = 4 + sum(8 + length + (length & 1) for _, _, length in selected)
+        if movi_size + 16 * len(selected) < MAX_AVI_BYTES:
+            break
+        step += 1
+
+    max_frame = max((length for _, _, length in selected), default=0)
+    header, total_size = _avi_header(len(selected), movi_size, resolution, fps, max_frame)
+
+    def chunks():
+        yield header
+
+        current_path, f = None, None
+        try:
+            for path, offset, length in selected:
+                # Frames are ordered by segment, so only one file is open at a time
+                if path != current_path:
+                    if f:
+                        f.close()
+                    current_path, f = path, open(path, 'rb')
+                f.seek(offset)
+                yield b'00dc' + struct.pack('<I', length) + f.read(length) + (b'\x00' if length & 1 else b'')
+        finally:
+            if f:
+                f.close()
+
+        yield b'idx1' + struct.pack('<I', 16 * len(selected))
+        position = 4  # idx1 offsets are relative to the 'movi' fourcc
+        entries = []
+        for _, _, length in selected:
+            entries.append(struct.pack('<4sIII', b'00dc', 0x10, position, length))  # AVIIF_KEYFRAME
+            position += 8 + length + (length & 1)
+            if len(entries) == 1024:
+                yield b''.join(entries)
+                entries = []
+        yield b''.join(entries)
+
+    return total_size, chunks()
+
+
+timelapse_video = TimelapseVideoAssembler()
@@ -15,15 +15,73 @@ class SmartPlugConfig:
     country_code: str = ""
     api_schema: str = ""
 
+# Web server: "gevent" holds many /video_feed and /events clients without a thread each
+# (falls back to "threaded" if gevent is not installed); "threaded" is Flask's development server
+SERVER_MODE = "gevent"
+
+# Hardware backends: "sim" swaps in the simulated drivers from sim/ (synthetic camera frames,
+# fake Arduinos on the I2C bus), so the server runs and can be benchmarked on any machine.
+# The smart plug has its own SMARTPLUG_BACKEND ("sim" for the fake plug).
+CAMERA_BACKEND = "picamera2"   # "picamera2" or "sim"
+I2C_BACKEND = "smbus"          # "smbus" or "sim"
+SIM_I2C_LATENCY = 0.002        # Seconds per simulated I2C transaction
+SIM_I2C_ERROR_RATE = 0.0       # Fraction of simulated transactions failing with a bus error
+SIM_PLUG_LATENCY = 0.005       # Seconds per simulated plug round trip
+
+# API authentication: the API routes accept a logged-in session or an OAuth2 bearer token
+API_AUTH_REQUIRED = True
+TOKEN_CACHE_SIZE = 1024   # Validated tokens kept in memory (0 disables the cache)
+TOKEN_CACHE_TTL = 60      # Seconds before a cached token is checked against the database again
+
 # Logging
 LOG_FILE_PATH = "/home/pi/Desktop/logs/server.log"
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the log file at this size...
+LOG_BACKUP_COUNT = 5             # ...keeping this many old files
+LOG_QUEUE_SIZE = 10000           # Records waiting for the log writer thread; more are dropped
+LOG_REPEAT_SECONDS = 60          # Identical warnings/errors within this window are logged once (0 = log all)
+
+# Error log (ErrorLog table): errors are written in the background, and repeats of the
+# same error are folded into one row with a count and first/last seen times
+ERROR_LOG_FLUSH_SECONDS = 5.0    # How often pending errors are written
+ERROR_LOG_DEDUP_SECONDS = 3600   # Repeats within this window update the existing row
+ERROR_LOG_MAX_PENDING = 1000     # Distinct errors waiting to be written; more are dropped
 
-CAMERA_WIDTH = 640
+CAMERA_WIDTH = 640           # Live stream (lores) size
 CAMERA_HEIGHT = 480
 
+# Still/timelapse (main stream) size. Stills are cropped/scaled down from it,
+# so it should be the largest resolution you capture. Lower = higher stream fps.
+STILL_WIDTH = 2592
+STILL_HEIGHT = 1944
+STILL_JPEG_QUALITY = 95      # JPEG quality (1-100) for stills and timelapse frames
+
 #timelapse folder
 TIMELAPSE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '/home/pi/Desktop/timelapse'))
+TIMELAPSE_VIDEO_FPS = 24     # Playback rate of the assembled timelapse videos
+TIMELAPSE_VIDEO_MAX_FPS = 120  # Highest ?fps= accepted by /timelapse/video (larger values are clamped)
+TIMELAPSE_SKIP_UNCHANGED = True  # Skip ticks whose scene matches the last saved frame (see MOTION_* below)...
+TIMELAPSE_MAX_SKIPPED = 12       # ...but never more than this many in a row
+
+# Manual captures (/capture_image)
+PICTURES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../Pictures'))
+
+# Capture storage: images are written by a background writer through a bounded queue,
+# and each folder is kept under its quota (oldest images go first)
+TIMELAPSE_QUOTA_MB = 8000
+PICTURES_QUOTA_MB = 2000
+MOTION_QUOTA_MB = 1000
+STORAGE_QUEUE_SIZE = 32          # Images waiting to be written; more are dropped
+STORAGE_MIN_FREE_MB = 500        # Evict oldest images while the disk has less free space than this
+STORAGE_THIN_AFTER_DAYS = 7      # Over quota, timelapse days older than this are thinned out first...
+STORAGE_THIN_KEEP_EVERY = 4      # ...keeping every Nth frame
+
+# Gallery thumbnails (generated on first request, LRU cached in memory and on disk)
+THUMBNAIL_SIZE = 320                 # Default longest side, in pixels
+THUMBNAIL_SIZE_MAX = 1024            # Largest ?size= accepted (larger values are clamped)
+THUMBNAIL_CACHE_DIR = '/home/pi/Desktop/thumbnails'
+THUMBNAIL_CACHE_MAX_MB = 200         # Disk cache limit
+THUMBNAIL_MEMORY_CACHE_MB = 16       # In-memory cache limit
 
 # List of available camera resolutions (width, height)
 AVAILABLE_RESOLUTIONS = [
@@ -42,23 +100,80 @@ ARDUINO_SENSORS = 0x20       # I2C address for sensor readings
 INVERT_PAN_AXIS = False      # Set to True to invert pan axis
 INVERT_TILT_AXIS = False     # Set to True to invert tilt axis
 
+# Servo controller: /send_pan_tilt only sets a target, written out in the background
+SERVO_MAX_WRITE_RATE = 20    # Max servo writes per second
+SERVO_MAX_STEP = 0           # Max degrees per write for smooth moves (0 = jump straight to the target)
+
 # I2C bus configuration
 I2C_BUS_ID = 1               # Default I2C bus on Raspberry Pi
+I2C_TRANSACTION_TIMEOUT = 0.5  # Seconds a caller waits for its transaction (queue + bus time)
+I2C_RETRIES = 2              # Extra attempts after a failed transaction
 
 # Camera settings
 FRAME_RATE = 60              # Camera frame rate (FPS)
 NOISE_REDUCTION_MODE = 2     # Camera noise reduction mode
+STREAM_JPEG_QUALITY = 80     # JPEG quality (1-100) for the live stream
+
+# Stream renditions for /video_feed?quality=..., as a scale of the stream size.
+# Each rendition is encoded at most once per frame, and only while someone watches it.
+STREAM_RENDITIONS = {
+    "low": 0.25,
+    "med": 0.5,
+    "high": 1.0,
+}
+DEFAULT_STREAM_RENDITION = "high"
+
+# Change detection on the lores stream (downscaled luma against a running background)
+MOTION_DETECTION_ENABLED = True
+MOTION_DOWNSCALE = 4             # Use every Nth pixel of every Nth row
+MOTION_PIXEL_THRESHOLD = 25      # Grey levels a pixel must move to count as changed
+MOTION_AREA_THRESHOLD = 0.01     # Fraction of changed pixels for the scene to count as changed
+MOTION_BACKGROUND_ALPHA = 0.05   # How fast the background follows the scene (per analyzed frame)
+MOTION_HOLD_SECONDS = 3.0        # The scene stays "active" this long after the last change
+MOTION_SAMPLE_INTERVAL = 0.2     # Seconds between analyzed frames while the scene is static
+STREAM_KEEPALIVE_SECONDS = 2.0   # A static scene is streamed at one frame per this many seconds (0 = always full rate)
+MOTION_CAPTURE_ENABLED = True    # Save a still at the start of every change event...
+MOTION_CAPTURE_COOLDOWN = 60     # ...at most once per this many seconds
+MOTION_CAPTURE_RESOLUTION = (1280, 720)
+MOTION_CAPTURE_DIR = '/home/pi/Desktop/motion'
 
 # Flags and intervals for reading sensors and servos and store in database
 READ_SENSORS = True         # Enable/disable periodic sensor reading
 READ_SERVOS = True          # Enable/disable periodic servo reading
 READ_SENSORS_INTERVAL = 0.1  # Interval (seconds) for sensor polling
 READ_SERVOS_INTERVAL = 0.1   # Interval (seconds) for servo polling
-SENSOR_LOG_INTERVAL = '1m'  # Options: '10s', '30s', '1m', '5m', '1h'
+SENSOR_LOG_INTERVAL = '1m'  # Options: '100ms', '0.5s', '10s', '30s', '1m', '5m', '1h'
+
+# Environmental control: rules (managed through /control/rules) switch the smart plug
+# from every live sensor sample
+CONTROL_ENABLED = True
 ENABLE_SENSOR_LOGGER = True
 
+# Sensor readings are buffered and written in batches (one commit per batch)
+SENSOR_WRITE_BATCH_SIZE = 100   # Flush when this many readings are pending...
+SENSOR_WRITE_MAX_DELAY = 5.0    # ...or when the oldest pending reading is this many seconds old
+
+# Retention: raw readings older than this are archived to daily CSV.gz files and
+# removed from SQLite (minute/hour/day rollups are kept). Error logs are just deleted.
+RETENTION_ENABLED = True
+SENSOR_RETENTION_DAYS = 90
+ERROR_LOG_RETENTION_DAYS = 30
+ARCHIVE_DIR = '/home/pi/Desktop/archive'
+RETENTION_BATCH_SIZE = 5000     # Rows archived/deleted per transaction
+RETENTION_INTERVAL_HOURS = 24
+
+# SQLite tuning (the database always runs in WAL mode)
+SQLITE_SYNCHRONOUS = "NORMAL"   # NORMAL (fsync at checkpoints) or FULL (fsync every commit)
+
 # Smart Plug Configuration (TinyTuya)
+# Backend: "auto" (LAN when SMARTPLUG_IP/LOCAL_KEY are set, Tuya cloud as fallback),
+# "local", "cloud" or "sim" (in-memory fake plug). Nothing connects until first use.
+SMARTPLUG_BACKEND = "auto"
+SMARTPLUG_TIMEOUT = 2          # Seconds per LAN request before reconnecting
+SMARTPLUG_STATUS_TTL = 5       # Seconds the plug status is served from cache (toggles update it immediately)
+SMARTPLUG_INFO_TTL = 3600      # Seconds the device info is served from cache
 SMARTPLUG_DEVICE_ID = ''     # Tuya device ID
 SMARTPLUG_IP = ''                    # Smart plug IP address
 SMARTPLUG_LOCAL_KEY = ''               # Local key for device authentication
-SMARTPLUG_PROTOCOL_VERSION = x.x                # Tuya protocol version
\ No newline at end of file
+SMARTPLUG_PROTOCOL_VERSION = x.x                # Tuya protocol version
+SMARTPLUG_POLL_INTERVAL = 10   # Seconds between plug state polls for the /events stream (0 disables)
\ No newline at end of file
@@ -0,0 +1,211 @@
+# control/engine.py
+import queue
+import threading
+import time
+from collections import deque
+from logs.logging_config import logger
+
+MODES = ("raise", "lower")
+
+# After a failed switch the output is unknown; wait this long before trying again
+RETRY_SECONDS = 30
+
+# read_sensors() keys -> metric names used by the database and the rules
+READING_METRICS = {
+    "temperature_dht": "temperature_air",
+    "humidity": "humidity_air",
+    "temperature_ds18b20": "temperature_substrate",
+    "soil_moisture": "moisture_substrate",
+}
+
+
+def sample_from_reading(reading):
+    """Metric dict from a read_sensors() result, or None for a failed read (all zeros)."""
+    if not any(reading.values()):
+        return None
+    return {metric: reading[key] for key, metric in READING_METRICS.items() if key in reading}
+
+
+class MovingAverage:
+    """Time-windowed mean with a running sum: O(1) amortized per sample."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._samples = deque()
+        self._sum = 0.0
+
+    def add(self, now, value):
+        if not self.seconds:
+            return value
+        self._samples.append((now, value))
+        self._sum += value
+        while self._samples[0][0] <= now - self.seconds:
+            _, old = self._samples.popleft()
+            self._sum -= old
+        return self._sum / len(self._samples)
+
+
+class Rule:
+    """
+    Hysteresis band with minimum on/off times.
+
+    "raise" rules (humidifier, heater) switch on when the averaged metric
+    drops below low and off once it exceeds high; "lower" rules (fan) do the
+    opposite. Inside the band the output is held. A switch is only allowed
+    once the output has been in its current state for min_on/min_off seconds.
+    """
+
+    def __init__(self, id, name, metric, mode, low, high, average_seconds=0, min_on_seconds=0,
+                 min_off_seconds=0, target="smartplug", enabled=True):
+        self.id = id
+        self.name = name
+        self.metric = metric
+        self.mode = mode
+        self.low = low
+        self.high = high
+        self.min_on_seconds = min_on_seconds
+        self.min_off_seconds = min_off_seconds
+        self.target = target
+        self.enabled = enabled
+
+        self.average = MovingAverage(average_seconds)
+        self.value = None
+        self.on = None  # Unknown until the rule first switches
+        self.last_switch = float("-inf")
+
+    @classmethod
+    def from_model(cls, row):
+        return cls(row.id, row.name, row.metric, row.mode, row.low, row.high, row.average_seconds,
+                   row.min_on_seconds, row.min_off_seconds, row.target, row.enabled)
+
+    def evaluate(self, now, value):
+        """New output (True/False) if the rule switches on this sample, else None."""
+        self.value = self.average.add(now, value)
+
+        if self.mode == "raise":
+            want = True if self.value < self.low else False if self.value > self.high else None
+        else:
+            want = True if self.value > self.high else False if self.value < self.low else None
+
+        if want is None or want == self.on:
+            return None
+        held = now - self.last_switch
+        if self.on is None and held < RETRY_SECONDS:
+            return None
+        if (self.on is True and held < self.min_on_seconds) or (self.on is False and held < self.min_off_seconds):
+            return None
+
+        self.on = want
+        self.last_switch = now
+        return want
+
+
+class ControlEngine:
+    """
+    Evaluates every rule on each new sensor sample, entirely in memory.
+
+    Actions are handed to actuator(target, on) on a separate thread, so a
+    slow plug never delays sampling. Without an actuator (replay), feed()
+    just returns the actions.
+    """
+
+    def __init__(self, actuator=None):
+        self.actuator = actuator
+        self.rules = []
+        self.samples = 0
+        self.actions = 0
+        self.eval_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._actions = queue.Queue()
+        self._thread = None
+
+    def load(self, rules):
+        """Replace the rule set, keeping the runtime state of rules that still exist."""
+        with self._lock:
+            previous = {rule.id: rule for rule in self.rules}
+            for rule in rules:
+                old = previous.get(rule.id)
+                if old is not None and old.target == rule.target:
+                    rule.on, rule.last_switch = old.on, old.last_switch
+            self.rules = rules
+
+    def feed(self, sample, now=None):
+        """Run one sample (metric -> value) through the rules. Returns [(rule, on), ...]."""
+        now = time.monotonic() if now is None else now
+        actions = []
+        with self._lock:
+            start = time.perf_counter()
+            for rule in self.rules:
+                if rule.enabled and rule.metric in sample:
+                    decision = rule.evaluate(now, sample[rule.metric])
+                    if decision is not None:
+                        actions.append((rule, decision))
+            self.eval_seconds += time.perf_counter() - start
+            self.samples += 1
+            self.actions += len(actions)
+
+        if self.actuator:
+            for rule, on in actions:
+                logger.info(f"[Control] Rule '{rule.name}' turns {rule.target} {'on' if on else 'off'} "
+                            f"({rule.metric} {rule.value:.2f})")
+                self._dispatch(rule, on)
+        return actions
+
+    def _dispatch(self, rule, on):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run_actions, name="ControlActions", daemon=True)
+                self._thread.start()
+        self._actions.put((rule, on))
+
+    def _run_actions(self):
+        while True:
+            rule, on = self._actions.get()
+            try:
+                self.actuator(rule.target, on)
+            except Exception:
+                logger.exception(f"[Control] Rule '{rule.name}' could not switch {rule.target}")
+                with self._lock:
+                    # Unknown output: the next sample out of the band tries again
+                    if rule.on == on:
+                        rule.on = None
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "samples": self.samples,
+                "actions": self.actions,
+                "avg_eval_us": round(1e6 * self.eval_seconds / self.samples, 3) if self.samples else None,
+                "rules": [
+                    {
+                        "id": rule.id,
+                        "name": rule.name,
+                        "enabled": rule.enabled,
+                        "value": rule.value,
+                        "on": rule.on,
+                        "seconds_since_switch": round(now - rule.last_switch, 1) if rule.on is not None else None,
+                    }
+                    for rule in self.rules
+                ],
+            }
+
+
+def plug_actuator(target, on):
+    from smart import turn_on, turn_off
+    from live.state import live_state
+
+    if target != "smartplug":
+        raise ValueError(f"Unknown control target: {target}")
+    (turn_on if on else turn_off)()
+    live_state.update("smartplug", {"status": on})
+
+
+control_engine = ControlEngine(actuator=plug_actuator)
+
+
+def reload_rules():
+    """Load the persisted rules into the engine. Needs an app context."""
+    from database.models import ControlRule
+    control_engine.load([Rule.from_model(row) for row in ControlRule.query.order_by(ControlRule.id).all()])
@@ -0,0 +1,102 @@
+# control/replay.py
+"""
+Replays recorded sensor history through the control rules at full speed,
+using the readings' own timestamps as the clock. Nothing is switched: the
+output is the list of actions the rules would have taken.
+
+Run from the Server folder:
+    python -m control.replay --start 2025-01-01 --end 2025-02-01
+    python -m control.replay --rules my_rules.json --archive
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import select
+
+from control.engine import ControlEngine, Rule
+from database.models import ControlRule, SensorReading, db
+from database.retention import read_archived_readings
+from database.rollups import METRICS
+
+
+def replay(rules, samples):
+    """
+    Feed (timestamp, {metric: value}) samples through a fresh engine.
+    Returns (engine, [(timestamp, rule, on), ...]).
+    """
+    engine = ControlEngine()
+    engine.load(rules)
+    events = []
+    for timestamp, sample in samples:
+        for rule, on in engine.feed(sample, now=timestamp.timestamp()):
+            events.append((timestamp, rule, on))
+    return engine, events
+
+
+def history_samples(start=None, end=None, include_archive=False):
+    """Recorded readings as (timestamp, sample), oldest first, streamed from the archive and the database."""
+    if include_archive:
+        for row in read_archived_readings(start, end):
+            yield row["timestamp"], {metric: row[metric] for metric in METRICS}
+
+    statement = select(SensorReading.timestamp, *(getattr(SensorReading, m) for m in METRICS))
+    if start:
+        statement = statement.where(SensorReading.timestamp >= start)
+    if end:
+        statement = statement.where(SensorReading.timestamp < end)
+    statement = statement.order_by(SensorReading.timestamp, SensorReading.id).execution_options(yield_per=5000)
+    for row in db.session.execute(statement):
+        yield row[0], dict(zip(METRICS, row[1:]))
+
+
+def make_app():
+    app = Flask(__name__)
+    db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'app.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help="YYYY-MM-DD")
+    parser.add_argument("--end", help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--archive", action="store_true", help="include archived readings")
+    parser.add_argument("--rules", help="JSON file with a list of rules instead of the saved ones")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d") if args.start else None
+    end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+
+    with make_app().app_context():
+        if args.rules:
+            with open(args.rules) as f:
+                rules = [Rule(id=i, **spec) for i, spec in enumerate(json.load(f), start=1)]
+        else:
+            rules = [Rule.from_model(row) for row in ControlRule.query.order_by(ControlRule.id).all()]
+        if not rules:
+            parser.error("no rules to replay")
+
+        started = time.perf_counter()
+        engine, events = replay(rules, history_samples(start, end, args.archive))
+        elapsed = time.perf_counter() - started
+
+    if not args.quiet:
+        for timestamp, rule, on in events:
+            print(f"{timestamp.isoformat(sep=' ', timespec='seconds')}  {rule.name:<24} {rule.target} {'ON' if on else 'OFF'}")
+
+    print(f"\n{engine.samples} samples in {elapsed:.2f}s ({engine.samples / elapsed if elapsed else 0:.0f} samples/s), "
+          f"{1e6 * engine.eval_seconds / max(engine.samples, 1):.2f} us per evaluation")
+    for rule in rules:
+        switches = sum(1 for _, r, _ in events if r is rule)
+        print(f"{rule.name:<24} {switches} switches")
+
+
+if __name__ == '__main__':
+    main()
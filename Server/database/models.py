@@ -13,6 +13,29 @@ class SensorReading(db.Model):
     temperature_substrate = db.Column(db.Float, nullable=False)
     moisture_substrate = db.Column(db.Float, nullable=False)
 
+    __table_args__ = (
+        # Serves time-range filters and the (timestamp, id) keyset order of /readings_history
+        db.Index('ix_sensor_reading_timestamp_id', 'timestamp', 'id'),
+    )
+
+class SensorRollup(db.Model):
+    """Per-bucket min/max/sum/count of every reading metric, kept up to date at ingest."""
+    resolution = db.Column(db.String(10), primary_key=True)  # 'minute', 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    temperature_air_min = db.Column(db.Float, nullable=False)
+    temperature_air_max = db.Column(db.Float, nullable=False)
+    temperature_air_sum = db.Column(db.Float, nullable=False)
+    humidity_air_min = db.Column(db.Float, nullable=False)
+    humidity_air_max = db.Column(db.Float, nullable=False)
+    humidity_air_sum = db.Column(db.Float, nullable=False)
+    temperature_substrate_min = db.Column(db.Float, nullable=False)
+    temperature_substrate_max = db.Column(db.Float, nullable=False)
+    temperature_substrate_sum = db.Column(db.Float, nullable=False)
+    moisture_substrate_min = db.Column(db.Float, nullable=False)
+    moisture_substrate_max = db.Column(db.Float, nullable=False)
+    moisture_substrate_sum = db.Column(db.Float, nullable=False)
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -33,9 +56,44 @@ class TimelapseConfig(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class CapturedImage(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(512), unique=True, nullable=False)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    height = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    source = db.Column(db.String(20), nullable=False)  # 'timelapse', 'capture' or 'motion'
+
+    __table_args__ = (
+        db.Index('ix_captured_image_source_id', 'source', 'id'),
+        db.Index('ix_captured_image_timestamp', 'timestamp'),
+    )
+
+
 class ErrorLog(db.Model):
+    """One row per distinct error; repeats within the dedup window bump count and last_seen."""
     id = db.Column(db.Integer, primary_key=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     module = db.Column(db.String(100), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    traceback = db.Column(db.Text, nullable=False)
+    traceback = db.Column(db.Text, nullable=False)  # Of the first occurrence
+    count = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    first_seen = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime)
+
+
+class ControlRule(db.Model):
+    """Hysteresis rule switching a plug from a sensor metric (evaluated in memory by control.engine)."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(80), nullable=False)
+    metric = db.Column(db.String(32), nullable=False)  # One of database.rollups.METRICS
+    mode = db.Column(db.String(8), nullable=False)  # 'raise': on below low / 'lower': on above high
+    low = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    average_seconds = db.Column(db.Float, nullable=False, default=0)  # Moving average window, 0 = raw samples
+    min_on_seconds = db.Column(db.Float, nullable=False, default=0)
+    min_off_seconds = db.Column(db.Float, nullable=False, default=0)
+    target = db.Column(db.String(32), nullable=False, default='smartplug')
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
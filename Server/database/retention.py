@@ -0,0 +1,193 @@
+# database/retention.py
+import csv
+import gzip
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from config import (
+    ARCHIVE_DIR, SENSOR_RETENTION_DAYS, ERROR_LOG_RETENTION_DAYS,
+    RETENTION_BATCH_SIZE, RETENTION_INTERVAL_HOURS, RETENTION_ENABLED
+)
+from database.models import ErrorLog, SensorReading, db
+from logs.logging_config import logger
+
+READINGS_ARCHIVE_DIR = os.path.join(ARCHIVE_DIR, "sensor_readings")
+ARCHIVE_COLUMNS = ("id", "timestamp", "temperature_air", "humidity_air", "temperature_substrate", "moisture_substrate")
+
+# Pause between batches so the sensor writer always gets the database quickly
+BATCH_PAUSE_SECONDS = 0.2
+VACUUM_PAGES_PER_BATCH = 1000
+
+
+def partition_path(day):
+    """Archive file of one UTC day: <ARCHIVE_DIR>/sensor_readings/YYYY/YYYY-MM-DD.csv.gz"""
+    return os.path.join(READINGS_ARCHIVE_DIR, f"{day:%Y}", f"{day:%Y-%m-%d}.csv.gz")
+
+
+def _append_to_partition(day, rows):
+    path = partition_path(day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    is_new = not os.path.exists(path)
+
+    # Appending a new gzip member keeps earlier data intact; readers see one continuous CSV
+    with open(path, 'ab') as raw:
+        with gzip.open(raw, 'wt', newline='') as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(ARCHIVE_COLUMNS)
+            writer.writerows(rows)
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _freelist_count():
+    return db.session.execute(db.text("PRAGMA freelist_count")).scalar()
+
+
+def incremental_vacuum(pages=None):
+    """
+    Give up to `pages` free pages (all of them when None) back to the file
+    system. The pragma frees one page per step, so it has to run to
+    completion through executescript(); a plain execute() frees only one.
+    Returns the freelist count before and after.
+    """
+    db.session.commit()
+    before = _freelist_count()
+    pragma = f"PRAGMA incremental_vacuum({pages});" if pages else "PRAGMA incremental_vacuum;"
+    db.session.connection().connection.driver_connection.executescript(pragma)
+    db.session.commit()
+    return before, _freelist_count()
+
+
+def archive_old_readings(cutoff, batch_size=RETENTION_BATCH_SIZE):
+    """
+    Move readings older than cutoff into daily CSV.gz partitions, oldest first,
+    one short transaction per batch. Rows are only deleted once their batch is
+    safely on disk; if we crash in between, the batch is archived again and
+    read_archived_readings() drops the duplicates.
+    """
+    archived = 0
+    while True:
+        readings = (
+            SensorReading.query
+            .filter(SensorReading.timestamp < cutoff)
+            .order_by(SensorReading.timestamp, SensorReading.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not readings:
+            break
+
+        by_day = {}
+        for r in readings:
+            by_day.setdefault(r.timestamp.date(), []).append((
+                r.id, r.timestamp.isoformat(), r.temperature_air, r.humidity_air,
+                r.temperature_substrate, r.moisture_substrate
+            ))
+        for day, rows in by_day.items():
+            _append_to_partition(day, rows)
+
+        ids = [r.id for r in readings]
+        SensorReading.query.filter(SensorReading.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        archived += len(ids)
+
+        before, after = incremental_vacuum(VACUUM_PAGES_PER_BATCH)
+        logger.debug(f"[Retention] Free pages {before} -> {after}")
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+    return archived
+
+
+def prune_error_logs(cutoff, batch_size=RETENTION_BATCH_SIZE):
+    deleted = 0
+    while True:
+        # Deduplicated errors are kept while they keep recurring
+        last_seen = db.func.coalesce(ErrorLog.last_seen, ErrorLog.timestamp)
+        ids = [row.id for row in db.session.query(ErrorLog.id).filter(last_seen < cutoff).limit(batch_size)]
+        if not ids:
+            break
+        ErrorLog.query.filter(ErrorLog.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+        time.sleep(BATCH_PAUSE_SECONDS)
+    return deleted
+
+
+def run_retention():
+    """One retention pass. Needs an app context."""
+    now = datetime.utcnow()
+    free_pages = _freelist_count()
+    archived = archive_old_readings(now - timedelta(days=SENSOR_RETENTION_DAYS))
+    pruned = prune_error_logs(now - timedelta(days=ERROR_LOG_RETENTION_DAYS))
+    before, after = incremental_vacuum()
+    logger.info(f"[Retention] Archived {archived} readings, pruned {pruned} error logs; "
+                f"free pages {free_pages} at start, {before} before the final vacuum, {after} after")
+
+
+def _retention_loop(app):
+    with app.app_context():
+        mode = db.session.execute(db.text("PRAGMA auto_vacuum")).scalar()
+        if mode != 2:
+            logger.info("[Retention] Database is not in incremental auto_vacuum mode: freed pages are reused "
+                        "but the file will not shrink. Run 'PRAGMA auto_vacuum=INCREMENTAL; VACUUM;' once to enable it.")
+
+    while True:
+        try:
+            with app.app_context():
+                run_retention()
+        except Exception:
+            logger.exception("[Retention] Error while applying retention policy")
+        time.sleep(RETENTION_INTERVAL_HOURS * 3600)
+
+
+def start_retention_job(app):
+    if RETENTION_ENABLED:
+        thread = threading.Thread(target=_retention_loop, args=(app,), name="Retention", daemon=True)
+        thread.start()
+        logger.info(f"[Retention] Keeping {SENSOR_RETENTION_DAYS} days of raw readings in the database")
+
+
+def read_archived_readings(start=None, end=None):
+    """
+    Yield archived readings (dicts) with start <= timestamp < end, oldest
+    first, one partition at a time so memory stays flat.
+    """
+    if not os.path.isdir(READINGS_ARCHIVE_DIR):
+        return
+
+    paths = []
+    for year in sorted(os.listdir(READINGS_ARCHIVE_DIR)):
+        year_dir = os.path.join(READINGS_ARCHIVE_DIR, year)
+        for name in sorted(os.listdir(year_dir)):
+            if not name.endswith(".csv.gz"):
+                continue
+            day = datetime.strptime(name[:10], "%Y-%m-%d")
+            if start and day + timedelta(days=1) <= start:
+                continue
+            if end and day >= end:
+                continue
+            paths.append(os.path.join(year_dir, name))
+
+    for path in paths:
+        seen = set()
+        with gzip.open(path, 'rt', newline='') as f:
+            for row in csv.DictReader(f):
+                if row["id"] == "id":
+                    continue  # Header repeated by a later gzip member
+                if row["id"] in seen:
+                    continue
+                seen.add(row["id"])
+
+                timestamp = datetime.fromisoformat(row["timestamp"])
+                if (start and timestamp < start) or (end and timestamp >= end):
+                    continue
+                yield {
+                    "id": int(row["id"]),
+                    "timestamp": timestamp,
+                    "temperature_air": float(row["temperature_air"]),
+                    "humidity_air": float(row["humidity_air"]),
+                    "temperature_substrate": float(row["temperature_substrate"]),
+                    "moisture_substrate": float(row["moisture_substrate"])
+                }
@@ -0,0 +1,134 @@
+# database/rollups.py
+from datetime import datetime
+from sqlalchemy import func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import SensorReading, SensorRollup, db
+from logs.logging_config import logger
+
+METRICS = ("temperature_air", "humidity_air", "temperature_substrate", "moisture_substrate")
+
+# Resolution name -> bucket length in seconds, finest first
+RESOLUTIONS = {
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+# strftime patterns producing the same text SQLAlchemy stores for a DateTime
+_SQLITE_BUCKET_FORMATS = {
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000",
+    "day": "%Y-%m-%d 00:00:00.000000",
+}
+
+
+def bucket_start(timestamp, resolution):
+    if resolution == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert_statement():
+    stmt = sqlite_insert(SensorRollup)
+    excluded = stmt.excluded
+    update = {"count": SensorRollup.count + excluded["count"]}
+    for metric in METRICS:
+        update[f"{metric}_min"] = func.min(getattr(SensorRollup, f"{metric}_min"), excluded[f"{metric}_min"])
+        update[f"{metric}_max"] = func.max(getattr(SensorRollup, f"{metric}_max"), excluded[f"{metric}_max"])
+        update[f"{metric}_sum"] = getattr(SensorRollup, f"{metric}_sum") + excluded[f"{metric}_sum"]
+    return stmt.on_conflict_do_update(index_elements=["resolution", "bucket_start"], set_=update)
+
+
+def update_rollups(rows):
+    """
+    Fold a batch of new reading rows (dicts) into the rollup tables. The batch
+    is pre-aggregated in memory, so each touched bucket costs one upsert.
+    Runs inside the caller's transaction.
+    """
+    buckets = {}
+    for row in rows:
+        for resolution in RESOLUTIONS:
+            key = (resolution, bucket_start(row["timestamp"], resolution))
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {"resolution": key[0], "bucket_start": key[1], "count": 0}
+                for metric in METRICS:
+                    value = row[metric]
+                    bucket[f"{metric}_min"] = value
+                    bucket[f"{metric}_max"] = value
+                    bucket[f"{metric}_sum"] = 0.0
+            bucket["count"] += 1
+            for metric in METRICS:
+                value = row[metric]
+                if value < bucket[f"{metric}_min"]:
+                    bucket[f"{metric}_min"] = value
+                if value > bucket[f"{metric}_max"]:
+                    bucket[f"{metric}_max"] = value
+                bucket[f"{metric}_sum"] += value
+
+    if buckets:
+        db.session.execute(_upsert_statement(), list(buckets.values()))
+
+
+def backfill_rollups():
+    """One-time build of the rollups from existing readings (only when the rollup table is empty)."""
+    if db.session.query(SensorRollup.resolution).first() is not None:
+        return
+    if db.session.query(SensorReading.id).first() is None:
+        return
+
+    started = datetime.utcnow()
+    aggregates = ", ".join(
+        f"min({m}), max({m}), sum({m})" for m in METRICS
+    )
+    columns = ", ".join(
+        f"{m}_min, {m}_max, {m}_sum" for m in METRICS
+    )
+    for resolution, pattern in _SQLITE_BUCKET_FORMATS.items():
+        db.session.execute(text(
+            f"INSERT INTO sensor_rollup (resolution, bucket_start, count, {columns}) "
+            f"SELECT :resolution, strftime('{pattern}', timestamp), count(*), {aggregates} "
+            f"FROM sensor_reading GROUP BY 2"
+        ), {"resolution": resolution})
+    db.session.commit()
+    logger.info(f"[Rollups] Backfilled from existing readings in {(datetime.utcnow() - started).total_seconds():.1f}s")
+
+
+def pick_resolution(start, end, max_points):
+    """Finest resolution whose bucket count over [start, end) fits the point budget."""
+    span = (end - start).total_seconds()
+    for resolution, seconds in RESOLUTIONS.items():
+        if span / seconds <= max_points:
+            return resolution
+    return "day"
+
+
+def query_rollups(start, end, resolution):
+    rollups = (
+        SensorRollup.query
+        .filter(
+            SensorRollup.resolution == resolution,
+            SensorRollup.bucket_start >= bucket_start(start, resolution),
+            SensorRollup.bucket_start < end
+        )
+        .order_by(SensorRollup.bucket_start)
+        .all()
+    )
+
+    return [
+        {
+            "timestamp": r.bucket_start.isoformat(),
+            "count": r.count,
+            **{
+                metric: {
+                    "min": getattr(r, f"{metric}_min"),
+                    "max": getattr(r, f"{metric}_max"),
+                    "avg": round(getattr(r, f"{metric}_sum") / r.count, 2)
+                }
+                for metric in METRICS
+            }
+        }
+        for r in rollups
+    ]
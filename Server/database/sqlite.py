@@ -0,0 +1,49 @@
+# database/sqlite.py
+from sqlalchemy import event, inspect, text
+from config import SQLITE_SYNCHRONOUS
+
+
+def configure_sqlite(engine):
+    """
+    Per-connection SQLite tuning. WAL lets readers run while the sensor
+    writer commits, and synchronous=NORMAL only fsyncs at checkpoints
+    instead of on every commit, which spares the SD card. Incremental
+    auto_vacuum (only takes effect on a new database) lets the retention job
+    give freed pages back to the filesystem.
+    """
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+
+def ensure_indexes(metadata, engine):
+    """create_all() skips indexes of tables that already exist, so add any missing ones."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def ensure_columns(metadata, engine):
+    """
+    create_all() does not alter existing tables, so add columns that were
+    added to a model later. New columns must be nullable or have a
+    server_default (SQLite's ALTER TABLE ADD COLUMN needs one for NOT NULL).
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=engine.dialect)}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                connection.execute(text(ddl))
@@ -0,0 +1,105 @@
+# database/writer.py
+import atexit
+import time
+from threading import Condition, Thread
+from flask import current_app
+from sqlalchemy import insert
+from database.models import db
+from logs.logging_config import logger
+from metrics import registry
+
+COMMIT_SECONDS = registry.histogram("db_batch_commit_seconds", "Time to insert and commit one batch", ["table"])
+ROWS_WRITTEN = registry.counter("db_rows_written", "Rows inserted by the write-behind writers", ["table"])
+WRITE_FAILURES = registry.counter("db_write_failures", "Batches that failed to commit", ["table"])
+PENDING_ROWS = registry.gauge("db_pending_rows", "Rows buffered and not yet written", ["table"])
+
+
+class BufferedWriter:
+    """
+    Write-behind buffer for append-only tables. Rows are collected in memory
+    and inserted in one transaction when max_batch rows are pending or
+    max_delay seconds have passed, whichever comes first.
+
+    Up to max_delay seconds of rows can be lost on a hard crash; a normal
+    shutdown flushes through atexit. on_batch(rows), if given, runs in the
+    same transaction as the insert (e.g. to maintain derived tables).
+    """
+
+    def __init__(self, model, max_batch, max_delay, on_batch=None):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_batch = on_batch
+        self.rows_written = 0
+
+        self._condition = Condition()
+        self._buffer = []
+        self._first_pending_at = None
+        self._app = None
+        self._thread = None
+
+        table = model.__tablename__
+        self._commit_seconds = COMMIT_SECONDS.labels(table)
+        self._rows_written = ROWS_WRITTEN.labels(table)
+        self._write_failures = WRITE_FAILURES.labels(table)
+        PENDING_ROWS.labels(table).set_function(lambda: len(self._buffer))
+
+    def add(self, row, app=None):
+        """Queue one row (a dict of column values). Cheap: never touches the database."""
+        with self._condition:
+            if self._thread is None:
+                self._start(app or current_app._get_current_object())
+            if not self._buffer:
+                self._first_pending_at = time.monotonic()
+            self._buffer.append(row)
+            if len(self._buffer) >= self.max_batch:
+                self._condition.notify()
+
+    def _start(self, app):
+        self._app = app
+        self._thread = Thread(target=self._run, name=f"{self.model.__name__}Writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _take_batch(self):
+        with self._condition:
+            while True:
+                if self._buffer:
+                    age = time.monotonic() - self._first_pending_at
+                    if len(self._buffer) >= self.max_batch or age >= self.max_delay:
+                        break
+                    self._condition.wait(self.max_delay - age)
+                else:
+                    self._condition.wait()
+            batch, self._buffer = self._buffer, []
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            with self._app.app_context():
+                db.session.execute(insert(self.model), batch)
+                if self.on_batch:
+                    self.on_batch(batch)
+                db.session.commit()
+            self._commit_seconds.observe(time.perf_counter() - started)
+            self.rows_written += len(batch)
+            self._rows_written.inc(len(batch))
+        except Exception:
+            self._write_failures.inc()
+            db.session.rollback()
+            logger.exception(f"[DB] Failed to write {len(batch)} {self.model.__name__} rows")
+
+    def flush(self):
+        """Write everything pending right now (used at shutdown and by tests/benchmarks)."""
+        with self._condition:
+            batch, self._buffer = self._buffer, []
+        if self._app is not None:
+            self._write(batch)
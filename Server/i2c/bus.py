@@ -0,0 +1,226 @@
+# i2c/bus.py
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from smbus2 import SMBus, i2c_msg
+from config import I2C_BUS_ID, I2C_TRANSACTION_TIMEOUT, I2C_RETRIES, I2C_BACKEND, SIM_I2C_LATENCY, SIM_I2C_ERROR_RATE
+from logs.logging_config import logger
+from metrics import registry
+from serving import Notifier
+
+# Lower value runs first
+PRIORITY_SERVO = 0
+PRIORITY_SENSOR = 10
+PRIORITY_NAMES = {PRIORITY_SERVO: "servo", PRIORITY_SENSOR: "sensor"}
+
+TRANSACTION_SECONDS = registry.histogram(
+    "i2c_transaction_seconds", "I2C transaction time from enqueue to completion", ["priority"])
+TRANSACTIONS = registry.counter("i2c_transactions", "I2C transactions by outcome", ["priority", "result"])
+RETRIES = registry.counter("i2c_retries", "I2C transaction attempts that were retried")
+MERGED_READS = registry.counter("i2c_merged_reads", "Reads served by an identical pending transaction")
+CALLER_TIMEOUTS = registry.counter("i2c_caller_timeouts", "Callers that gave up waiting for a transaction")
+QUEUE_DEPTH = registry.gauge("i2c_queue_depth", "Transactions waiting for the bus")
+DEVICE_ERRORS = registry.counter("i2c_device_errors", "Failed reads/writes of the Arduino boards", ["device", "operation"])
+
+
+def create_smbus():
+    """The real bus, or the simulated Arduinos when I2C_BACKEND is "sim"."""
+    if I2C_BACKEND == "sim":
+        from sim.smbus import FakeSMBus
+        return FakeSMBus(latency=SIM_I2C_LATENCY, error_rate=SIM_I2C_ERROR_RATE)
+    return SMBus(I2C_BUS_ID)
+
+
+class I2CError(Exception):
+    pass
+
+
+class I2CTimeout(I2CError):
+    pass
+
+
+class _Transaction:
+    def __init__(self, priority, key, operation, deadline):
+        self.priority = priority
+        self.key = key
+        self.operation = operation
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.done = False
+        self.result = None
+        self.error = None
+        self.waiters = 1
+
+
+class I2CBus:
+    """
+    Sole owner of the I2C bus. Every transaction goes through one worker
+    thread, taken from a priority queue: servo commands jump ahead of
+    background sensor reads, identical reads that are already pending are
+    merged into a single transaction, and each transaction has a deadline
+    and a retry budget.
+    """
+
+    def __init__(self, bus_factory=create_smbus, timeout=I2C_TRANSACTION_TIMEOUT,
+                 retries=I2C_RETRIES, retry_delay=0.005, latency_window=500):
+        self.bus_factory = bus_factory
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._bus = None
+        self._condition = threading.Condition()
+        self._queue = []
+        self._pending_reads = {}  # (address, length) -> queued or running transaction
+        self._counter = itertools.count()
+        self._thread = None
+        # Callers may be request greenlets: they wait here instead of on a threading.Event
+        self._finished = Notifier()
+
+        self._latencies = {}  # priority -> deque of (queue wait, total) seconds
+        self._latency_window = latency_window
+        self._stats = {"completed": 0, "failed": 0, "retries": 0, "merged": 0, "timeouts": 0, "max_queue_depth": 0}
+
+    def open(self):
+        """Open the bus now instead of on the first transaction (raises if it cannot be opened)."""
+        with self._condition:
+            if self._bus is None:
+                self._bus = self.bus_factory()
+
+    def read(self, address, length, priority=PRIORITY_SENSOR, timeout=None):
+        """Read length bytes from a device. Concurrent identical reads share one transaction."""
+        def operation(bus):
+            msg = i2c_msg.read(address, length)
+            bus.i2c_rdwr(msg)
+            return bytes(msg)
+
+        return self._submit(priority, ("read", address, length), operation, timeout)
+
+    def write_block(self, address, register, data, priority=PRIORITY_SERVO, timeout=None):
+        """Write a block of data to a device register."""
+        return self._submit(priority, None, lambda bus: bus.write_i2c_block_data(address, register, list(data)), timeout)
+
+    def _submit(self, priority, key, operation, timeout):
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._condition:
+            tx = self._pending_reads.get(key) if key else None
+            if tx is not None:
+                # Every caller waits on its own deadline; the shared read lives as long as the latest one
+                tx.deadline = max(tx.deadline, deadline)
+                tx.waiters += 1
+                self._stats["merged"] += 1
+                MERGED_READS.inc()
+                if priority < tx.priority:
+                    # Re-queue so the merged read runs at the caller's priority; the stale entry is skipped
+                    tx.priority = priority
+                    heapq.heappush(self._queue, (priority, next(self._counter), tx))
+            else:
+                tx = _Transaction(priority, key, operation, deadline)
+                if key:
+                    self._pending_reads[key] = tx
+                heapq.heappush(self._queue, (priority, next(self._counter), tx))
+                self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+                self._condition.notify()
+            self._ensure_running()
+
+        if not self._finished.wait_for(lambda: tx.done, max(0.0, deadline - time.monotonic())):
+            with self._condition:
+                self._stats["timeouts"] += 1
+            CALLER_TIMEOUTS.inc()
+            raise I2CTimeout(f"I2C transaction {key or 'write'} timed out")
+        if tx.error is not None:
+            raise tx.error
+        return tx.result
+
+    def _ensure_running(self):
+        # Called with the condition held
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="I2CBus", daemon=True)
+            self._thread.start()
+
+    def _next_transaction(self):
+        with self._condition:
+            while True:
+                while not self._queue:
+                    self._condition.wait()
+                priority, _, tx = heapq.heappop(self._queue)
+                if tx.done or priority != tx.priority:
+                    continue  # Stale entry of a re-prioritized read
+                expired = time.monotonic() > tx.deadline
+                if expired and tx.key and self._pending_reads.get(tx.key) is tx:
+                    # Decided under the lock, so no new caller can merge into a read that won't run
+                    del self._pending_reads[tx.key]
+                return tx, expired
+
+    def _run(self):
+        while True:
+            tx, expired = self._next_transaction()
+            started = time.monotonic()
+
+            if expired:
+                # Every caller has already given up: don't spend bus time on it
+                tx.error = I2CTimeout("I2C transaction expired in the queue")
+                result = "expired"
+            else:
+                tx.result, tx.error = self._execute(tx)
+                result = "failed" if tx.error else "ok"
+
+            with self._condition:
+                if tx.key and self._pending_reads.get(tx.key) is tx:
+                    del self._pending_reads[tx.key]
+                self._stats["failed" if tx.error else "completed"] += 1
+                finished = time.monotonic()
+                window = self._latencies.setdefault(tx.priority, deque(maxlen=self._latency_window))
+                window.append((started - tx.enqueued_at, finished - tx.enqueued_at))
+            priority = PRIORITY_NAMES.get(tx.priority, str(tx.priority))
+            TRANSACTIONS.labels(priority, result).inc()
+            TRANSACTION_SECONDS.labels(priority).observe(finished - tx.enqueued_at)
+            with self._finished:
+                tx.done = True
+            self._finished.notify_all()
+
+    def _execute(self, tx):
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                with self._condition:
+                    self._stats["retries"] += 1
+                RETRIES.inc()
+                time.sleep(self.retry_delay)
+            try:
+                self.open()
+                return tx.operation(self._bus), None
+            except Exception as e:
+                error = e
+                if time.monotonic() > tx.deadline:
+                    break
+        logger.warning(f"[I2C] Transaction {tx.key or 'write'} failed after {attempt + 1} attempt(s): {error}")
+        return None, I2CError(str(error))
+
+    def queue_depth(self):
+        with self._condition:
+            return len({id(tx) for _, _, tx in self._queue if not tx.done})
+
+    def stats(self):
+        """Queue depth, counters and per-priority latency (ms) over the last transactions."""
+        with self._condition:
+            stats = dict(self._stats, queue_depth=self.queue_depth())
+            latency = {}
+            for priority, window in sorted(self._latencies.items()):
+                waits = sorted(w for w, _ in window)
+                totals = sorted(t for _, t in window)
+                latency[PRIORITY_NAMES.get(priority, str(priority))] = {
+                    "count": len(totals),
+                    "wait_avg_ms": round(1000 * sum(waits) / len(waits), 3),
+                    "avg_ms": round(1000 * sum(totals) / len(totals), 3),
+                    "p95_ms": round(1000 * totals[int(0.95 * (len(totals) - 1))], 3),
+                    "max_ms": round(1000 * totals[-1], 3),
+                }
+            stats["latency"] = latency
+        return stats
+
+
+i2c_bus = I2CBus()
+QUEUE_DEPTH.set_function(i2c_bus.queue_depth)
@@ -1,25 +1,25 @@
 import struct
-import threading
-from smbus2 import SMBus, i2c_msg
-from config import ARDUINO_SENSORS
-from database.models import SensorReading, db
-
-i2c_lock = threading.Lock()
-bus = SMBus(1)
+from datetime import datetime
+from config import ARDUINO_SENSORS, SENSOR_WRITE_BATCH_SIZE, SENSOR_WRITE_MAX_DELAY
+from database.models import SensorReading
+from database.writer import BufferedWriter
+from database.rollups import update_rollups
+from i2c.bus import i2c_bus, PRIORITY_SENSOR, DEVICE_ERRORS
+from logs.db_logger import log_error_to_db
+from logs.logging_config import logger
 
 def read_sensors():
-    with i2c_lock:
-        try:
-            # Assuming the Arduino sends data in the format: <temperature_dht: float, humidity: float, temperature_ds18b20: float, soil_moisture: uint16>
-            read = i2c_msg.read(ARDUINO_SENSORS, 14)
-            bus.i2c_rdwr(read)
-            raw_data = bytes(list(read))
+    try:
+        # Assuming the Arduino sends data in the format: <temperature_dht: float, humidity: float, temperature_ds18b20: float, soil_moisture: uint16>
+        raw_data = i2c_bus.read(ARDUINO_SENSORS, 14, priority=PRIORITY_SENSOR)
 
-            # Unpack the raw data
-            temperature_dht, humidity, temperature_ds18b20, soil_moisture = struct.unpack('<fffH', raw_data)
-        except Exception as e:
-            print(f"[I2C ERROR] Failed to read sensor data: {e}")
-            temperature_dht, humidity, temperature_ds18b20, soil_moisture = 0.0, 0.0, 0.0, 0
+        # Unpack the raw data
+        temperature_dht, humidity, temperature_ds18b20, soil_moisture = struct.unpack('<fffH', raw_data)
+    except Exception as e:
+        DEVICE_ERRORS.labels("sensors", "read").inc()
+        logger.warning(f"[I2C] Failed to read sensor data: {e}")
+        log_error_to_db("i2c/sensors.py", e)
+        temperature_dht, humidity, temperature_ds18b20, soil_moisture = 0.0, 0.0, 0.0, 0
 
     sensor_data = {
         "temperature_dht": round(temperature_dht, 2),
@@ -30,15 +30,18 @@ def read_sensors():
 
     return sensor_data
 
+# Readings are inserted in batches by a background writer instead of one commit (and fsync) each;
+# the minute/hour/day rollups are updated in the same transaction
+sensor_writer = BufferedWriter(SensorReading, SENSOR_WRITE_BATCH_SIZE, SENSOR_WRITE_MAX_DELAY, on_batch=update_rollups)
+
 def save_sensor_data(sensor_data):
     try:
-        new_reading = SensorReading(
-            temperature_air=sensor_data["temperature_dht"],
-            humidity_air=sensor_data["humidity"],
-            temperature_substrate=sensor_data["temperature_ds18b20"],
-            moisture_substrate=sensor_data["soil_moisture"]
-        )
-        db.session.add(new_reading)
-        db.session.commit()
+        sensor_writer.add({
+            "timestamp": datetime.utcnow(),
+            "temperature_air": sensor_data["temperature_dht"],
+            "humidity_air": sensor_data["humidity"],
+            "temperature_substrate": sensor_data["temperature_ds18b20"],
+            "moisture_substrate": sensor_data["soil_moisture"]
+        })
     except Exception as e:
-        print(f"[DB ERROR] Failed to store sensor reading: {e}")
+        logger.error(f"[DB] Failed to store sensor reading: {e}")
@@ -1,28 +1,108 @@
 import threading
-from smbus2 import SMBus, i2c_msg
-from config import ARDUINO_PAN_TILT
-
-i2c_lock = threading.Lock()
-bus = SMBus(1)
+import time
+from config import ARDUINO_PAN_TILT, SERVO_MAX_WRITE_RATE, SERVO_MAX_STEP
+from i2c.bus import i2c_bus, PRIORITY_SENSOR, PRIORITY_SERVO, DEVICE_ERRORS
+from live.state import live_state
+from logs.db_logger import log_error_to_db
+from logs.logging_config import logger
 
 def get_current_pan_tilt():
-    with i2c_lock:
-        try:
-            read = i2c_msg.read(ARDUINO_PAN_TILT, 2)
-            bus.i2c_rdwr(read)
-            data = list(read)
-            return {"pan": data[0], "tilt": data[1]}
-        except Exception as e:
-            print(f"[I2C ERROR] Failed to read servo angles: {e}")
-            return {"pan": 0, "tilt": 0}
-
-def set_pan_tilt(pan, tilt):
-    pan = max(0, min(180, int(pan)))
-    tilt = max(90, min(160, int(tilt)))
-    with i2c_lock:
-        try:
-            bus.write_i2c_block_data(ARDUINO_PAN_TILT, 0x00, [pan, tilt])
-            return {"pan": pan, "tilt": tilt}
-        except Exception as e:
-            print(f"[I2C ERROR] Failed to send servo command: {e}")
-            return {"pan": 0, "tilt": 0}
+    try:
+        data = i2c_bus.read(ARDUINO_PAN_TILT, 2, priority=PRIORITY_SENSOR)
+        return {"pan": data[0], "tilt": data[1]}
+    except Exception as e:
+        DEVICE_ERRORS.labels("servos", "read").inc()
+        logger.warning(f"[I2C] Failed to read servo angles: {e}")
+        log_error_to_db("i2c/servos.py", e)
+        return {"pan": 0, "tilt": 0}
+
+
+class ServoController:
+    """
+    Drives the pan/tilt servos from a background thread.
+
+    Callers only set a target, which replaces any target not yet reached, so
+    a burst of commands costs a handful of bus writes instead of one each.
+    Writes go out at most max_rate times per second; with a max_step the
+    servos move toward the target in steps of at most that many degrees per
+    write, for a smooth trajectory instead of a jump.
+    """
+
+    def __init__(self, write, read_position=None, max_rate=20.0, max_step=0):
+        self.write = write
+        self.read_position = read_position
+        self.max_rate = max_rate
+        self.max_step = max_step
+        self.commands = 0
+        self.writes = 0
+
+        self._condition = threading.Condition()
+        self._target = None
+        self._position = None
+        self._thread = None
+
+    @property
+    def target(self):
+        return self._target
+
+    @property
+    def position(self):
+        return self._position
+
+    def set_target(self, pan, tilt):
+        """Accept a new target and return immediately with the clamped values."""
+        target = (max(0, min(180, int(pan))), max(90, min(160, int(tilt))))
+        with self._condition:
+            self._target = target
+            self.commands += 1
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ServoController", daemon=True)
+                self._thread.start()
+        return {"pan": target[0], "tilt": target[1]}
+
+    def _step(self, current, target):
+        if not self.max_step or current is None:
+            return target
+        return tuple(c + max(-self.max_step, min(self.max_step, t - c)) for c, t in zip(current, target))
+
+    def _run(self):
+        if self.read_position and self.max_step:
+            # Start the trajectory from where the servos actually are
+            position = self.read_position()
+            if position:
+                self._position = (position["pan"], position["tilt"])
+
+        interval = 1.0 / self.max_rate
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._target is not None and self._target != self._position)
+                position = self._step(self._position, self._target)
+
+            started = time.monotonic()
+            try:
+                self.write(*position)
+                self._position = position
+                self.writes += 1
+            except Exception as e:
+                DEVICE_ERRORS.labels("servos", "write").inc()
+                logger.warning(f"[I2C] Failed to send servo command: {e}")
+                log_error_to_db("i2c/servos.py", e)
+                with self._condition:
+                    # The bus already retried; wait for the next command instead of hammering it
+                    if self._target is not None and self._step(self._position, self._target) == position:
+                        self._target = self._position
+
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def _write_pan_tilt(pan, tilt):
+    i2c_bus.write_block(ARDUINO_PAN_TILT, 0x00, [pan, tilt], priority=PRIORITY_SERVO)
+
+
+servo_controller = ServoController(
+    _write_pan_tilt,
+    read_position=lambda: live_state.get("servos"),
+    max_rate=SERVO_MAX_WRITE_RATE,
+    max_step=SERVO_MAX_STEP
+)
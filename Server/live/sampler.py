@@ -0,0 +1,66 @@
+# live/sampler.py
+import time
+import threading
+from config import READ_SENSORS, READ_SERVOS, READ_SENSORS_INTERVAL, READ_SERVOS_INTERVAL, SMARTPLUG_POLL_INTERVAL, CONTROL_ENABLED
+from control.engine import control_engine, sample_from_reading
+from live.state import live_state
+from logs.logging_config import logger
+
+
+def parse_plug_status(response):
+    """switch_1 value of a Tuya status response, or None."""
+    if not response or not response.get("success"):
+        return None
+    for item in response["result"]:
+        if item["code"] == "switch_1":
+            return item["value"]
+    return None
+
+
+def _i2c_loop():
+    # Imported here so the sampler module itself does not touch the bus on import
+    from i2c.sensors import read_sensors
+    from i2c.servos import get_current_pan_tilt
+
+    next_sensors = next_servos = 0.0
+    while True:
+        now = time.monotonic()
+        try:
+            if READ_SENSORS and now >= next_sensors:
+                next_sensors = now + READ_SENSORS_INTERVAL
+                reading = read_sensors()
+                live_state.update("sensors", reading)
+                sample = sample_from_reading(reading) if CONTROL_ENABLED else None
+                if sample:
+                    # Control rules react on every sample, without touching the database
+                    control_engine.feed(sample)
+            if READ_SERVOS and now >= next_servos:
+                next_servos = now + READ_SERVOS_INTERVAL
+                live_state.update("servos", get_current_pan_tilt())
+        except Exception:
+            logger.exception("[LiveSampler] Error reading the I2C bus")
+
+        due = min(next_sensors if READ_SENSORS else float("inf"), next_servos if READ_SERVOS else float("inf"))
+        time.sleep(max(0.0, due - time.monotonic()))
+
+
+def _plug_loop():
+    from smart import get_status
+
+    while True:
+        try:
+            status = parse_plug_status(get_status())
+            if status is not None:
+                live_state.update("smartplug", {"status": status})
+        except Exception as e:
+            logger.debug(f"[LiveSampler] Smart plug poll failed: {e}")
+        time.sleep(SMARTPLUG_POLL_INTERVAL)
+
+
+def start_live_sampler():
+    """One sampler for everybody: dashboards read live_state instead of the bus."""
+    if READ_SENSORS or READ_SERVOS:
+        threading.Thread(target=_i2c_loop, name="LiveSamplerI2C", daemon=True).start()
+    if SMARTPLUG_POLL_INTERVAL:
+        threading.Thread(target=_plug_loop, name="LiveSamplerPlug", daemon=True).start()
+    logger.info("[LiveSampler] Background sampler started")
@@ -0,0 +1,53 @@
+# live/state.py
+import time
+from serving import Notifier
+
+
+class LiveState:
+    """
+    Latest value of each live topic (sensors, servos, smartplug), with a
+    global version counter so any number of subscribers can wait for changes
+    without polling the hardware themselves.
+    """
+
+    def __init__(self):
+        # Subscribers may be OS threads or gevent greenlets
+        self._condition = Notifier()
+        self._version = 0
+        self._topics = {}  # topic -> (version, updated_at, value)
+
+    @property
+    def version(self):
+        return self._version
+
+    def update(self, topic, value):
+        """Store a new value; subscribers are only woken up if it actually changed."""
+        with self._condition:
+            current = self._topics.get(topic)
+            if current is not None and current[2] == value:
+                self._topics[topic] = (current[0], time.monotonic(), value)
+                return
+            self._version += 1
+            self._topics[topic] = (self._version, time.monotonic(), value)
+            self._condition.notify_all()
+
+    def get(self, topic, max_age=None):
+        """Latest value, or None if there is none (or it is older than max_age seconds)."""
+        entry = self._topics.get(topic)
+        if entry is None:
+            return None
+        if max_age is not None and time.monotonic() - entry[1] > max_age:
+            return None
+        return entry[2]
+
+    def changes_since(self, version):
+        with self._condition:
+            return self._version, {t: v for t, (ver, _, v) in self._topics.items() if ver > version}
+
+    def wait_for_changes(self, version, timeout):
+        """Block until something changed after version. Returns (new_version, {topic: value})."""
+        self._condition.wait_for(lambda: self._version > version, timeout)
+        return self.changes_since(version)
+
+
+live_state = LiveState()
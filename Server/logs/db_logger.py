@@ -1,15 +1,152 @@
+# logs/db_logger.py
+"""
+ErrorLog rows written in the background.
+
+log_error_to_db() only records the error in memory; repeats of the same
+error (same module and message) are folded into one entry with a count and
+first/last seen times. A writer thread formats the tracebacks and writes
+everything pending in one transaction every ERROR_LOG_FLUSH_SECONDS,
+bumping the existing row of an error already seen within
+ERROR_LOG_DEDUP_SECONDS instead of inserting a new one. A failing sensor
+loop therefore costs a dict update per sample, not a traceback format and a
+commit.
+"""
+import atexit
+import time
 import traceback
+from datetime import datetime, timedelta
+from threading import Condition, Thread
+from flask import current_app, has_app_context
+from config import ERROR_LOG_FLUSH_SECONDS, ERROR_LOG_DEDUP_SECONDS, ERROR_LOG_MAX_PENDING
 from database.models import ErrorLog, db
-from flask import has_app_context
+from logs.logging_config import logger
+from metrics import registry
+
+ERRORS_LOGGED = registry.counter("errors_logged", "Errors reported to the error log", ["module"])
+ERRORS_DROPPED = registry.counter("errors_dropped", "Errors not logged because too many distinct ones were pending")
+
+
+class _PendingError:
+    def __init__(self, exception, seen_at):
+        self.exception = exception  # Only the first occurrence keeps its traceback
+        self.count = 0
+        self.first_seen = seen_at
+        self.last_seen = seen_at
+
+
+class ErrorLogWriter:
+    def __init__(self, flush_interval, dedup_seconds, max_pending):
+        self.flush_interval = flush_interval
+        self.dedup_window = timedelta(seconds=dedup_seconds)
+        self.max_pending = max_pending
+
+        self._condition = Condition()
+        self._pending = {}  # (module, message) -> _PendingError
+        self._recent = {}  # (module, message) -> (row id, last_seen) of rows inside the dedup window
+        self._app = None
+        self._thread = None
+
+    def add(self, module, exception, app=None):
+        """Record one occurrence. Never touches the database or formats anything."""
+        key = (module, str(exception))
+        now = datetime.utcnow()
+        with self._condition:
+            if self._thread is None:
+                if app is None and not has_app_context():
+                    return  # Nowhere to write it yet
+                self.start(app or current_app._get_current_object())
+
+            pending = self._pending.get(key)
+            if pending is None:
+                if len(self._pending) >= self.max_pending:
+                    ERRORS_DROPPED.inc()
+                    return
+                pending = self._pending[key] = _PendingError(exception, now)
+                self._condition.notify()
+            pending.count += 1
+            pending.last_seen = now
+        ERRORS_LOGGED.labels(module).inc()
+
+    def start(self, app):
+        """Start the writer thread; after this, errors can be logged from threads without an app context."""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._app = app
+            self._thread = Thread(target=self._run, name="ErrorLogWriter", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+            # Let repeats of the same errors accumulate into this batch
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        with self._condition:
+            batch, self._pending = self._pending, {}
+        if not batch or self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self._write(batch)
+        except Exception:
+            logger.exception(f"[ErrorLog] Failed to write {len(batch)} error(s)")
+
+    def _existing_row(self, key, since):
+        recent = self._recent.get(key)
+        if recent is not None and recent[1] >= since:
+            return recent[0]
+        # Not seen by this process (e.g. after a restart): look for a recent row
+        row = (db.session.query(ErrorLog.id)
+               .filter(ErrorLog.module == key[0], ErrorLog.message == key[1], ErrorLog.last_seen >= since)
+               .order_by(ErrorLog.id.desc()).first())
+        return row.id if row else None
+
+    def _write(self, batch):
+        try:
+            since = datetime.utcnow() - self.dedup_window
+            self._recent = {key: value for key, value in self._recent.items() if value[1] >= since}
+
+            for key, pending in batch.items():
+                row_id = self._existing_row(key, since)
+                updated = 0
+                if row_id is not None:
+                    updated = ErrorLog.query.filter_by(id=row_id).update(
+                        {"count": ErrorLog.count + pending.count, "last_seen": pending.last_seen},
+                        synchronize_session=False
+                    )
+                if not updated:
+                    exception = pending.exception
+                    row = ErrorLog(
+                        timestamp=pending.first_seen,
+                        module=key[0],
+                        message=key[1],
+                        traceback="".join(traceback.format_exception(type(exception), exception, exception.__traceback__)),
+                        count=pending.count,
+                        first_seen=pending.first_seen,
+                        last_seen=pending.last_seen
+                    )
+                    db.session.add(row)
+                    db.session.flush()
+                    row_id = row.id
+                self._recent[key] = (row_id, pending.last_seen)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self._recent = {}
+            raise
+
+
+error_log_writer = ErrorLogWriter(ERROR_LOG_FLUSH_SECONDS, ERROR_LOG_DEDUP_SECONDS, ERROR_LOG_MAX_PENDING)
+
+
+def start_error_log_writer(app):
+    error_log_writer.start(app)
+
 
 def log_error_to_db(module, exception):
-    if not has_app_context():
-        return  # prevenimos errores si se llama sin contexto de Flask
-
-    new_log = ErrorLog(
-        module=module,
-        message=str(exception),
-        traceback=traceback.format_exc()
-    )
-    db.session.add(new_log)
-    db.session.commit()
+    error_log_writer.add(module, exception)
@@ -1,12 +1,71 @@
+import atexit
 import logging
 import os
-from config import LOG_FILE_PATH, LOG_LEVEL
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_FILE_PATH, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_QUEUE_SIZE, LOG_REPEAT_SECONDS
+from metrics import registry
 
 # Crear la carpeta si no existe
 log_dir = os.path.dirname(LOG_FILE_PATH)
 if log_dir and not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
+DROPPED_RECORDS = registry.counter("log_records_dropped", "Log records dropped because the log queue was full")
+SUPPRESSED_RECORDS = registry.counter("log_records_suppressed", "Repeated warnings/errors not written to the log")
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without doing any I/O. The message
+    is merged with its args here, but the traceback is formatted on the
+    listener thread, so logger.exception() on a hot thread stays cheap.
+    When the queue is full the record is dropped and counted.
+
+    A warning or error identical to one logged less than repeat_seconds ago
+    is suppressed; the next one logged after that says how many were.
+    """
+
+    def __init__(self, queue, repeat_seconds):
+        super().__init__(queue)
+        self.repeat_seconds = repeat_seconds
+        self._repeats = {}  # (level, message) -> [logged_at, suppressed]
+        self._repeats_lock = threading.Lock()
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def emit(self, record):
+        if record.levelno >= logging.WARNING and self.repeat_seconds:
+            message = record.getMessage()
+            now = time.monotonic()
+            with self._repeats_lock:
+                entry = self._repeats.get((record.levelno, message))
+                if entry is not None and now - entry[0] < self.repeat_seconds:
+                    entry[1] += 1
+                    SUPPRESSED_RECORDS.inc()
+                    return
+                suppressed = entry[1] if entry else 0
+                if len(self._repeats) > 1000:
+                    self._repeats.clear()
+                self._repeats[(record.levelno, message)] = [now, 0]
+            if suppressed:
+                record = self.prepare(record)
+                record.msg = f"{record.msg} ({suppressed} identical messages suppressed)"
+        super().emit(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
 # Crear logger
 logger = logging.getLogger("FungiForge")
 logger.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))  # default INFO
@@ -17,12 +76,17 @@ formatter = logging.Formatter(
     datefmt="%Y-%m-%d %H:%M:%S"
 )
 
-# Handler de archivo
-file_handler = logging.FileHandler(LOG_FILE_PATH)
+# Handler de archivo, rotado para no llenar la tarjeta SD
+file_handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
 file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
 
 # Handler de consola (opcional, para desarrollo)
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
-logger.addHandler(console_handler)
+
+# The logging threads only enqueue; a single listener thread does the file and console I/O
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+logger.addHandler(_NonBlockingQueueHandler(log_queue, LOG_REPEAT_SECONDS))
+log_listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)  # Drains the queue on shutdown
@@ -3,17 +3,18 @@ import time
 import threading
 import re
 from i2c.sensors import read_sensors, save_sensor_data
-from config import SENSOR_LOG_INTERVAL, ENABLE_SENSOR_LOGGER
+from live.state import live_state
+from config import SENSOR_LOG_INTERVAL, ENABLE_SENSOR_LOGGER, READ_SENSORS_INTERVAL
 from logs.logging_config import logger
 from logs.db_logger import log_error_to_db
 
 def parse_interval(interval_str):
-    match = re.match(r'^(\d+)(s|m|h)$', interval_str.strip().lower())
+    match = re.match(r'^(\d+(?:\.\d+)?)(ms|s|m|h)$', interval_str.strip().lower())
     if not match:
         raise ValueError(f"Invalid interval format: {interval_str}")
     value, unit = match.groups()
-    value = int(value)
-    return value * {'s': 1, 'm': 60, 'h': 3600}[unit]
+    value = float(value)
+    return value * {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}[unit]
 
 def sensor_loop(app):
     interval = parse_interval(SENSOR_LOG_INTERVAL)
@@ -22,7 +23,10 @@ def sensor_loop(app):
     while True:
         try:
             with app.app_context():
-                data = read_sensors()
+                # Reuse the live sampler's reading when it is recent enough
+                data = live_state.get("sensors", max_age=min(interval, 10 * READ_SENSORS_INTERVAL))
+                if data is None:
+                    data = read_sensors()
                 save_sensor_data(data)
                 #logger.info(f"[SensorLogger] Saved: {data}")
         except Exception as e:
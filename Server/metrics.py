@@ -0,0 +1,263 @@
+# metrics.py
+"""
+In-process metrics for the hot paths (stream capture/encode, I2C
+transactions, sensor batch commits, smart plug calls, HTTP requests),
+served by /metrics in the Prometheus text format.
+
+Counters, gauges and histograms with fixed buckets, each optionally split
+by labels. Recording is a dict lookup, a bisect and an increment under a
+per-series lock (well under a microsecond), and nothing is aggregated until
+/metrics is scraped. Metrics are created at import time next to the code
+they measure:
+
+    I2C_SECONDS = registry.histogram("i2c_transaction_seconds", "...", ["priority"])
+    I2C_SECONDS.labels("servo").observe(elapsed)
+"""
+import bisect
+import threading
+import time
+from flask import g, request
+
+PREFIX = "fungiforge_"
+
+# Seconds; covers sub-millisecond bus transactions up to slow cloud calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterSeries:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeSeries:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from function() at scrape time instead (queue depths, viewer counts)."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class _HistogramSeries:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class _Timer:
+    """with histogram.time(): ... observes the elapsed seconds of the block."""
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.started)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), **options):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.options = options
+        self._series = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The series for these label values (positional, in labelnames order)."""
+        series = self._series.get(values)
+        if series is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                series = self._series.setdefault(values, self._new_series())
+        return series
+
+    def __getattr__(self, attribute):
+        # Unlabelled metrics are used directly: counter.inc(), histogram.observe(...)
+        if attribute.startswith("_") or "_default" not in self.__dict__:
+            raise AttributeError(attribute)
+        return getattr(self._default, attribute)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series_by_labels = sorted(self._series.items(), key=lambda item: item[0])
+        for values, series in series_by_labels:
+            lines.extend(self._render_series(values, series))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), **options):
+        super().__init__(name + "_total", documentation, labelnames, **options)
+
+    def _new_series(self):
+        return _CounterSeries()
+
+    def _render_series(self, values, series):
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(series.value)}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return _GaugeSeries()
+
+    def _render_series(self, values, series):
+        try:
+            value = series.get()
+        except Exception:
+            return
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def _new_series(self):
+        return _HistogramSeries(self.options.get("buckets") or LATENCY_BUCKETS)
+
+    def _render_series(self, values, series):
+        counts, total = series.snapshot()
+        cumulative = 0
+        for bound, count in zip(series.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, ("le", _format_value(float(bound))))
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **options):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **options)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with a different type or labels")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=None):
+        return self._get_or_create(Histogram, name, documentation, labelnames,
+                                   buckets=tuple(sorted(buckets)) if buckets else None)
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds", "Time to build the response (first byte for streams)", ["method", "route", "status"])
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled")
+
+
+def instrument_app(app):
+    """Per-route request latency, labelled by URL rule so ids in paths don't multiply series."""
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _observe(response):
+        started = g.get("metrics_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            HTTP_REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - started)
+        return response
+
+    @app.teardown_request
+    def _finish(exc):
+        # Runs even when the response could not be built
+        if g.pop("metrics_started", None) is not None:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
@@ -1,16 +1,25 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session
 from auth.oauth2_server import authorization
 from database.models import db, User
+from serving import blocking_route
 
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/oauth/token', methods=['POST'])
+@blocking_route
 def issue_token():
     return authorization.create_token_response()
 
 
+@auth_bp.route('/oauth/revoke', methods=['POST'])
+@blocking_route
+def revoke_token():
+    return authorization.create_endpoint_response('revocation')
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@blocking_route
 def login():
     if request.method == 'GET':
         return render_template('login.html')
@@ -33,6 +42,7 @@ def logout():
     return redirect(url_for('auth.login'))
 
 @auth_bp.route('/register', methods=['GET', 'POST'])
+@blocking_route
 def register():
     if request.method == 'GET':
         return render_template('register.html')
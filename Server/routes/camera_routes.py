@@ -1,19 +1,30 @@
+import io
 import os
-import time
-import cv2
-from datetime import datetime
-from threading import Event, Lock
+import re
+from threading import Lock
 from flask import Blueprint, Response, request, send_file, jsonify
-from config import AVAILABLE_RESOLUTIONS
-from camera.picam import picam2
+from config import (AVAILABLE_RESOLUTIONS, STILL_JPEG_QUALITY, STREAM_RENDITIONS, DEFAULT_STREAM_RENDITION, TIMELAPSE_VIDEO_FPS,
+                    TIMELAPSE_VIDEO_MAX_FPS, MOTION_DETECTION_ENABLED, STREAM_KEEPALIVE_SECONDS, MOTION_SAMPLE_INTERVAL)
+from camera.picam import camera, STILL_PIXEL_FORMAT, STREAM_PIXEL_FORMAT
 from camera.timelapse import start_timelapse, stop_timelapse, get_timelapse_config
-from camera.picam import video_config
+from camera.timelapse_video import build_avi, list_segments
+from camera.storage import capture_storage
+from camera.encoder import encode_jpeg
+from camera.motion import motion_detector
+from camera.streamer import FrameBroadcaster
 from logs.logging_config import logger
+from services import services
+from serving import blocking_route, stream_blocking
+from auth.oauth2_server import require_api_auth
 
 camera_bp = Blueprint('camera', __name__)
+camera_bp.before_request(require_api_auth)
+
+# Requests arriving while the camera service is still starting wait this long for it
+CAMERA_WAIT_SECONDS = 10
+
+RESOLUTION_PATTERN = re.compile(r"^(\d{1,5})x(\d{1,5})$")
 
-timelapse_thread = None
-timelapse_stop_event = Event()
 camera_stream_enabled = True  # global control
 rotation_angle = 0
 
@@ -30,34 +41,39 @@ def toggle_camera():
     })
 
 # ======= CAMERA STREAM FUNCTION ===========
-def generate_frames():
-    frame_count = 0
-    while True:
-        if not picam2 or not camera_stream_enabled:
-            time.sleep(0.1)
-            continue
-
-        try:
-            frame = picam2.capture_array()
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            if rotation_angle == 0:
-                frame_rotated = frame_rgb
-            elif rotation_angle == 90:
-                frame_rotated = cv2.rotate(frame_rgb, cv2.ROTATE_90_CLOCKWISE)
-            elif rotation_angle == 180:
-                frame_rotated = cv2.rotate(frame_rgb, cv2.ROTATE_180)
-            elif rotation_angle == 270:
-                frame_rotated = cv2.rotate(frame_rgb, cv2.ROTATE_90_COUNTERCLOCKWISE)
-
-            _, buffer = cv2.imencode('.jpg', frame_rotated)
-            
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-        except Exception as e:
-            logger.exception("[Camera Stream] Error capturing frame")
-            break
+def capture_stream_frame():
+    """Capture one lores frame. Runs only on the broadcaster thread."""
+    if not camera.available or not camera_stream_enabled:
+        return None
+    return camera.capture_stream_frame(), camera.stream_size
+
+def encode_stream_frame(captured, scale):
+    """Encode one rendition straight from the lores YUV420 buffer; rotation travels as EXIF orientation."""
+    frame, (width, height) = captured
+    size = (int(width * scale) // 2 * 2, int(height * scale) // 2 * 2)
+    return encode_jpeg(frame, STREAM_PIXEL_FORMAT, rotation_angle, width=width, size=size)
+
+def detect_stream_change(captured):
+    """Feed the change detector; a static scene is only streamed every STREAM_KEEPALIVE_SECONDS."""
+    frame, size = captured
+    try:
+        return motion_detector.observe(frame, size)
+    except Exception:
+        logger.exception("[Camera Stream] Change detection failed")
+        return True
+
+# One capture loop shared by every /video_feed client, encoded once per rendition
+frame_broadcaster = FrameBroadcaster(
+    capture_stream_frame, encode_stream_frame, STREAM_RENDITIONS,
+    detect=detect_stream_change if MOTION_DETECTION_ENABLED and STREAM_KEEPALIVE_SECONDS > 0 else None,
+    keepalive_interval=STREAM_KEEPALIVE_SECONDS,
+    static_interval=MOTION_SAMPLE_INTERVAL
+)
+
+def generate_frames(quality, fps):
+    for frame in frame_broadcaster.frames(quality, fps):
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
 @camera_bp.route('/set_rotation', methods=['POST'])
 def set_rotation():
@@ -76,17 +92,33 @@ def set_rotation():
 
 @camera_bp.route('/video_feed')
 def video_feed():
-    if not picam2:
+    if not services.wait("camera", CAMERA_WAIT_SECONDS):
         return "Cámara no disponible", 503
-    return Response(generate_frames(),
+
+    quality = request.args.get("quality", DEFAULT_STREAM_RENDITION)
+    if quality not in STREAM_RENDITIONS:
+        return f"Invalid quality, use one of: {', '.join(STREAM_RENDITIONS)}", 400
+
+    fps = request.args.get("fps", type=float)
+    if fps is not None and fps <= 0:
+        return "fps must be positive", 400
+
+    return Response(generate_frames(quality, fps),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@camera_bp.route('/motion_status', methods=['GET'])
+def motion_status():
+    status = motion_detector.status()
+    status["stream_frames_skipped"] = frame_broadcaster.skipped
+    return jsonify(status)
+
 @camera_bp.route('/timelapse_status', methods=['GET'])
 def timelapse_status():
     return jsonify(get_timelapse_config())
 
 
 @camera_bp.route('/timelapse', methods=['POST'])
+@blocking_route
 def handle_timelapse():
     data = request.get_json()
     action = data.get("action")
@@ -110,10 +142,61 @@ def handle_timelapse():
     return jsonify({"message": "Invalid action"}), 400
 
 
+@camera_bp.route('/timelapse/videos', methods=['GET'])
+def timelapse_videos():
+    return jsonify([
+        {"date": date, "width": width, "height": height, "frames": frames}
+        for date, (width, height), frames in list_segments()
+    ])
+
+
+@camera_bp.route('/timelapse/video', methods=['GET'])
+@camera_bp.route('/timelapse/video/<date>', methods=['GET'])
+@blocking_route
+def timelapse_video_file(date=None):
+    """Whole-run (or single day) timelapse as an MJPEG AVI, assembled from the incremental segments."""
+    resolution = request.args.get("resolution")
+    if resolution:
+        match = RESOLUTION_PATTERN.match(resolution)
+        if not match:
+            return jsonify({"error": "resolution must be WIDTHxHEIGHT, e.g. 1920x1080"}), 400
+        resolution = (int(match.group(1)), int(match.group(2)))
+
+    try:
+        fps = int(request.args.get("fps", TIMELAPSE_VIDEO_FPS))
+        step = int(request.args.get("step", 1))
+    except ValueError:
+        return jsonify({"error": "fps and step must be integers"}), 400
+    if fps <= 0 or step <= 0:
+        return jsonify({"error": "fps and step must be positive"}), 400
+    fps = min(fps, TIMELAPSE_VIDEO_MAX_FPS)  # The AVI header stores fps-derived 32-bit fields
+
+    try:
+        segments = list_segments()
+        if date:
+            segments = [s for s in segments if s[0] == date]
+        if not segments:
+            return jsonify({"error": "No timelapse video available"}), 404
+
+        resolution = resolution or segments[-1][1]  # Latest resolution used
+        dates = [d for d, res, _ in segments if res == resolution]
+        if not dates:
+            return jsonify({"error": f"No timelapse video at {resolution[0]}x{resolution[1]}"}), 404
+
+        size, chunks = build_avi(dates, resolution, fps=fps, step=step)
+        filename = f"timelapse_{date or 'all'}_{resolution[0]}x{resolution[1]}.avi"
+        return Response(stream_blocking(lambda: chunks), mimetype='video/x-msvideo', headers={
+            "Content-Length": str(size),
+            "Content-Disposition": f'inline; filename="{filename}"'
+        })
+    except Exception as e:
+        logger.exception("[Timelapse] Error building video")
+        return jsonify({"error": str(e)}), 500
+
 
 @camera_bp.route('/set_stream_resolution', methods=['POST'])
+@blocking_route
 def set_stream_resolution():
-    global video_config, picam2
     try:
         data = request.get_json()
         width, height = map(int, data.get("resolution", "640x480").split("x"))
@@ -121,11 +204,14 @@ def set_stream_resolution():
         if resolution not in AVAILABLE_RESOLUTIONS:
             return jsonify({"error": "Unsupported resolution"}), 400
 
-        # Reconfigura la cámara para el nuevo tamaño
-        picam2.stop()
-        video_config = picam2.create_video_configuration(main={"size": resolution})
-        picam2.configure(video_config)
-        picam2.start()
+        if not services.wait("camera", CAMERA_WAIT_SECONDS):
+            return jsonify({"error": "Camera not available"}), 503
+
+        # Reconfigura el stream lores para el nuevo tamaño
+        try:
+            camera.set_stream_size(resolution)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         return jsonify({"message": f"Stream resolution set to {width}x{height}"}), 200
     except Exception as e:
         logger.exception("[Camera] Error setting stream resolution")
@@ -133,8 +219,9 @@ def set_stream_resolution():
 
 
 @camera_bp.route('/capture_image', methods=['GET'])
+@blocking_route
 def capture_image():
-    if not picam2:
+    if not services.wait("camera", CAMERA_WAIT_SECONDS):
         return jsonify({"error": "La cámara no está disponible"}), 503
 
     try:
@@ -148,38 +235,16 @@ def capture_image():
                 "available_resolutions": AVAILABLE_RESOLUTIONS
             }), 400
 
-        # Stop current stream, reconfigure for still capture
-        picam2.stop()
-        still_config = picam2.create_still_configuration(main={"size": resolution})
-        picam2.configure(still_config)
-        picam2.start()
-        #time.sleep(0.5)
-
-        # Capture image
-        image = picam2.capture_array()
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-        # Prepare folder structure
-        root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../'))  # Go up from /Server
-        pictures_dir = os.path.join(root_dir, "Pictures")
-        date_folder = datetime.now().strftime("%Y-%m-%d")
-        save_folder = os.path.join(pictures_dir, date_folder)
-        os.makedirs(save_folder, exist_ok=True)
-
-        # Create filename with current time
-        timestamp = datetime.now().strftime("%H-%M-%S")
-        filename = f"{timestamp}.jpg"
-        filepath = os.path.join(save_folder, filename)
-
-        cv2.imwrite(filepath, image)
-
-        # Restore video config
-        picam2.stop()
-        picam2.configure(video_config)
-        picam2.start()
-
-        # Return the file
-        return send_file(filepath, mimetype='image/jpeg', as_attachment=True)
+        # Capture from the main stream without stopping the live stream
+        jpeg = encode_jpeg(camera.capture_still(resolution), STILL_PIXEL_FORMAT, quality=STILL_JPEG_QUALITY)
+
+        # Written in the background; the response is served from memory
+        filepath = capture_storage.save("pictures", jpeg, resolution, "capture")
+        if filepath is None:
+            return jsonify({"error": "Storage is busy, try again"}), 503
+
+        return send_file(io.BytesIO(jpeg), mimetype='image/jpeg', as_attachment=True,
+                         download_name=os.path.basename(filepath))
 
     except Exception as e:
         logger.exception("[Camera] Error capturing image")
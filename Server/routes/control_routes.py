@@ -0,0 +1,106 @@
+from flask import Blueprint, request, jsonify
+from control.engine import MODES, control_engine, reload_rules
+from database.models import ControlRule, db
+from database.rollups import METRICS
+from auth.oauth2_server import require_api_auth
+from serving import blocking_route
+
+control_bp = Blueprint('control', __name__)
+control_bp.before_request(require_api_auth)
+
+RULE_FIELDS = ("name", "metric", "mode", "low", "high", "average_seconds", "min_on_seconds",
+               "min_off_seconds", "target", "enabled")
+
+
+def serialize_rule(rule):
+    return {field: getattr(rule, field) for field in ("id",) + RULE_FIELDS}
+
+
+def apply_rule_fields(rule, data):
+    """Copy the given fields onto a rule and validate the result. Raises ValueError."""
+    for field in RULE_FIELDS:
+        if field in data:
+            setattr(rule, field, data[field])
+
+    if not rule.name:
+        raise ValueError("name is required")
+    if rule.metric not in METRICS:
+        raise ValueError(f"metric must be one of: {', '.join(METRICS)}")
+    if rule.mode not in MODES:
+        raise ValueError(f"mode must be one of: {', '.join(MODES)}")
+    rule.low, rule.high = float(rule.low), float(rule.high)
+    if rule.low > rule.high:
+        raise ValueError("low must not be greater than high")
+    for field in ("average_seconds", "min_on_seconds", "min_off_seconds"):
+        value = float(getattr(rule, field) or 0)
+        if value < 0:
+            raise ValueError(f"{field} must not be negative")
+        setattr(rule, field, value)
+    rule.target = rule.target or 'smartplug'
+    if rule.enabled is None:
+        rule.enabled = True
+    elif not isinstance(rule.enabled, bool):
+        raise ValueError("enabled must be true or false")
+
+
+@control_bp.route('/control/rules', methods=['GET'])
+@blocking_route
+def list_rules():
+    return jsonify([serialize_rule(rule) for rule in ControlRule.query.order_by(ControlRule.id).all()])
+
+
+@control_bp.route('/control/rules', methods=['POST'])
+@blocking_route
+def create_rule():
+    data = request.get_json() or {}
+    missing = [field for field in ("name", "metric", "mode", "low", "high") if field not in data]
+    if missing:
+        return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
+
+    rule = ControlRule()
+    try:
+        apply_rule_fields(rule, data)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    db.session.add(rule)
+    db.session.commit()
+    reload_rules()
+    return jsonify(serialize_rule(rule)), 201
+
+
+@control_bp.route('/control/rules/<int:rule_id>', methods=['PUT'])
+@blocking_route
+def update_rule(rule_id):
+    rule = db.session.get(ControlRule, rule_id)
+    if rule is None:
+        return jsonify({"error": "Rule not found"}), 404
+
+    try:
+        apply_rule_fields(rule, request.get_json() or {})
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    db.session.commit()
+    reload_rules()
+    return jsonify(serialize_rule(rule))
+
+
+@control_bp.route('/control/rules/<int:rule_id>', methods=['DELETE'])
+@blocking_route
+def delete_rule(rule_id):
+    rule = db.session.get(ControlRule, rule_id)
+    if rule is None:
+        return jsonify({"error": "Rule not found"}), 404
+
+    db.session.delete(rule)
+    db.session.commit()
+    reload_rules()
+    return jsonify({"message": "Rule deleted"})
+
+
+@control_bp.route('/control/status', methods=['GET'])
+def control_status():
+    """Live state of every rule: averaged value, output and time since the last switch."""
+    return jsonify(control_engine.status())
@@ -0,0 +1,39 @@
+import json
+from flask import Blueprint, Response
+from live.state import live_state
+from auth.oauth2_server import require_api_auth
+
+events_bp = Blueprint('events', __name__)
+events_bp.before_request(require_api_auth)
+
+KEEPALIVE_SECONDS = 15
+
+
+def _format_event(topic, value):
+    return f"event: {topic}\ndata: {json.dumps(value)}\n\n"
+
+
+def generate_events():
+    # Start with a snapshot of everything, then only push what changed
+    version, changes = live_state.changes_since(0)
+    yield "retry: 2000\n\n"
+    for topic, value in changes.items():
+        yield _format_event(topic, value)
+
+    while True:
+        new_version, changes = live_state.wait_for_changes(version, KEEPALIVE_SECONDS)
+        if new_version == version:
+            yield ": keepalive\n\n"
+            continue
+        version = new_version
+        for topic, value in changes.items():
+            yield _format_event(topic, value)
+
+
+@events_bp.route('/events')
+def events():
+    """Server-Sent Events stream of sensors, servo position, smart plug state and change detection."""
+    return Response(generate_events(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
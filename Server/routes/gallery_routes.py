@@ -0,0 +1,106 @@
+import io
+import os
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, send_file, url_for
+from config import THUMBNAIL_SIZE, THUMBNAIL_SIZE_MAX
+from camera.thumbnails import thumbnail_cache
+from camera.storage import capture_storage
+from database.models import CapturedImage, db
+from logs.logging_config import logger
+from auth.oauth2_server import require_api_auth
+from serving import blocking_route
+
+gallery_bp = Blueprint('gallery', __name__)
+gallery_bp.before_request(require_api_auth)
+
+
+@gallery_bp.route('/gallery', methods=['GET'])
+@blocking_route
+def gallery():
+    """
+    Newest-first page of catalogued captures, served from the catalog index only.
+    Pass the returned next_before as ?before= to get the following page.
+    """
+    try:
+        limit = min(int(request.args.get('limit', 50)), 500)
+        before = request.args.get('before', type=int)
+        source = request.args.get('source')  # 'timelapse', 'capture' or 'motion'
+        start_date = request.args.get('start_date')  # Format: YYYY-MM-DD
+        end_date = request.args.get('end_date')
+
+        query = CapturedImage.query
+        if source:
+            query = query.filter(CapturedImage.source == source)
+        if start_date:
+            query = query.filter(CapturedImage.timestamp >= datetime.strptime(start_date, "%Y-%m-%d"))
+        if end_date:
+            query = query.filter(CapturedImage.timestamp < datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1))
+        if before:
+            query = query.filter(CapturedImage.id < before)
+
+        images = query.order_by(CapturedImage.id.desc()).limit(limit).all()
+
+        return jsonify({
+            "images": [
+                {
+                    "id": image.id,
+                    "timestamp": image.timestamp.isoformat(),
+                    "width": image.width,
+                    "height": image.height,
+                    "size_bytes": image.size_bytes,
+                    "source": image.source,
+                    "filename": os.path.basename(image.path),
+                    "image_url": url_for('gallery.gallery_image', image_id=image.id),
+                    "thumbnail_url": url_for('gallery.gallery_thumbnail', image_id=image.id)
+                }
+                for image in images
+            ],
+            "next_before": images[-1].id if len(images) == limit else None
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@gallery_bp.route('/gallery/storage', methods=['GET'])
+@blocking_route
+def gallery_storage():
+    """Usage and quota of each capture folder, free disk space and pending writes."""
+    try:
+        return jsonify(capture_storage.status())
+    except Exception as e:
+        logger.exception("[Gallery] Error reading storage status")
+        return jsonify({"error": str(e)}), 500
+
+
+@gallery_bp.route('/gallery/<int:image_id>/image', methods=['GET'])
+def gallery_image(image_id):
+    image = db.session.get(CapturedImage, image_id)
+    if not image or not os.path.exists(image.path):
+        return jsonify({"error": "Image not found"}), 404
+    return send_file(image.path, mimetype='image/jpeg')
+
+
+@gallery_bp.route('/gallery/<int:image_id>/thumbnail', methods=['GET'])
+@blocking_route
+def gallery_thumbnail(image_id):
+    try:
+        size = int(request.args.get('size', THUMBNAIL_SIZE))
+    except ValueError:
+        return jsonify({"error": "size must be an integer"}), 400
+    if size <= 0:
+        return jsonify({"error": "size must be positive"}), 400
+    size = min(size, THUMBNAIL_SIZE_MAX)
+
+    image = db.session.get(CapturedImage, image_id)
+    if not image or not os.path.exists(image.path):
+        return jsonify({"error": "Image not found"}), 404
+
+    try:
+        data = thumbnail_cache.get(image.id, image.path, size)
+    except Exception as e:
+        logger.exception("[Gallery] Error generating thumbnail")
+        return jsonify({"error": str(e)}), 500
+
+    response = send_file(io.BytesIO(data), mimetype='image/jpeg')
+    response.headers['Cache-Control'] = 'private, max-age=86400'
+    return response
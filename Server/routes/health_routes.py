@@ -0,0 +1,11 @@
+from flask import Blueprint, jsonify
+from services import services
+
+health_bp = Blueprint('health', __name__)
+
+
+@health_bp.route('/health', methods=['GET'])
+def health():
+    """Readiness of every service with its startup time. 503 until all of them are ready."""
+    status = services.status()
+    return jsonify(status), 200 if status["ready"] else 503
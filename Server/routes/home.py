@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, redirect, url_for, session, request
 from functools import wraps
 #from requests import request
-from config import AVAILABLE_RESOLUTIONS, READ_SENSORS, READ_SERVOS, INVERT_PAN_AXIS, INVERT_TILT_AXIS
+from config import AVAILABLE_RESOLUTIONS, READ_SENSORS, READ_SERVOS, INVERT_PAN_AXIS, INVERT_TILT_AXIS, STREAM_RENDITIONS, DEFAULT_STREAM_RENDITION
 
 home_bp = Blueprint('home', __name__)
 
@@ -26,4 +26,6 @@ def index():
                            read_sensors=READ_SENSORS, 
                            read_servos=READ_SERVOS,
                            inverted_pan = INVERT_PAN_AXIS,
-                           inverted_tilt = INVERT_TILT_AXIS)
+                           inverted_tilt = INVERT_TILT_AXIS,
+                           stream_renditions=STREAM_RENDITIONS,
+                           default_stream_rendition=DEFAULT_STREAM_RENDITION)
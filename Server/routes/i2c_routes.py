@@ -1,18 +1,24 @@
-import threading
-import smbus2
-from datetime import datetime
-from flask import Blueprint, request, jsonify
-from sqlalchemy import and_
+import json
+import zlib
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, request, jsonify
+from sqlalchemy import and_, select, tuple_
 from i2c.sensors import read_sensors, save_sensor_data
-from i2c.servos import set_pan_tilt, get_current_pan_tilt
-from database.models import SensorReading
-from config import READ_SENSORS, READ_SERVOS
+from i2c.servos import get_current_pan_tilt, servo_controller
+from i2c.bus import i2c_bus
+from database.models import SensorReading, db
+from database.retention import read_archived_readings
+from database.rollups import RESOLUTIONS, pick_resolution, query_rollups
+from live.state import live_state
+from config import READ_SENSORS, READ_SERVOS, READ_SENSORS_INTERVAL, READ_SERVOS_INTERVAL
+from auth.oauth2_server import require_api_auth
+from serving import blocking_route, stream_blocking
 
 i2c_bp = Blueprint('i2c', __name__)
+i2c_bp.before_request(require_api_auth)
 
-# I²C Bus
-bus = smbus2.SMBus(1)  # Use I²C bus 1 (default for Raspberry Pi)
-i2c_lock = threading.Lock()
+# A sampled value is still fresh if it is at most this many sampling intervals old
+LIVE_MAX_AGE_FACTOR = 10
 
 # ======= SERVO CONTROL FUNCTION ===========
 @i2c_bp.route('/request_current_pan_tilt', methods=['GET'])
@@ -20,20 +26,23 @@ def request_current_pan_tilt():
     
     if not READ_SERVOS:
         return jsonify({"error": "Servo control is disabled"}), 503
-    
-    return jsonify(get_current_pan_tilt())
+
+    # Served from the live sampler; only touch the bus if it has nothing recent
+    position = live_state.get("servos", max_age=LIVE_MAX_AGE_FACTOR * READ_SERVOS_INTERVAL)
+    if position is None:
+        position = get_current_pan_tilt()
+    return jsonify(position)
 
 @i2c_bp.route('/send_pan_tilt', methods=['POST'])
 def send_pan_tilt():
-    global requested_pan, requested_tilt, servo_position
-
     if not READ_SERVOS:
         return jsonify({"error": "Servo control is disabled"}), 503
     
     data = request.get_json()
     if 'pan' in data and 'tilt' in data:
-        result = set_pan_tilt(data['pan'], data['tilt'])
-        return jsonify({"message": "Servo command queued", **result})
+        # Latest target wins; the controller writes it out at a bounded rate
+        target = servo_controller.set_target(data['pan'], data['tilt'])
+        return jsonify({"message": "Servo command queued", **target})
     else:
         return jsonify({"error": "Missing pan or tilt value"}), 400
 
@@ -44,81 +53,254 @@ def get_sensors():
     if not READ_SENSORS:
         return jsonify({"error": "Sensor reading is disabled"}), 503
     
-    # Read sensor data from the I²C bus
-    sensor_data = read_sensors()
+    # Served from the live sampler; only touch the bus if it has nothing recent
+    sensor_data = live_state.get("sensors", max_age=LIVE_MAX_AGE_FACTOR * READ_SENSORS_INTERVAL)
+    if sensor_data is None:
+        sensor_data = read_sensors()
 
     return jsonify(sensor_data)
 
 
+@i2c_bp.route('/i2c/stats', methods=['GET'])
+def i2c_stats():
+    """Bus arbiter queue depth, counters and latency per priority."""
+    return jsonify(i2c_bus.stats())
+
+
+def build_reading_filters(args):
+    """SQLAlchemy filters for the reading query-string filters shared by the history endpoints."""
+    min_temp_air = args.get('min_temp_air', type=float)
+    max_temp_air = args.get('max_temp_air', type=float)
+    min_humidity = args.get('min_humidity', type=float)
+    max_humidity = args.get('max_humidity', type=float)
+    min_temp_sub = args.get('min_temp_sub', type=float)
+    max_temp_sub = args.get('max_temp_sub', type=float)
+    min_moisture = args.get('min_moisture', type=float)
+    max_moisture = args.get('max_moisture', type=float)
+
+    start_date = args.get('start_date')  # Format: YYYY-MM-DD
+    end_date = args.get('end_date')
+
+    filters = []
+
+    if min_temp_air is not None:
+        filters.append(SensorReading.temperature_air >= min_temp_air)
+    if max_temp_air is not None:
+        filters.append(SensorReading.temperature_air <= max_temp_air)
+    if min_humidity is not None:
+        filters.append(SensorReading.humidity_air >= min_humidity)
+    if max_humidity is not None:
+        filters.append(SensorReading.humidity_air <= max_humidity)
+    if min_temp_sub is not None:
+        filters.append(SensorReading.temperature_substrate >= min_temp_sub)
+    if max_temp_sub is not None:
+        filters.append(SensorReading.temperature_substrate <= max_temp_sub)
+    if min_moisture is not None:
+        filters.append(SensorReading.moisture_substrate >= min_moisture)
+    if max_moisture is not None:
+        filters.append(SensorReading.moisture_substrate <= max_moisture)
+    if start_date:
+        filters.append(SensorReading.timestamp >= datetime.strptime(start_date, "%Y-%m-%d"))
+    if end_date:
+        filters.append(SensorReading.timestamp <= datetime.strptime(end_date, "%Y-%m-%d"))
+
+    return filters
+
+
+def serialize_reading(reading):
+    return {
+        "id": reading.id,
+        "timestamp": reading.timestamp.isoformat(),
+        "temperature_air": reading.temperature_air,
+        "humidity_air": reading.humidity_air,
+        "temperature_substrate": reading.temperature_substrate,
+        "moisture_substrate": reading.moisture_substrate
+    }
+
+
+def parse_cursor(after):
+    """(timestamp, id) from an "<ISO timestamp>,<id>" cursor. Raises ValueError."""
+    timestamp, separator, reading_id = after.rpartition(',')
+    if not separator:
+        raise ValueError("after must be <timestamp>,<id>")
+    return datetime.fromisoformat(timestamp), int(reading_id)
+
+
+def _readings_after_cursor(filters, after, per_page, include_total):
+    """
+    Keyset page: walks the (timestamp, id) index from the cursor (a parsed
+    (timestamp, id) or None), so the cost does not grow with the page depth
+    and no COUNT(*) runs unless asked for.
+    """
+    query = SensorReading.query.filter(and_(*filters))
+    total = query.count() if include_total else None
+
+    if after:
+        query = query.filter(tuple_(SensorReading.timestamp, SensorReading.id) < tuple_(*after))
+
+    readings = query.order_by(SensorReading.timestamp.desc(), SensorReading.id.desc()).limit(per_page).all()
+
+    next_after = None
+    if len(readings) == per_page:
+        last = readings[-1]
+        next_after = f"{last.timestamp.isoformat()},{last.id}"
+
+    response = {
+        "per_page": per_page,
+        "next_after": next_after,
+        "readings": [serialize_reading(r) for r in readings]
+    }
+    if include_total:
+        response["total"] = total
+    return response
+
+
 @i2c_bp.route('/readings_history', methods=['GET'])
+@blocking_route
 def get_readings_history():
     try:
-        # Pagination
-        page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 20))
+        after = parse_cursor(request.args['after']) if request.args.get('after') else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid per_page or after: {e}"}), 400
+    if per_page < 1:
+        return jsonify({"error": "per_page must be positive"}), 400
+
+    try:
+        filters = build_reading_filters(request.args)
+
+        # Cursor mode: ?after=<timestamp,id> (empty for the first page)
+        if 'after' in request.args:
+            include_total = request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
+            return jsonify(_readings_after_cursor(filters, after, per_page, include_total))
 
-        # Filters
-        min_temp_air = request.args.get('min_temp_air', type=float)
-        max_temp_air = request.args.get('max_temp_air', type=float)
-        min_humidity = request.args.get('min_humidity', type=float)
-        max_humidity = request.args.get('max_humidity', type=float)
-        min_temp_sub = request.args.get('min_temp_sub', type=float)
-        max_temp_sub = request.args.get('max_temp_sub', type=float)
-        min_moisture = request.args.get('min_moisture', type=float)
-        max_moisture = request.args.get('max_moisture', type=float)
-
-        start_date = request.args.get('start_date')  # Format: YYYY-MM-DD
-        end_date = request.args.get('end_date')
-
-        # Build query filters
-        filters = []
-
-        if min_temp_air is not None:
-            filters.append(SensorReading.temperature_air >= min_temp_air)
-        if max_temp_air is not None:
-            filters.append(SensorReading.temperature_air <= max_temp_air)
-        if min_humidity is not None:
-            filters.append(SensorReading.humidity_air >= min_humidity)
-        if max_humidity is not None:
-            filters.append(SensorReading.humidity_air <= max_humidity)
-        if min_temp_sub is not None:
-            filters.append(SensorReading.temperature_substrate >= min_temp_sub)
-        if max_temp_sub is not None:
-            filters.append(SensorReading.temperature_substrate <= max_temp_sub)
-        if min_moisture is not None:
-            filters.append(SensorReading.moisture_substrate >= min_moisture)
-        if max_moisture is not None:
-            filters.append(SensorReading.moisture_substrate <= max_moisture)
-        if start_date:
-            filters.append(SensorReading.timestamp >= datetime.strptime(start_date, "%Y-%m-%d"))
-        if end_date:
-            filters.append(SensorReading.timestamp <= datetime.strptime(end_date, "%Y-%m-%d"))
-
-        # Run query with filters and pagination
+        # Page mode (kept for existing clients; runs COUNT(*) and an OFFSET scan)
+        page = int(request.args.get('page', 1))
         pagination = SensorReading.query.filter(and_(*filters)).order_by(SensorReading.timestamp.desc()).paginate(
             page=page,
             per_page=per_page,
             error_out=False
         )
 
-        results = [
-            {
-                "timestamp": reading.timestamp.isoformat(),
-                "temperature_air": reading.temperature_air,
-                "humidity_air": reading.humidity_air,
-                "temperature_substrate": reading.temperature_substrate,
-                "moisture_substrate": reading.moisture_substrate
-            }
-            for reading in pagination.items
-        ]
-
         return jsonify({
             "page": pagination.page,
             "per_page": pagination.per_page,
             "total": pagination.total,
             "pages": pagination.pages,
-            "readings": results
+            "readings": [serialize_reading(r) for r in pagination.items]
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+@i2c_bp.route('/readings_aggregate', methods=['GET'])
+@blocking_route
+def get_readings_aggregate():
+    """
+    Min/max/avg per bucket from the rollup tables. The resolution is the finest
+    one (minute, hour, day) that keeps the range within `points` buckets,
+    unless `resolution` is given explicitly.
+    """
+    try:
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=1)
+        points = int(request.args.get('points', 500))
+        if start >= end or points <= 0:
+            return jsonify({"error": "start must be before end and points must be positive"}), 400
+
+        resolution = request.args.get('resolution') or pick_resolution(start, end, points)
+        if resolution not in RESOLUTIONS:
+            return jsonify({"error": f"Invalid resolution, use one of: {', '.join(RESOLUTIONS)}"}), 400
+
+        return jsonify({
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "resolution": resolution,
+            "buckets": query_rollups(start, end, resolution)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+EXPORT_COLUMNS = ("id", "timestamp", "temperature_air", "humidity_air", "temperature_substrate", "moisture_substrate")
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _export_lines(rows, fmt):
+    if fmt == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\n"
+    for row in rows:
+        values = dict(zip(EXPORT_COLUMNS, row)) if not isinstance(row, dict) else row
+        values["timestamp"] = values["timestamp"].isoformat()
+        if fmt == "csv":
+            yield ",".join(str(values[c]) for c in EXPORT_COLUMNS) + "\n"
+        else:
+            yield json.dumps({c: values[c] for c in EXPORT_COLUMNS}) + "\n"
+
+
+def _export_chunks(lines, compress):
+    """Group lines into ~64 KiB chunks, optionally gzip-compressed on the fly."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            data = "".join(buffer).encode()
+            buffer, size = [], 0
+            data = compressor.compress(data) if compressor else data
+            if data:
+                yield data
+    data = "".join(buffer).encode()
+    if compressor:
+        data = compressor.compress(data) + compressor.flush()
+    if data:
+        yield data
+
+
+@i2c_bp.route('/readings_export', methods=['GET'])
+def export_readings():
+    """
+    Stream readings as CSV or NDJSON, oldest first, straight from a
+    server-side cursor: memory use is the same for ten rows or ten million.
+    Accepts start/end (ISO), the /readings_history filters, gzip=1 and
+    include_archive=1 (archived rows are filtered by start/end only).
+    """
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({"error": "format must be csv or ndjson"}), 400
+
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+        compress = request.args.get('gzip', 'false').lower() in ('1', 'true', 'yes')
+        include_archive = request.args.get('include_archive', 'false').lower() in ('1', 'true', 'yes')
+
+        filters = build_reading_filters(request.args)
+        if start:
+            filters.append(SensorReading.timestamp >= start)
+        if end:
+            filters.append(SensorReading.timestamp < end)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    statement = (
+        select(*(getattr(SensorReading, c) for c in EXPORT_COLUMNS))
+        .where(and_(*filters))
+        .order_by(SensorReading.timestamp, SensorReading.id)
+        .execution_options(yield_per=1000)
+    )
+
+    def rows():
+        if include_archive:
+            yield from read_archived_readings(start, end)
+        yield from db.session.execute(statement)
+
+    filename = f"readings.{fmt}" + (".gz" if compress else "")
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    return Response(
+        stream_blocking(lambda: _export_chunks(_export_lines(rows(), fmt), compress)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from metrics import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Every counter, gauge and histogram in the Prometheus text format."""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
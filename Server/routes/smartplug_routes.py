@@ -1,14 +1,16 @@
 from flask import Blueprint, jsonify, request
-from smart import get_status, turn_on, turn_off, get_device_info
+from smart import get_status, get_full_status, get_cache_stats, turn_on, turn_off
+from live.state import live_state
+from auth.oauth2_server import require_api_auth
 
 smartplug_bp = Blueprint('smartplug', __name__)
+smartplug_bp.before_request(require_api_auth)
 
 @smartplug_bp.route('/smartplug/fullstatus', methods=['GET'])
 def smartplug_fullstatus():
     try:
-        device = get_device_info()
-        status = get_status()
-        return jsonify({"status": status})
+        device, status = get_full_status()
+        return jsonify({"status": status, "device": device})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -30,6 +32,10 @@ def smartplug_status():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@smartplug_bp.route('/smartplug/cache_stats', methods=['GET'])
+def smartplug_cache_stats():
+    return jsonify(get_cache_stats())
+
 @smartplug_bp.route('/smartplug/toggle', methods=['POST'])
 def smartplug_toggle():
     try:
@@ -41,6 +47,9 @@ def smartplug_toggle():
             result = turn_off()
         else:
             return jsonify({"error": "Invalid action"}), 400
+        if result and result.get("success"):
+            # Push the new state to /events subscribers without waiting for the next poll
+            live_state.update("smartplug", {"status": action == 'on'})
         return jsonify({"result": result})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
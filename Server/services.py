@@ -0,0 +1,117 @@
+# services.py
+"""
+Hardware and slow subsystems (camera, I2C bus, smart plug, rollup backfill,
+timelapse resume) as lazily started services.
+
+Nothing here runs at import time. start_all() boots every service in
+parallel on background threads, so the HTTP server is up before any of
+them is ready; code that needs one calls wait(name), which also starts it
+on demand when start_all() was never called (scripts, benchmarks). A
+failing service is reported by /health instead of taking the server down.
+"""
+import threading
+import time
+from logs.logging_config import logger
+from serving import Notifier
+
+PENDING, STARTING, READY, FAILED = "pending", "starting", "ready", "failed"
+
+
+class Service:
+    def __init__(self, name, start, depends_on=(), needs_app=False):
+        self.name = name
+        self.start = start
+        self.depends_on = tuple(depends_on)
+        self.needs_app = needs_app
+        self.state = PENDING
+        self.error = None
+        self.started_at = None
+        self.seconds = None
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self.app = None
+        self.app_seconds = None
+        self._services = {}
+        self._notifier = Notifier()
+
+    def init_app(self, app):
+        self.app = app
+        self.app_seconds = time.monotonic() - self.created_at
+
+    def register(self, name, start, depends_on=(), needs_app=False):
+        self._services[name] = Service(name, start, depends_on, needs_app)
+
+    def start_all(self):
+        """Start every service in parallel in the background; returns immediately."""
+        for name in self._services:
+            self._launch(name)
+
+    def _launch(self, name):
+        service = self._services[name]
+        with self._notifier:
+            if service.state != PENDING:
+                return
+            service.state = STARTING
+        threading.Thread(target=self._run, args=(service,), name=f"Service-{name}", daemon=True).start()
+
+    def _run(self, service):
+        for dependency in service.depends_on:
+            if not self.wait(dependency):
+                self._finish(service, FAILED, f"dependency '{dependency}' is not ready")
+                return
+
+        service.started_at = time.monotonic()
+        try:
+            if service.needs_app:
+                with self.app.app_context():
+                    service.start()
+            else:
+                service.start()
+        except Exception as e:
+            logger.exception(f"[Services] {service.name} failed to start")
+            self._finish(service, FAILED, str(e))
+            return
+        self._finish(service, READY)
+
+    def _finish(self, service, state, error=None):
+        with self._notifier:
+            service.state = state
+            service.error = error
+            if service.started_at is not None:
+                service.seconds = time.monotonic() - service.started_at
+        self._notifier.notify_all()
+        if state == READY:
+            logger.info(f"[Services] {service.name} ready in {service.seconds:.2f}s")
+
+    def wait(self, name, timeout=30.0):
+        """Start the service if needed and wait for it. True once it is ready."""
+        self._launch(name)
+        service = self._services[name]
+        self._notifier.wait_for(lambda: service.state in (READY, FAILED), timeout)
+        return service.state == READY
+
+    def is_ready(self, name):
+        return self._services[name].state == READY
+
+    def status(self):
+        with self._notifier:
+            services = {
+                name: {
+                    "state": s.state,
+                    "seconds": round(s.seconds, 3) if s.seconds is not None else None,
+                    "error": s.error,
+                }
+                for name, s in self._services.items()
+            }
+        return {
+            "ready": all(s["state"] == READY for s in services.values()),
+            "uptime_seconds": round(time.monotonic() - self.created_at, 1),
+            "app_seconds": round(self.app_seconds, 3) if self.app_seconds is not None else None,
+            "services": services,
+        }
+
+
+services = ServiceRegistry()
@@ -0,0 +1,208 @@
+# serving.py
+"""
+Serving modes for app.py.
+
+"gevent" serves every request on a greenlet of a gevent WSGI server, so
+long-lived /video_feed and /events connections cost a greenlet each instead
+of an OS thread. Only the I/O modules are monkey-patched (thread=False,
+queue=False): background workers (sensor logger, timelapse, samplers, bus
+owner, storage writer) keep running on real threads and talking through real
+queues. Code that hands data from those threads to request handlers waits
+through a Notifier, which parks greenlets on the hub instead of blocking it.
+
+Every greenlet shares the one hub thread, so CPU-bound or blocking work
+(JPEG encodes, camera captures, SQLite queries, thumbnails) must not run on
+it: views doing such work are wrapped in blocking_route, which runs them on
+the hub's thread pool, and long blocking response bodies (exports, videos)
+go through stream_blocking.
+
+"threaded" is Flask's development server with one thread per request.
+"""
+import functools
+import threading
+import time
+from collections import deque
+from logs.logging_config import logger
+
+try:
+    import gevent
+    from gevent.hub import Waiter
+except ImportError:  # Only the threaded mode is available
+    gevent = None
+
+_cooperative = False
+
+
+def patch_for_gevent():
+    """Monkey-patch the standard library for gevent. Must run before the app is imported."""
+    global _cooperative
+    if gevent is None:
+        return False
+    from gevent import monkey
+    monkey.patch_all(thread=False, queue=False)
+    _cooperative = True
+    return True
+
+
+def in_greenlet():
+    """True when the caller is a request greenlet (gevent mode, main thread)."""
+    return _cooperative and threading.current_thread() is threading.main_thread()
+
+
+def run_blocking(function, *args, **kwargs):
+    """
+    Call function(*args, **kwargs). From a request greenlet it runs on the
+    hub's thread pool while the greenlet waits, so the other requests keep
+    being served; anywhere else it is a plain call.
+    """
+    if not in_greenlet():
+        return function(*args, **kwargs)
+    return gevent.get_hub().threadpool.apply(function, args, kwargs)
+
+
+def blocking_route(view):
+    """
+    Decorator for views that capture, encode or query SQLite. In gevent mode
+    the view runs on a pool thread with a copy of the request context (and an
+    app context, hence a database session, of its own). The request body is
+    read here first: the client socket belongs to the hub and cannot be read
+    from another thread.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not in_greenlet():
+            return view(*args, **kwargs)
+        from flask import copy_current_request_context, request
+        # Parses form bodies into request.form/files and caches any other body for get_data()/get_json()
+        request.get_data(cache=True, parse_form_data=True)
+        return run_blocking(copy_current_request_context(view), *args, **kwargs)
+    return wrapper
+
+
+def stream_blocking(generate, max_pending=4):
+    """
+    Response body for generate(), a generator doing blocking work per chunk
+    (database cursor, file reads). Threaded mode iterates it in the request
+    context like stream_with_context. In gevent mode it runs on its own
+    thread inside an app context and hands at most max_pending chunks at a
+    time to the serving greenlet; closing the response stops the thread.
+    """
+    from flask import current_app, stream_with_context
+    if not _cooperative:
+        return stream_with_context(generate())
+    return _stream_from_thread(current_app._get_current_object(), generate, max_pending)
+
+
+def _stream_from_thread(app, generate, max_pending):
+    notifier = Notifier()
+    pending = deque()
+    state = {"done": False, "closed": False}
+
+    def produce():
+        try:
+            with app.app_context():
+                for chunk in generate():
+                    with notifier:
+                        pending.append(chunk)
+                    notifier.notify_all()
+                    while not notifier.wait_for(lambda: len(pending) < max_pending or state["closed"], 1.0):
+                        pass
+                    if state["closed"]:
+                        break
+        except Exception:
+            logger.exception("[Server] Error producing a streamed response")
+        finally:
+            with notifier:
+                state["done"] = True
+            notifier.notify_all()
+
+    def consume():
+        threading.Thread(target=produce, name="StreamProducer", daemon=True).start()
+        try:
+            while True:
+                notifier.wait_for(lambda: pending or state["done"], 1.0)
+                with notifier:
+                    if not pending:
+                        if state["done"]:
+                            return
+                        continue
+                    chunk = pending.popleft()
+                notifier.notify_all()
+                yield chunk
+        finally:
+            with notifier:
+                state["closed"] = True
+            notifier.notify_all()
+
+    return consume()
+
+
+class Notifier:
+    """
+    Condition variable usable from OS threads and gevent greenlets alike.
+
+    Threads wait on a regular threading.Condition. Greenlets register an
+    async watcher on their hub, which notify_all() triggers in a thread-safe
+    way, so a greenlet waiting for the next frame never blocks the others.
+    Use `with notifier:` to guard the state the predicates read.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+        self._watchers = set()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def notify_all(self):
+        with self._lock:
+            self._condition.notify_all()
+            watchers = list(self._watchers)
+        for watcher in watchers:
+            watcher.send()
+
+    def wait_for(self, predicate, timeout):
+        """Wait until predicate() is true (evaluated under the lock). Returns its last value."""
+        if not in_greenlet():
+            with self._lock:
+                return self._condition.wait_for(predicate, timeout)
+
+        deadline = time.monotonic() + timeout
+        hub = gevent.get_hub()
+        while True:
+            with self._lock:
+                result = predicate()
+                remaining = deadline - time.monotonic()
+                if result or remaining <= 0:
+                    return result
+                # Started before it is registered, so a notify can never be missed
+                waiter = Waiter()
+                watcher = hub.loop.async_()
+                watcher.start(waiter.switch, None)
+                self._watchers.add(watcher)
+
+            try:
+                with gevent.Timeout(remaining, False):
+                    waiter.get()
+            finally:
+                with self._lock:
+                    self._watchers.discard(watcher)
+                watcher.stop()
+                watcher.close()
+
+
+def run_server(app, host, port, mode):
+    if mode == "gevent" and _cooperative:
+        from gevent.pywsgi import WSGIServer
+        logger.info(f"[Server] Serving on {host}:{port} with gevent")
+        WSGIServer((host, port), app, log=None).serve_forever()
+    else:
+        if mode == "gevent":
+            logger.warning("[Server] gevent is not installed, falling back to the threaded server")
+        logger.info(f"[Server] Serving on {host}:{port} with the threaded development server")
+        app.run(host=host, port=port, threaded=True)
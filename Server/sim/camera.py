@@ -0,0 +1,96 @@
+# sim/camera.py
+"""
+Stand-in for picamera2.Picamera2 producing synthetic frames, covering the
+calls camera.picam.Camera makes. The lores stream is YUV420 and the main
+stream XBGR8888, like the real configuration; frames are paced at the
+configured FrameRate and change every time so encoders do real work.
+"""
+import threading
+import time
+import numpy as np
+
+
+class _Request:
+    def __init__(self, arrays):
+        self._arrays = arrays
+
+    def make_array(self, name):
+        return self._arrays[name]
+
+    def release(self):
+        pass
+
+
+class FakePicamera2:
+    def __init__(self, camera_num=0):
+        self.camera_controls = {"FrameRate": (1.0, 120.0, 30.0), "NoiseReductionMode": (0, 4, 0)}
+        self.started = False
+        self.frames = 0
+
+        self._config = None
+        self._bases = {}
+        self._lock = threading.Lock()
+        self._next_frame_at = 0.0
+
+    def create_video_configuration(self, main=None, lores=None, controls=None):
+        return {"main": dict(main or {}), "lores": dict(lores) if lores else None, "controls": dict(controls or {})}
+
+    def configure(self, config):
+        if self.started:
+            raise RuntimeError("Camera must be stopped before configuring")
+        self._config = config
+        rng = np.random.default_rng(0)
+        self._bases = {}
+        for name in ("main", "lores"):
+            stream = config.get(name)
+            if not stream:
+                continue
+            width, height = stream["size"]
+            if stream.get("format") == "YUV420":
+                # Stride padded to a multiple of 64 bytes, like libcamera does
+                stride = (width + 63) // 64 * 64
+                base = np.full((height * 3 // 2, stride), 128, dtype=np.uint8)
+                base[:height, :width] = rng.integers(16, 235, (height, width), dtype=np.uint8)
+            else:
+                base = rng.integers(0, 255, (height, width, 4), dtype=np.uint8)
+                base[..., 3] = 255
+            self._bases[name] = base
+
+    def start(self):
+        if self._config is None:
+            raise RuntimeError("Camera has not been configured")
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.stop()
+
+    def _wait_for_frame(self):
+        # Pace captures like the sensor would at the configured frame rate
+        fps = self._config["controls"].get("FrameRate") or 30
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_frame_at - now
+            self._next_frame_at = max(now, self._next_frame_at) + 1.0 / fps
+            self.frames += 1
+            frame = self.frames
+        if delay > 0:
+            time.sleep(delay)
+        return frame
+
+    def _array(self, name, frame):
+        base = self._bases[name]
+        return np.roll(base, frame % 64, axis=1)
+
+    def capture_array(self, name="main"):
+        if not self.started:
+            raise RuntimeError("Camera is not started")
+        return self._array(name, self._wait_for_frame())
+
+    def capture_request(self):
+        if not self.started:
+            raise RuntimeError("Camera is not started")
+        frame = self._wait_for_frame()
+        return _Request({name: self._array(name, frame) for name in self._bases})
@@ -0,0 +1,29 @@
+# sim/plug.py
+"""In-memory smart plug with the same interface as the smart.py backends."""
+import threading
+import time
+
+
+class FakePlug:
+    def __init__(self, latency=0.005, on=False):
+        self.latency = latency
+        self.on = on
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def status(self):
+        self._round_trip()
+        return self.on
+
+    def set(self, on):
+        self._round_trip()
+        self.on = bool(on)
+
+    def info(self):
+        self._round_trip()
+        return {"id": "fake-plug", "ip": "127.0.0.1", "version": 3.3, "online": True, "dps": {"1": self.on}}
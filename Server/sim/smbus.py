@@ -0,0 +1,96 @@
+# sim/smbus.py
+"""
+In-memory stand-in for smbus2.SMBus, for benchmarks and development
+without the Arduinos. Supports the calls the app makes (i2c_rdwr with
+read messages, write_i2c_block_data), with a configurable per-transaction
+latency and error rate.
+"""
+import ctypes
+import random
+import struct
+import threading
+import time
+from config import ARDUINO_SENSORS, ARDUINO_PAN_TILT
+
+I2C_M_RD = 0x0001
+
+
+class FakeSensorBoard:
+    """
+    Answers like the sensor Arduino: <fffH (air temp, humidity, substrate temp, moisture).
+    Replays the given (temperature_air, humidity_air, temperature_substrate, moisture)
+    frames in a loop, or generates noisy plausible values.
+    """
+
+    def __init__(self, frames=None):
+        self.frames = list(frames) if frames else None
+        self._index = 0
+
+    def read(self, length):
+        if self.frames:
+            values = self.frames[self._index % len(self.frames)]
+            self._index += 1
+        else:
+            values = (22.0 + random.uniform(-0.5, 0.5), 85.0 + random.uniform(-2, 2),
+                      21.0 + random.uniform(-0.2, 0.2), 500 + random.randint(-10, 10))
+        return struct.pack('<fffH', values[0], values[1], values[2], int(values[3]))[:length]
+
+    def write(self, register, data):
+        pass
+
+
+class FakePanTiltBoard:
+    """Answers like the pan/tilt Arduino: last commanded (pan, tilt)."""
+
+    def __init__(self):
+        self.pan, self.tilt = 90, 90
+
+    def read(self, length):
+        return bytes([self.pan, self.tilt])[:length]
+
+    def write(self, register, data):
+        self.pan, self.tilt = data[0], data[1]
+
+
+class FakeSMBus:
+    def __init__(self, latency=0.002, error_rate=0.0, devices=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.devices = devices or {ARDUINO_SENSORS: FakeSensorBoard(), ARDUINO_PAN_TILT: FakePanTiltBoard()}
+        self.transactions = 0
+        self.max_concurrent = 0
+
+        self._lock = threading.Lock()
+        self._active = 0
+
+    def _transaction(self, address):
+        # Track overlapping callers: a correctly arbitrated bus never has more than one
+        with self._lock:
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+            self.transactions += 1
+        try:
+            time.sleep(self.latency)
+            if random.random() < self.error_rate:
+                raise OSError(121, "Remote I/O error")
+            if address not in self.devices:
+                raise OSError(6, "No such device or address")
+            return self.devices[address]
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def i2c_rdwr(self, *msgs):
+        for msg in msgs:
+            device = self._transaction(msg.addr)
+            if msg.flags & I2C_M_RD:
+                data = device.read(msg.len)
+                ctypes.memmove(msg.buf, data, len(data))
+            else:
+                device.write(None, bytes(msg))
+
+    def write_i2c_block_data(self, address, register, data):
+        self._transaction(address).write(register, list(data))
+
+    def close(self):
+        pass
@@ -1,24 +1,353 @@
-from tuya_iot import TuyaOpenAPI, AuthType
-from config import SmartPlugConfig
+# smart.py
+"""
+Smart plug access. Nothing connects at import time: each backend opens its
+connection on first use.
 
-config = SmartPlugConfig()
+Backends share a small interface (status() -> bool, set(on), info() -> dict):
+- LocalPlug talks to the plug over the LAN with tinytuya on a persistent
+  socket, reconnecting after any error
+- CloudPlug goes through the Tuya cloud API
+- FallbackPlug tries one backend and falls back to another on failure
+- sim.plug.FakePlug is an in-memory stand-in for development and tests
+- CachedPlug wraps whichever backend is in use with a state cache and makes
+  every backend call from one worker thread
+
+Backends are not thread-safe: a socket or API session must stay on the
+thread that opened it (under gevent each thread has its own hub), so only
+CachedPlug's worker calls them.
+
+The module-level functions keep the Tuya cloud response shapes the routes
+already use.
+"""
+import importlib.util
+import queue
+import threading
+import time
+from config import (
+    SmartPlugConfig, SMARTPLUG_BACKEND, SMARTPLUG_DEVICE_ID, SMARTPLUG_IP,
+    SMARTPLUG_LOCAL_KEY, SMARTPLUG_PROTOCOL_VERSION, SMARTPLUG_TIMEOUT,
+    SMARTPLUG_STATUS_TTL, SMARTPLUG_INFO_TTL, SIM_PLUG_LATENCY
+)
+from logs.logging_config import logger
+from metrics import registry
+from serving import Notifier
+
+# tinytuya is imported on first LAN connection; without it only the cloud backend is available
+HAS_TINYTUYA = importlib.util.find_spec("tinytuya") is not None
+
+SWITCH_DPS = "1"  # Data point of switch_1 on single-outlet plugs
+
+CALL_SECONDS = registry.histogram("smartplug_call_seconds", "Upstream smart plug call latency", ["operation"])
+CALL_ERRORS = registry.counter("smartplug_call_errors", "Upstream smart plug calls that failed", ["operation"])
+CACHE_REQUESTS = registry.counter("smartplug_cache_requests", "Plug state lookups by cache outcome", ["result"])
+
+
+class SmartPlugError(Exception):
+    pass
+
+
+class LocalPlug:
+    """tinytuya over the LAN on one persistent socket. Call from a single thread."""
+
+    def __init__(self, device_id, address, local_key, version, timeout=SMARTPLUG_TIMEOUT):
+        if not HAS_TINYTUYA:
+            raise SmartPlugError("tinytuya is not installed")
+        self.device_id = device_id
+        self.address = address
+        self.local_key = local_key
+        self.version = version
+        self.timeout = timeout
+        self._device = None
+
+    def _connect(self):
+        if self._device is None:
+            import tinytuya
+            device = tinytuya.OutletDevice(self.device_id, self.address, self.local_key, version=self.version,
+                                           connection_timeout=self.timeout, connection_retry_limit=1)
+            device.set_socketPersistent(True)
+            self._device = device
+        return self._device
+
+    def _call(self, operation):
+        try:
+            result = operation(self._connect())
+            if not result or "Error" in result:
+                raise SmartPlugError((result or {}).get("Error", "No response from the plug"))
+            return result
+        except Exception:
+            # Drop the socket; the next call reconnects
+            if self._device is not None:
+                try:
+                    self._device.close()
+                except Exception:
+                    pass
+                self._device = None
+            raise
+
+    def status(self):
+        return bool(self._call(lambda d: d.status())["dps"][SWITCH_DPS])
+
+    def set(self, on):
+        self._call(lambda d: d.set_status(on, switch=int(SWITCH_DPS)))
+
+    def info(self):
+        dps = self._call(lambda d: d.status())["dps"]
+        return {"id": self.device_id, "ip": self.address, "version": self.version, "online": True, "dps": dps}
+
+
+class CloudPlug:
+    """Tuya cloud API; the login happens on the first call. Call from a single thread."""
+
+    def __init__(self, config):
+        self.config = config
+        self._openapi = None
+
+    def _api(self):
+        if self._openapi is None:
+            from tuya_iot import TuyaOpenAPI, AuthType
+            openapi = TuyaOpenAPI(self.config.api_endpoint, self.config.access_id, self.config.access_key,
+                                  AuthType.SMART_HOME)
+            openapi.connect(self.config.username, self.config.password, self.config.country_code,
+                            self.config.api_schema)
+            self._openapi = openapi
+        return self._openapi
+
+    def _check(self, response):
+        if not response or not response.get("success"):
+            raise SmartPlugError(f"Tuya API error: {(response or {}).get('msg', 'no response')}")
+        return response
+
+    def status(self):
+        response = self._check(self._api().get(f"/v1.0/devices/{self.config.device_id}/status"))
+        for item in response["result"]:
+            if item["code"] == "switch_1":
+                return bool(item["value"])
+        raise SmartPlugError("switch_1 code not found")
+
+    def set(self, on):
+        self._check(self._api().post(f"/v1.0/devices/{self.config.device_id}/commands", {
+            "commands": [{"code": "switch_1", "value": bool(on)}]
+        }))
+
+    def info(self):
+        return self._check(self._api().get(f"/v1.0/devices/{self.config.device_id}"))["result"]
+
+
+class FallbackPlug:
+    """Use primary, and fallback whenever primary fails."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+
+    def _call(self, name, *args):
+        try:
+            return getattr(self.primary, name)(*args)
+        except Exception as e:
+            logger.warning(f"[SmartPlug] {type(self.primary).__name__}.{name} failed ({e}), using {type(self.fallback).__name__}")
+            return getattr(self.fallback, name)(*args)
+
+    def status(self):
+        return self._call("status")
+
+    def set(self, on):
+        return self._call("set", on)
+
+    def info(self):
+        return self._call("info")
+
+
+class _Call:
+    def __init__(self, key, operation, generation=None):
+        self.key = key
+        self.operation = operation
+        self.generation = generation  # Cache generation a fetch belongs to (None for commands)
+        self.done = False
+        self.value = None
+        self.error = None
+
+
+class CachedPlug:
+    """
+    Caches the plug state in front of a backend.
+
+    Status is cached for status_ttl seconds and device info for info_ttl.
+    Upstream calls (fetches and commands) run in order on one worker thread,
+    so the backend's socket never changes threads and callers, OS threads or
+    gevent greenlets, only wait on the Notifier. Concurrent callers asking
+    for the same value share one call. set() updates the cached status from
+    the command's outcome, and a fetch queued before a command never
+    overwrites its result.
+    """
+
+    def __init__(self, backend, status_ttl=SMARTPLUG_STATUS_TTL, info_ttl=SMARTPLUG_INFO_TTL, wait_timeout=30.0):
+        self.backend = backend
+        self.ttls = {"status": status_ttl, "info": info_ttl}
+        self.wait_timeout = wait_timeout
+        self.stats = {"hits": 0, "upstream_calls": 0, "coalesced": 0}
+
+        self._notifier = Notifier()
+        self._entries = {}  # key -> (value, fetched_at)
+        self._inflight = {}  # key -> _Call
+        self._generations = {"status": 0, "info": 0}
+        self._calls = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttls[key]:
+            return entry
+        return None
+
+    def _submit(self, call):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="SmartPlug", daemon=True)
+                self._thread.start()
+        self._calls.put(call)
+
+    def _worker(self):
+        while True:
+            self._run(self._calls.get())
+
+    def _run(self, call):
+        started = time.perf_counter()
+        try:
+            call.value = call.operation()
+        except Exception as e:
+            call.error = e
+            CALL_ERRORS.labels(call.key).inc()
+        CALL_SECONDS.labels(call.key).observe(time.perf_counter() - started)
+        with self._notifier:
+            if call.generation is not None:
+                if call.error is None and call.generation == self._generations[call.key]:
+                    self._entries[call.key] = (call.value, time.monotonic())
+                if self._inflight.get(call.key) is call:
+                    del self._inflight[call.key]
+            call.done = True
+        self._notifier.notify_all()
+
+    def _wait(self, calls):
+        if not self._notifier.wait_for(lambda: all(call.done for call in calls), self.wait_timeout):
+            raise SmartPlugError("Timed out waiting for the smart plug")
+        for call in calls:
+            if call.error is not None:
+                raise call.error
+
+    def _get(self, *keys):
+        results, fetches = {}, {}
+        with self._notifier:
+            for key in keys:
+                entry = self._fresh(key)
+                if entry is not None:
+                    self.stats["hits"] += 1
+                    CACHE_REQUESTS.labels("hit").inc()
+                    results[key] = entry[0]
+                    continue
+                fetch = self._inflight.get(key)
+                if fetch is not None:
+                    self.stats["coalesced"] += 1
+                    CACHE_REQUESTS.labels("coalesced").inc()
+                else:
+                    fetch = self._inflight[key] = _Call(key, getattr(self.backend, key), self._generations[key])
+                    self.stats["upstream_calls"] += 1
+                    CACHE_REQUESTS.labels("upstream").inc()
+                    self._submit(fetch)
+                fetches[key] = fetch
+
+        if fetches:
+            self._wait(fetches.values())
+            for key, fetch in fetches.items():
+                results[key] = fetch.value
+        return results
+
+    def status(self):
+        return self._get("status")["status"]
+
+    def info(self):
+        return self._get("info")["info"]
+
+    def snapshot(self):
+        """(info, status), both fetched in one wait when not cached."""
+        results = self._get("info", "status")
+        return results["info"], results["status"]
+
+    def set(self, on):
+        with self._notifier:
+            # Any status fetch already in flight predates this command
+            self._generations["status"] += 1
+            self._entries.pop("status", None)
+            self._inflight.pop("status", None)
+        command = _Call("set", lambda: self.backend.set(on))
+        self._submit(command)
+        self._wait([command])
+        with self._notifier:
+            self._generations["status"] += 1
+            self._entries["status"] = (bool(on), time.monotonic())
+
+    def invalidate(self):
+        with self._notifier:
+            self._generations = {key: value + 1 for key, value in self._generations.items()}
+            self._entries.clear()
+            self._inflight.clear()
+
+
+def create_backend(name=SMARTPLUG_BACKEND):
+    config = SmartPlugConfig()
+    has_local = bool(SMARTPLUG_IP and SMARTPLUG_LOCAL_KEY and HAS_TINYTUYA)
+    has_cloud = bool(config.access_id and config.access_key)
+
+    if name == "sim":
+        from sim.plug import FakePlug
+        return FakePlug(latency=SIM_PLUG_LATENCY)
+    if name == "local":
+        return LocalPlug(SMARTPLUG_DEVICE_ID or config.device_id, SMARTPLUG_IP, SMARTPLUG_LOCAL_KEY, SMARTPLUG_PROTOCOL_VERSION)
+    if name == "cloud":
+        return CloudPlug(config)
+
+    # auto: LAN first, cloud as fallback
+    if has_local:
+        local = LocalPlug(SMARTPLUG_DEVICE_ID or config.device_id, SMARTPLUG_IP, SMARTPLUG_LOCAL_KEY, SMARTPLUG_PROTOCOL_VERSION)
+        return FallbackPlug(local, CloudPlug(config)) if has_cloud else local
+    return CloudPlug(config)
+
+
+plug = CachedPlug(create_backend())
+
+
+def _status_response(status):
+    return {"success": True, "result": [{"code": "switch_1", "value": status}]}
 
-openapi = TuyaOpenAPI(config.api_endpoint, config.access_id, config.access_key, AuthType.SMART_HOME)
-openapi.connect(config.username, config.password, config.country_code, config.api_schema)
 
 def get_device_info():
-    return openapi.get(f"/v1.0/devices/{config.device_id}")
+    return {"success": True, "result": plug.info()}
+
 
 def get_status():
-    return openapi.get(f"/v1.0/devices/{config.device_id}/status")
+    return _status_response(plug.status())
+
+
+def get_full_status():
+    """Device info and status (usually from the cache)."""
+    info, status = plug.snapshot()
+    return {"success": True, "result": info}, _status_response(status)
+
+
+def connect():
+    """Warm up the plug connection and cache (run by the "smartplug" service)."""
+    plug.snapshot()
+
+
+def get_cache_stats():
+    return dict(plug.stats)
 
 
 def turn_on():
-    return openapi.post(f"/v1.0/devices/{config.device_id}/commands", {
-        "commands": [{"code": "switch_1", "value": True}]
-    })
+    plug.set(True)
+    return {"success": True, "result": True}
+
 
 def turn_off():
-    return openapi.post(f"/v1.0/devices/{config.device_id}/commands", {
-        "commands": [{"code": "switch_1", "value": False}]
-    })
\ No newline at end of file
+    plug.set(False)
+    return {"success": True, "result": True}
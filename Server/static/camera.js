@@ -41,7 +41,13 @@ export function setupCameraControls() {
   });
 
   // Set video feed source
-  document.getElementById("videoFeed").src = `${apiUrl}/video_feed`;
+  const qualitySelect = document.getElementById("streamQuality");
+  document.getElementById("videoFeed").src = `${apiUrl}/video_feed?quality=${qualitySelect.value}`;
+
+  // Change stream quality (only this browser's rendition changes)
+  qualitySelect.addEventListener("change", function () {
+    document.getElementById("videoFeed").src = `${apiUrl}/video_feed?quality=${this.value}`;
+  });
 
   // Change stream resolution
   document.getElementById('streamResolution').addEventListener('change', function() {
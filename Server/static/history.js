@@ -1,8 +1,11 @@
-let currentPage = 1;
+// Cursor of every page visited so far; cursors[0] is the newest page
+let cursors = [""];
+
+async function fetchHistory(pageIndex = 0) {
+  if (pageIndex === 0) cursors = [""];
 
-async function fetchHistory(page = 1) {
   const params = new URLSearchParams();
-  params.append("page", page);
+  params.append("after", cursors[pageIndex]);
   params.append("per_page", 10);
 
   // Read filters
@@ -23,9 +26,10 @@ async function fetchHistory(page = 1) {
   const res = await fetch(`/readings_history?${params.toString()}`);
   const data = await res.json();
 
+  if (data.next_after) cursors[pageIndex + 1] = data.next_after;
+
   renderResults(data.readings);
-  renderPagination(data.page, data.pages);
-  currentPage = data.page;
+  renderPagination(pageIndex, Boolean(data.next_after));
 }
 
 function renderResults(readings) {
@@ -51,22 +55,26 @@ function renderResults(readings) {
   container.innerHTML = html;
 }
 
-function renderPagination(current, total) {
+function renderPagination(current, hasNext) {
   const container = document.getElementById("paginationControls");
   container.innerHTML = "";
 
-  if (total <= 1) return;
+  if (current === 0 && !hasNext) return;
 
-  if (current > 1) {
+  if (current > 0) {
     const prev = document.createElement("button");
     prev.textContent = "⬅️ Prev";
     prev.onclick = () => fetchHistory(current - 1);
     container.appendChild(prev);
   }
 
-  container.innerHTML += ` <strong>Page ${current} of ${total}</strong> `;
+  container.appendChild(document.createTextNode(" "));
+  const label = document.createElement("strong");
+  label.textContent = `Page ${current + 1}`;
+  container.appendChild(label);
+  container.appendChild(document.createTextNode(" "));
 
-  if (current < total) {
+  if (hasNext) {
     const next = document.createElement("button");
     next.textContent = "Next ➡️";
     next.onclick = () => fetchHistory(current + 1);
@@ -76,6 +84,6 @@ function renderPagination(current, total) {
 
 // Bind buttons
 document.addEventListener("DOMContentLoaded", () => {
-  document.getElementById("loadHistoryBtn").addEventListener("click", () => fetchHistory(1));
-  document.getElementById("applyFiltersBtn").addEventListener("click", () => fetchHistory(1));
+  document.getElementById("loadHistoryBtn").addEventListener("click", () => fetchHistory(0));
+  document.getElementById("applyFiltersBtn").addEventListener("click", () => fetchHistory(0));
 });
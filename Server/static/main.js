@@ -1,8 +1,29 @@
-import { servo_pan, servo_tilt, moveServo, fetchServoPosition, updateServoDisplay } from './servoControl.js';
-import { fetchSensorData } from './sensorData.js';
+import { servo_pan, servo_tilt, moveServo, fetchServoPosition, applyServoPosition, updateServoDisplay } from './servoControl.js';
+import { fetchSensorData, renderSensorData } from './sensorData.js';
 import { setupTimelapse } from './timelapse.js';
 import { setupCameraControls } from './camera.js';
-import { setupSmartPlug } from './smartPlug.js';
+import { setupSmartPlug, renderSmartPlugStatus } from './smartPlug.js';
+
+const apiUrl = `${window.location.protocol}//${window.location.hostname}:5000`;
+
+/**
+ * Subscribe to the server's live channel. The server samples the bus once for
+ * every open dashboard and only pushes values that changed.
+ */
+function subscribeToLiveEvents() {
+  const events = new EventSource(`${apiUrl}/events`);
+
+  if (window.read_sensors) {
+    events.addEventListener("sensors", (e) => renderSensorData(JSON.parse(e.data)));
+  }
+  if (window.read_servos) {
+    events.addEventListener("servos", (e) => applyServoPosition(JSON.parse(e.data)));
+  }
+  events.addEventListener("smartplug", (e) => renderSmartPlugStatus(JSON.parse(e.data)));
+
+  // EventSource reconnects on its own; just note it
+  events.onerror = () => console.warn("Live events connection lost, reconnecting...");
+}
 
 
 window.onload = () => {
@@ -17,7 +38,11 @@ window.onload = () => {
   setupCameraControls();
   setupSmartPlug();
 
-  // Periodic updates
-  if (window.read_sensors) setInterval(fetchSensorData, 500);
-  if (window.read_servos) setInterval(fetchServoPosition, 200);
-};
\ No newline at end of file
+  if (window.EventSource) {
+    subscribeToLiveEvents();
+  } else {
+    // Periodic updates for browsers without Server-Sent Events
+    if (window.read_sensors) setInterval(fetchSensorData, 500);
+    if (window.read_servos) setInterval(fetchServoPosition, 200);
+  }
+};
@@ -3,6 +3,8 @@
 const apiUrl = `${window.location.protocol}//${window.location.hostname}:5000`;
 let servo_pan = 90;
 let servo_tilt = 90;
+let request_in_flight = false;
+let pending_target = null;
 
 /**
  * Update the displayed servo positions in the UI.
@@ -22,20 +24,41 @@ async function moveServo(pan, tilt) {
 
   servo_tilt = Math.max(90, Math.min(160, tilt));
   servo_pan = Math.max(0, Math.min(180, pan));
+  updateServoDisplay();
 
+  // Only the latest target matters: while a request is in flight, later clicks just replace it
+  pending_target = { pan: servo_pan, tilt: servo_tilt };
+  if (request_in_flight) return;
+
+  request_in_flight = true;
   try {
-    const response = await fetch(`${apiUrl}/send_pan_tilt`, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ pan: servo_pan, tilt: servo_tilt }),
-    });
-    if (!response.ok) throw new Error(`HTTP error: ${response.status}`);
-    updateServoDisplay();
+    while (pending_target) {
+      const target = pending_target;
+      pending_target = null;
+      const response = await fetch(`${apiUrl}/send_pan_tilt`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(target),
+      });
+      if (!response.ok) throw new Error(`HTTP error: ${response.status}`);
+    }
   } catch (error) {
     console.error("Error moving servo:", error);
+  } finally {
+    request_in_flight = false;
   }
 }
 
+/**
+ * Apply a position reported by the server (from /request_current_pan_tilt or the /events stream).
+ * @param {{pan: number, tilt: number}} data
+ */
+function applyServoPosition(data) {
+  servo_pan = data.pan;
+  servo_tilt = data.tilt;
+  updateServoDisplay();
+}
+
 /**
  * Fetch the current servo position from the server.
  */
@@ -43,13 +66,10 @@ async function fetchServoPosition() {
   try {
     const response = await fetch(`${apiUrl}/request_current_pan_tilt`);
     if (!response.ok) throw new Error(`HTTP error: ${response.status}`);
-    const data = await response.json();
-    servo_pan = data.pan;
-    servo_tilt = data.tilt;
-    updateServoDisplay();
+    applyServoPosition(await response.json());
   } catch (error) {
     console.error("Error fetching servo position:", error);
   }
 }
 
-export {servo_pan, servo_tilt, moveServo, fetchServoPosition, updateServoDisplay };
\ No newline at end of file
+export {servo_pan, servo_tilt, moveServo, fetchServoPosition, applyServoPosition, updateServoDisplay };
\ No newline at end of file
@@ -1,12 +1,19 @@
+/**
+ * Show the plug state (from /smartplug/status or the /events stream).
+ * @param {{status: boolean}} data
+ */
+export function renderSmartPlugStatus(data) {
+  document.getElementById("smartPlugStatus").textContent = data.status ? "ON" : "OFF";
+  document.getElementById("smartPlugBtn").textContent = data.status ? "Turn OFF" : "Turn ON";
+}
+
 export function setupSmartPlug() {
   const apiUrl = `${window.location.protocol}//${window.location.hostname}:5000`;
 
   async function updateSmartPlugStatus() {
     try {
       const res = await fetch(`${apiUrl}/smartplug/status`);
-      const data = await res.json();
-      document.getElementById("smartPlugStatus").textContent = data.status ? "ON" : "OFF";
-      document.getElementById("smartPlugBtn").textContent = data.status ? "Turn OFF" : "Turn ON";
+      renderSmartPlugStatus(await res.json());
     } catch (e) {
       document.getElementById("smartPlugStatus").textContent = "Error";
     }
@@ -29,4 +36,4 @@ export function setupSmartPlug() {
 
   document.getElementById("smartPlugBtn").addEventListener("click", toggleSmartPlug);
   updateSmartPlugStatus();
-}
\ No newline at end of file
+}